@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+AI video analysis worker pool for DojoTracker
+Runs queued analysis jobs in separate processes so Gemini calls never block the web server
+
+Usage:
+    python analysis_worker.py                 # ANALYSIS_WORKERS processes (default 2)
+    python analysis_worker.py --workers 4
+    python analysis_worker.py --sweep-only    # Reclaim stale analyses and exit
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import threading
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+from functools import partial
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from services.analysis_queue import (
+    ANALYSIS_WORKERS, HEARTBEAT_SECONDS, POLL_INTERVAL_SECONDS, LeaseLost, get_analysis_queue
+)
+
+shutdown_requested = False
+
+
+def request_shutdown(signum, frame):
+    """Finish the current job, then exit"""
+    global shutdown_requested
+    shutdown_requested = True
+
+
+def start_heartbeat(app, queue, job_id, worker_id):
+    """Renew the job lease in the background until the returned event is set"""
+    stop_event = threading.Event()
+
+    def beat():
+        with app.app_context():
+            while not stop_event.wait(HEARTBEAT_SECONDS):
+                try:
+                    if not queue.heartbeat(job_id, worker_id):
+                        print(f"⚠️ [{worker_id}] Lost lease on job {job_id}")
+                        return
+                except Exception as e:
+                    print(f"⚠️ [{worker_id}] Heartbeat failed for job {job_id}: {e}")
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    return stop_event
+
+
+def run_job(app, queue, job, worker_id):
+    """Run one claimed job and record the outcome on its VideoAnalysis row"""
+    from services.ai_video_analysis import AIVideoAnalysisService, GEMINI_MODEL, analysis_cache_model
+    from services.analysis_cache import get_analysis_cache, get_video_content_hash, make_cache_key
+    from services.pose_estimation import POSE_ESTIMATION
+    from services.video_assets import load_keyframes
+    from services.video_storage import get_storage_for
+    from routes.ai_analysis import update_analysis_progress
+
+    db = app.extensions['sqlalchemy']
+    analysis = db.session.get(app.VideoAnalysis, job.analysis_id)
+    if not analysis:
+        queue.fail(job, 'Analysis record no longer exists', worker_id)
+        return
+
+    if job.attempts > job.max_attempts:
+        # Job kept killing its worker (lease expired each time) - stop retrying
+        analysis.analysis_status = 'failed'
+        analysis.error_message = job.last_error or 'Analysis worker crashed repeatedly'
+        analysis.completed_at = datetime.utcnow()
+        queue.fail(job, analysis.error_message, worker_id)
+        return
+
+    analysis.analysis_status = 'processing'
+    db.session.commit()
+
+    payload = job.payload or {}
+    cache = get_analysis_cache()
+    cache_key = payload.get('cache_key')
+    video_hash = payload.get('video_hash')
+    video = db.session.get(app.TrainingVideo, job.video_id)
+
+    if not cache_key and video and video.file_path and get_storage_for(video.file_path).exists(video.file_path):
+        # Videos without a stored hash (older uploads) are hashed here, never in the request
+        try:
+            video_hash = get_video_content_hash(video, db)
+            prompt = AIVideoAnalysisService.generate_analysis_prompt(
+                payload.get('technique_name'), payload.get('martial_art_style')
+            )
+            cache_key = make_cache_key(video_hash, prompt, analysis_cache_model())
+        except OSError as e:
+            print(f"⚠️ [{worker_id}] Could not hash video {video.id}, skipping cache: {e}")
+
+    # An identical clip may have been analysed while this job waited
+    cached_results = cache.get(cache_key, record_miss=False) if cache_key else None
+    if cached_results:
+        analysis.apply_results(cached_results)
+        queue.complete(job, worker_id)  # Commits the results with the job
+        update_analysis_progress(analysis.user_id, analysis)
+        print(f"⚡ [{worker_id}] Analysis {analysis.id} served from cache")
+        return
+
+    try:
+        video_path = payload.get('video_path')
+        storage = get_storage_for(video_path)
+        if not video_path or not storage.exists(video_path):
+            raise ValueError(f"Video file not found: {video_path}")
+
+        print(f"🚀 [{worker_id}] Analysis {analysis.id} (job {job.id}, attempt {job.attempts}/{job.max_attempts})")
+
+        ai_service = AIVideoAnalysisService()
+
+        # Re-runs reuse the keyframes stored after upload instead of decoding again
+        frames = None
+        if video and video.assets_path:
+            frames = load_keyframes(video.assets_path, ai_service.frame_selection, ai_service.max_frames)
+
+        # Pose metrics depend only on the video, so re-analyses skip pose inference
+        pose_metrics = None
+        if POSE_ESTIMATION != 'off':
+            previous = app.VideoAnalysis.query.filter(
+                app.VideoAnalysis.video_id == job.video_id,
+                app.VideoAnalysis.pose_metrics.isnot(None)
+            ).order_by(app.VideoAnalysis.completed_at.desc()).first()
+            if previous and previous.pose_metrics.get('backend') == POSE_ESTIMATION:
+                pose_metrics = previous.pose_metrics
+
+        # Stage updates feed the SSE progress stream (see services/analysis_events.py)
+        progress_callback = partial(queue.report_progress, job.id, worker_id)
+
+        # Remote videos are decoded straight from a presigned URL, no local copy
+        results = ai_service.analyze_video_file(
+            storage.read_url(video_path),
+            payload.get('technique_name'),
+            payload.get('martial_art_style'),
+            frames=frames,
+            progress_callback=progress_callback,
+            pose_metrics=pose_metrics
+        )
+
+        if 'error' in results:
+            raise RuntimeError(results['error'])
+
+        # Results are committed with the job, and only while this worker still holds the lease
+        analysis.apply_results(results)
+        queue.complete(job, worker_id)
+        update_analysis_progress(analysis.user_id, analysis)
+
+        if cache_key:
+            cache.put(cache_key, video_hash, GEMINI_MODEL, results)
+
+        print(f"✅ [{worker_id}] Analysis {analysis.id} completed! Score: {analysis.overall_score}/10")
+
+    except LeaseLost:
+        print(f"⚠️ [{worker_id}] Lost lease on job {job.id}, discarding its result")
+
+    except Exception as e:
+        db.session.rollback()
+        will_retry = queue.will_retry(job)
+
+        analysis = db.session.get(app.VideoAnalysis, job.analysis_id)
+        analysis.error_message = str(e)
+        if will_retry:
+            analysis.analysis_status = 'pending'
+        else:
+            analysis.analysis_status = 'failed'
+            analysis.completed_at = datetime.utcnow()
+
+        try:
+            queue.fail(job, e, worker_id)
+        except LeaseLost:
+            print(f"⚠️ [{worker_id}] Lost lease on job {job.id}, not recording its failure")
+            return
+
+        if will_retry:
+            print(f"🔁 [{worker_id}] Analysis {analysis.id} failed, retrying after {job.run_after}: {e}")
+        else:
+            print(f"❌ [{worker_id}] Analysis {analysis.id} failed permanently: {e}")
+
+
+def worker_main(poll_interval):
+    """Entry point of a worker process: claim and run jobs until asked to stop"""
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor handles Ctrl+C
+
+    from app import create_app
+    app = create_app()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    with app.app_context():
+        db = app.extensions['sqlalchemy']
+        queue = get_analysis_queue()
+        print(f"👷 Analysis worker {worker_id} ready")
+
+        while not shutdown_requested:
+            try:
+                job = queue.claim(worker_id)
+            except Exception as e:
+                print(f"❌ [{worker_id}] Could not claim job: {e}")
+                db.session.rollback()
+                job = None
+
+            if not job:
+                time.sleep(poll_interval)
+                continue
+
+            # Renew the lease from the moment of the claim - hashing a large
+            # video before the analysis starts can outlast one lease
+            stop_heartbeat = start_heartbeat(app, queue, job.id, worker_id)
+            try:
+                run_job(app, queue, job, worker_id)
+            except Exception as e:
+                # Lease expiry will hand the job to another worker
+                print(f"❌ [{worker_id}] Job {job.id} crashed: {e}")
+                db.session.rollback()
+            finally:
+                stop_heartbeat.set()
+                db.session.remove()
+
+    print(f"👋 Analysis worker {worker_id} stopped")
+
+
+def sweep_stale_analyses():
+    """Reclaim work orphaned by crashes or restarts"""
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        result = get_analysis_queue().recover_stale_analyses()
+
+    print(f"🧹 Startup sweep: {result['requeued_jobs']} expired jobs requeued, "
+          f"{result['requeued_analyses']} stale analyses requeued, "
+          f"{result['failed_analyses']} marked failed")
+    return result
+
+
+def run_worker_pool(num_workers, poll_interval):
+    """Start the sweep, then keep `num_workers` worker processes alive"""
+    sweep_stale_analyses()
+
+    context = multiprocessing.get_context('spawn')
+    workers = []
+
+    def start_worker():
+        process = context.Process(target=worker_main, args=(poll_interval,), daemon=False)
+        process.start()
+        return process
+
+    for _ in range(num_workers):
+        workers.append(start_worker())
+
+    print(f"🚀 Analysis worker pool started with {num_workers} workers")
+
+    try:
+        while True:
+            time.sleep(5)
+            for index, process in enumerate(workers):
+                if not process.is_alive():
+                    print(f"⚠️ Worker {process.pid} exited ({process.exitcode}), restarting")
+                    workers[index] = start_worker()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping workers (current jobs will finish)...")
+        for process in workers:
+            process.terminate()  # SIGTERM -> graceful stop after the current job
+        for process in workers:
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DojoTracker AI analysis worker pool')
+    parser.add_argument('--workers', type=int, default=ANALYSIS_WORKERS, help='Number of worker processes')
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL_SECONDS, help='Seconds between queue polls when idle')
+    parser.add_argument('--sweep-only', action='store_true', help='Reclaim stale analyses and exit')
+
+    args = parser.parse_args()
+
+    if args.sweep_only:
+        sweep_stale_analyses()
+        return
+
+    run_worker_pool(max(1, args.workers), args.poll_interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -49,13 +49,18 @@ def create_app():
     print("📦 Loading AI analysis models...")
     try:
         from models.ai_analysis import create_ai_analysis_models
-        VideoAnalysis, AnalysisFeedback, AnalysisProgress = create_ai_analysis_models(db)
-        print("✅ AI analysis models loaded: VideoAnalysis, AnalysisFeedback, AnalysisProgress")
+        (VideoAnalysis, AnalysisFeedback, AnalysisProgress, AnalysisJob, AnalysisBatch,
+         AnalysisCacheEntry, AnalysisCacheStat) = create_ai_analysis_models(db)
+        print("✅ AI analysis models loaded: VideoAnalysis, AnalysisFeedback, AnalysisProgress, AnalysisJob, AnalysisBatch, AnalysisCacheEntry, AnalysisCacheStat")
         
         # Make models available globally in the app
         app.VideoAnalysis = VideoAnalysis
         app.AnalysisFeedback = AnalysisFeedback
         app.AnalysisProgress = AnalysisProgress
+        app.AnalysisJob = AnalysisJob
+        app.AnalysisBatch = AnalysisBatch
+        app.AnalysisCacheEntry = AnalysisCacheEntry
+        app.AnalysisCacheStat = AnalysisCacheStat
         
     except Exception as e:
         print(f"❌ Error loading AI analysis models: {e}")
@@ -63,6 +68,10 @@ def create_app():
         VideoAnalysis = None
         AnalysisFeedback = None
         AnalysisProgress = None
+        AnalysisJob = None
+        AnalysisBatch = None
+        AnalysisCacheEntry = None
+        AnalysisCacheStat = None
 
     # Initialize extensions with app
     db.init_app(app)
@@ -196,8 +205,8 @@ def create_app():
     print("📦 Loading technique library models...")
     try:
         from models.technique_library import create_technique_models
-        TechniqueLibrary, UserTechniqueBookmark, TechniqueCategory = create_technique_models(db)
-        print("✅ Technique library models loaded: TechniqueLibrary, UserTechniqueBookmark, TechniqueCategory")
+        TechniqueLibrary, UserTechniqueBookmark, TechniqueCategory, TechniqueTag = create_technique_models(db)
+        print("✅ Technique library models loaded: TechniqueLibrary, UserTechniqueBookmark, TechniqueCategory, TechniqueTag")
     except Exception as e:
         print(f"❌ Error loading technique library models: {e}")
         raise
@@ -222,6 +231,36 @@ def create_app():
         print(f"❌ Error loading workout models: {e}")
         raise
 
+    # Create AI coach chat models
+    print("📦 Loading chat models...")
+    try:
+        from models.chat import create_chat_models
+        ChatConversation, ChatMessage = create_chat_models(db)
+        print("✅ Chat models loaded: ChatConversation, ChatMessage")
+    except Exception as e:
+        print(f"❌ Error loading chat models: {e}")
+        raise
+
+    # Create daily training rollup model
+    print("📦 Loading training rollup model...")
+    try:
+        from models.training_rollup import create_training_rollup_models
+        TrainingDailyRollup = create_training_rollup_models(db)
+        print("✅ Training rollup model loaded: TrainingDailyRollup")
+    except Exception as e:
+        print(f"❌ Error loading training rollup model: {e}")
+        raise
+
+    # Create training context snapshot model
+    print("📦 Loading training context model...")
+    try:
+        from models.training_context import create_training_context_models
+        TrainingContextSnapshot = create_training_context_models(db)
+        print("✅ Training context model loaded: TrainingContextSnapshot")
+    except Exception as e:
+        print(f"❌ Error loading training context model: {e}")
+        raise
+
     # Make models available globally in the app
     app.User = User
     app.TrainingSession = TrainingSession
@@ -229,6 +268,7 @@ def create_app():
     app.TechniqueLibrary = TechniqueLibrary
     app.UserTechniqueBookmark = UserTechniqueBookmark
     app.TechniqueCategory = TechniqueCategory
+    app.TechniqueTag = TechniqueTag
     app.ExerciseCategory = ExerciseCategory
     app.MuscleGroup = MuscleGroup
     app.Equipment = Equipment
@@ -236,6 +276,10 @@ def create_app():
     app.WorkoutPlanExercise = WorkoutPlanExercise
     app.FavoriteExercise = FavoriteExercise
     app.WorkoutPlan = WorkoutPlan
+    app.ChatConversation = ChatConversation
+    app.ChatMessage = ChatMessage
+    app.TrainingDailyRollup = TrainingDailyRollup
+    app.TrainingContextSnapshot = TrainingContextSnapshot
     
     # Add UserPreferences if it exists
     if UserPreferences:
@@ -244,6 +288,15 @@ def create_app():
     # Add TrainingVideo if it exists
     if TrainingVideo:
         app.TrainingVideo = TrainingVideo
+        
+        # Post-upload HLS transcoding (skipped when ffmpeg is not installed)
+        from services.video_transcoding import get_video_transcoder
+        video_transcoder = get_video_transcoder()
+        if video_transcoder.available:
+            TrainingVideo.status_listeners.append(video_transcoder.handle_status_change)
+            print("✅ HLS video transcoding enabled")
+        else:
+            print("ℹ️ ffmpeg not found - videos will be served as uploaded")
 
     # Register blueprints - SINGLE REGISTRATION ONLY
     print("🔗 Registering blueprints...")
@@ -343,7 +396,13 @@ def create_app():
         print("❌ Exercises blueprint not registered")
 
     # Register AI blueprint if available
-    ai_bp = None
+    try:
+        from routes.ai_insights import ai_bp
+        print("✅ AI insights blueprint imported")
+    except Exception as e:
+        print(f"❌ Failed to import AI insights blueprint: {e}")
+        ai_bp = None
+
     if ai_bp:
         app.register_blueprint(ai_bp, url_prefix='/api/ai')
         print("✅ AI insights blueprint registered at /api/ai")
@@ -577,6 +636,34 @@ if __name__ == '__main__':
             db.create_all()
             print("✅ Database tables created successfully")
             
+            # Bring tables created by older versions up to date
+            from utils.schema import add_missing_columns, add_missing_indexes
+            schema_models = [app.TrainingVideo]
+            if getattr(app, 'VideoAnalysis', None):
+                schema_models.extend([app.VideoAnalysis, app.AnalysisJob])
+            added_columns = add_missing_columns(db, *schema_models)
+            if added_columns:
+                print(f"✅ Added columns: {', '.join(added_columns)}")
+            added_indexes = add_missing_indexes(db)
+            if added_indexes:
+                print(f"✅ Added indexes: {', '.join(added_indexes)}")
+            
+            # Fill the daily rollup the first time it exists next to older sessions
+            from services.training_rollup import get_training_rollup_service
+            rollup_service = get_training_rollup_service()
+            if rollup_service.needs_backfill():
+                print(f"✅ Backfilled {rollup_service.backfill()} daily rollup rows")
+
+            # Normalised technique tags for libraries imported before technique_tags existed
+            if app.TechniqueTag.query.first() is None and app.TechniqueLibrary.query.first() is not None:
+                print(f"✅ Synced tags of {app.TechniqueLibrary.backfill_tags()} techniques")
+
+            # Full-text index for the technique library (built from existing rows on first run)
+            from services.technique_search import create_technique_search_schema
+            print(f"✅ Technique search engine: {create_technique_search_schema(db).name}")
+            from services.technique_index import get_technique_index
+            print(f"✅ Technique name index: {get_technique_index().build(app.TechniqueLibrary)} techniques")
+
             # Safe database statistics that won't fail if schema is wrong
             User = app.User
             TrainingSession = app.TrainingSession
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for DojoTracker
+Runs the hot per-user queries under EXPLAIN and fails if any of them falls
+back to a sequential scan of its table
+
+Usage:
+    python benchmarks/query_plans.py                                   # Temporary SQLite DB
+    python benchmarks/query_plans.py --database-url postgresql://...   # Existing PostgreSQL schema
+    python benchmarks/query_plans.py --verbose                         # Print every plan
+
+Exit status is 1 when a query regressed, so it can gate CI. On PostgreSQL
+enable_seqscan is switched off for the check: the planner then only picks
+a sequential scan when no index can serve the query, which makes the
+result independent of table sizes and statistics. SQLite has no such
+switch; its planner only weighs table sizes once ANALYZE has filled
+sqlite_stat1, so check a schema without statistics (the default temp DB).
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import func, text, tuple_, literal
+
+USER_ID = 1
+
+
+def hot_queries(app):
+    """(name, table, query) for the per-user queries the API runs on every page load"""
+    TrainingSession = app.TrainingSession
+    TechniqueProgress = app.TechniqueProgress
+    TrainingVideo = app.TrainingVideo
+    TrainingDailyRollup = app.TrainingDailyRollup
+    db = app.extensions['sqlalchemy']
+
+    queries = [
+        ('sessions: list page', 'training_sessions',
+         TrainingSession.query.filter_by(user_id=USER_ID)
+         .order_by(TrainingSession.date.desc(), TrainingSession.id.desc()).limit(21)),
+        ('sessions: next page', 'training_sessions',
+         TrainingSession.query.filter_by(user_id=USER_ID)
+         .filter(tuple_(TrainingSession.date, TrainingSession.id) < tuple_(literal(date(2025, 1, 1)), literal(100)))
+         .order_by(TrainingSession.date.desc(), TrainingSession.id.desc()).limit(21)),
+        ('sessions: by style', 'training_sessions',
+         TrainingSession.query.filter_by(user_id=USER_ID, style='Karate').order_by(TrainingSession.date.desc())),
+        ('sessions: insight timeframe', 'training_sessions',
+         TrainingSession.query.filter(TrainingSession.user_id == USER_ID, TrainingSession.created_at >= datetime(2025, 1, 1))
+         .order_by(TrainingSession.created_at.desc())),
+        ('sessions: styles', 'training_sessions',
+         db.session.query(TrainingSession.style).filter_by(user_id=USER_ID).distinct()),
+        ('rollup: stats totals', 'training_daily_rollup',
+         db.session.query(func.sum(TrainingDailyRollup.minutes)).filter(TrainingDailyRollup.user_id == USER_ID)),
+        ('rollup: daily series', 'training_daily_rollup',
+         db.session.query(TrainingDailyRollup.date, func.sum(TrainingDailyRollup.minutes))
+         .filter(TrainingDailyRollup.user_id == USER_ID, TrainingDailyRollup.date >= date(2025, 1, 1))
+         .group_by(TrainingDailyRollup.date)),
+        ('techniques: list', 'technique_progress',
+         TechniqueProgress.query.filter_by(user_id=USER_ID).order_by(TechniqueProgress.technique_name)),
+        ('techniques: by style', 'technique_progress',
+         TechniqueProgress.query.filter_by(user_id=USER_ID, style='Karate').order_by(TechniqueProgress.technique_name)),
+        ('techniques: by status', 'technique_progress',
+         TechniqueProgress.query.filter_by(user_id=USER_ID, mastery_status='learning')),
+        ('videos: list page', 'training_videos',
+         TrainingVideo.query.filter_by(user_id=USER_ID)
+         .order_by(TrainingVideo.created_at.desc(), TrainingVideo.id.desc()).limit(21)),
+        ('videos: by style', 'training_videos',
+         TrainingVideo.query.filter_by(user_id=USER_ID, style='Karate').order_by(TrainingVideo.created_at.desc())),
+        ('videos: by analysis status', 'training_videos',
+         TrainingVideo.query.filter_by(user_id=USER_ID, analysis_status='completed')),
+        ('favorites: list', 'favorite_exercises',
+         app.FavoriteExercise.query.filter_by(user_id=USER_ID).order_by(app.FavoriteExercise.created_at.desc())),
+        ('workout plans: active', 'workout_plans',
+         app.WorkoutPlan.query.filter_by(user_id=USER_ID, is_active=True).order_by(app.WorkoutPlan.updated_at.desc())),
+        ('bookmarks: list', 'user_technique_bookmarks',
+         app.UserTechniqueBookmark.query.filter_by(user_id=USER_ID)
+         .order_by(app.UserTechniqueBookmark.updated_at.desc())),
+        ('bookmarks: lookup', 'user_technique_bookmarks',
+         app.UserTechniqueBookmark.query.filter_by(user_id=USER_ID, technique_id=1)),
+        ('library: tag filter', 'technique_tags',
+         app.TechniqueLibrary.query.filter(*app.TechniqueLibrary.filter_conditions(tags=['kicks', 'beginner']))
+         .order_by(app.TechniqueLibrary.name).limit(20)),
+        ('library: tag facets', 'technique_tags',
+         db.session.query(app.TechniqueTag.tag, func.count()).filter(app.TechniqueTag.technique_id.in_([1, 2, 3]))
+         .group_by(app.TechniqueTag.tag)),
+        ('chat: conversations', 'chat_conversations',
+         app.ChatConversation.query.filter_by(user_id=USER_ID).order_by(app.ChatConversation.updated_at.desc())),
+    ]
+
+    VideoAnalysis = getattr(app, 'VideoAnalysis', None)
+    if VideoAnalysis is not None:
+        queries += [
+            ('analyses: for video', 'video_analyses',
+             VideoAnalysis.query.filter_by(video_id=1, user_id=USER_ID).order_by(VideoAnalysis.started_at.desc())),
+            ('analyses: recent completed', 'video_analyses',
+             VideoAnalysis.query.filter_by(user_id=USER_ID, analysis_status='completed')
+             .order_by(VideoAnalysis.completed_at.desc()).limit(10)),
+            ('analyses: technique scores', 'video_analyses',
+             VideoAnalysis.query.filter_by(user_id=USER_ID, technique_name='Jab', martial_art_style='Boxing',
+                                           analysis_status='completed')),
+        ]
+
+    return queries
+
+
+def explain_sqlite(connection, sql, table):
+    """(plan lines, sequential scan found) from EXPLAIN QUERY PLAN"""
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').all()
+    lines = [row[-1] for row in rows]
+    # "SCAN t" and "SCAN t USING INDEX" read the whole table/index; "SEARCH t USING INDEX" is a range lookup
+    regressed = any(line.split()[:2] == ['SCAN', table] for line in lines)
+    return lines, regressed
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def explain_postgresql(connection, sql, table):
+    """(plan lines, sequential scan found) from EXPLAIN (FORMAT JSON)"""
+    value = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}').scalar()
+    plan = (json.loads(value) if isinstance(value, str) else value)[0]['Plan']
+    nodes = list(_plan_nodes(plan))
+    lines = [f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip() for node in nodes]
+    regressed = any(node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table for node in nodes)
+    return lines, regressed
+
+
+def check(app, db, verbose):
+    dialect = db.engine.dialect.name
+    explain = explain_postgresql if dialect == 'postgresql' else explain_sqlite
+
+    print(f"\n{'='*78}")
+    print(f"🔍 Query plan check ({dialect})")
+    print('='*78)
+
+    failures = []
+    with db.engine.connect() as connection:
+        if dialect == 'postgresql':
+            connection.execute(text('SET enable_seqscan = off'))
+
+        for name, table, query in hot_queries(app):
+            # Literal values keep the statement self-contained for the EXPLAIN prefix
+            sql = str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+            lines, regressed = explain(connection, sql, table)
+            print(f"{'❌' if regressed else '✅'} {name:<32} {lines[0] if lines else ''}")
+            if verbose or regressed:
+                for line in lines[1:]:
+                    print(f"   {line}")
+            if regressed:
+                failures.append(name)
+
+    if failures:
+        print(f"\n❌ {len(failures)} queries fall back to a sequential scan: {', '.join(failures)}")
+        print("💡 Run 'python migrate_add_indexes.py' or add an index for the new query shape")
+    else:
+        print("\n✅ Every hot query is served by an index")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if hot per-user queries regress to sequential scans')
+    parser.add_argument('--database-url', help='Database to check (default: temporary SQLite file with the current models)')
+    parser.add_argument('--verbose', action='store_true', help='Print full plans')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(temp_dir, 'query_plans.db')}"
+
+        from app import create_app, db
+        app = create_app()
+        with app.app_context():
+            if not args.database_url:
+                db.create_all()
+            success = check(app, db, args.verbose)
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Technique search benchmark for DojoTracker
+Compares the former ilike('%q%') scan with the full-text engine behind
+/api/techniques/search
+
+Usage:
+    python benchmarks/technique_search.py                          # 100k techniques in a temp SQLite DB
+    python benchmarks/technique_search.py --size 20000 --repeat 20
+    python benchmarks/technique_search.py --database-url postgresql://...  # Adds (and removes) benchmark rows
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+STYLES = ['Karate', 'Brazilian Jiu-Jitsu', 'Muay Thai', 'Judo', 'Taekwondo', 'Boxing', 'Wrestling', 'Kung Fu']
+MOVES = ['kick', 'punch', 'throw', 'sweep', 'choke', 'lock', 'block', 'strike', 'elbow', 'knee', 'guard', 'escape']
+MODIFIERS = ['front', 'back', 'spinning', 'jumping', 'reverse', 'inside', 'outside', 'low', 'high', 'double', 'hook']
+WORDS = ['balance', 'hip', 'rotation', 'timing', 'distance', 'pivot', 'chamber', 'retract', 'posture', 'grip',
+         'shoulder', 'foot', 'heel', 'shin', 'wrist', 'opponent', 'angle', 'weight', 'breathing', 'stance',
+         'counter', 'feint', 'footwork', 'momentum', 'leverage', 'control', 'snap', 'thrust', 'circular', 'linear']
+SYLLABLES = ['ka', 'ri', 'to', 'mu', 'sen', 'do', 'ha', 'ki', 'na', 'shi', 'ro', 'te', 'yo', 'ma', 'gi', 'ra', 'zu', 'be']
+VOCABULARY_SIZE = 20000
+QUERIES = ['spinning kick', 'kic', 'pivot heel', 'choke escape', 'throwing', 'leverage grip control']
+SOURCE_SITE = 'benchmark'
+
+
+def vocabulary(rng):
+    """
+    Zipf-distributed word list, like natural text
+
+    Filler words take the most frequent ranks; the martial arts terms are
+    spread over the mid ranks, so each query term occurs in a realistic
+    few percent of techniques rather than in nearly all of them.
+    """
+    filler = set()
+    while len(filler) < VOCABULARY_SIZE:
+        filler.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(filler)
+    rng.shuffle(words)
+    for i, word in enumerate(WORDS + MOVES):
+        words.insert(40 + i * 25, word)
+    cum_weights, total = [], 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1.0 / rank
+        cum_weights.append(total)
+    return words, cum_weights
+
+
+def sentence(rng, words, cum_weights, length):
+    return ' '.join(rng.choices(words, cum_weights=cum_weights, k=length)).capitalize() + '.'
+
+
+def populate(app, db, size, rng):
+    """Bulk insert synthetic techniques (through the ORM table, so search triggers fire)"""
+    now = datetime.utcnow()
+    words, cum_weights = vocabulary(rng)
+    batch = []
+    for i in range(size):
+        batch.append({
+            'name': f'{rng.choice(MODIFIERS).title()} {rng.choice(MOVES).title()} {i}',
+            'style': rng.choice(STYLES),
+            'category': rng.choice(MOVES),
+            'difficulty_level': rng.randint(1, 10),
+            'description': ' '.join(sentence(rng, words, cum_weights, rng.randint(8, 20)) for _ in range(3)),
+            'instructions': ' '.join(sentence(rng, words, cum_weights, rng.randint(8, 16)) for _ in range(4)),
+            'source_url': f'https://example.com/technique/{i}',
+            'source_site': SOURCE_SITE,
+            'tags': [],
+            'view_count': 0,
+            'bookmark_count': 0,
+            'scraped_at': now,
+            'last_updated': now
+        })
+        if len(batch) == 5000 or i == size - 1:
+            db.session.execute(app.TechniqueLibrary.__table__.insert(), batch)
+            batch = []
+    db.session.commit()
+
+
+def best_time(function, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark(app, db, size, repeat, limit, keep):
+    from services.technique_search import create_technique_search_schema
+
+    TechniqueLibrary = app.TechniqueLibrary
+    rng = random.Random(42)
+
+    # Configure the mappers before the bulk insert allocates heavily
+    existing = TechniqueLibrary.query.count()
+
+    start = time.perf_counter()
+    engine = create_technique_search_schema(db)
+    populate(app, db, size, rng)
+    populate_time = time.perf_counter() - start
+
+    print(f"\n{'='*78}")
+    print(f"🔍 Technique search benchmark: {size} techniques, {engine.name}, best of {repeat}")
+    print(f"   Populate + index: {populate_time:.1f}s ({existing} techniques already present)")
+    print('='*78)
+    print(f"{'query':<26}{'ilike (ms)':>12}{'engine (ms)':>13}{'speedup':>10}{'hits':>7}  top result")
+
+    try:
+        for query in QUERIES:
+            like_time, _ = best_time(lambda: TechniqueLibrary.search(query=query, limit=limit), repeat)
+            engine_time, hits = best_time(lambda: engine.search(TechniqueLibrary, query=query, limit=limit), repeat)
+            db.session.expunge_all()
+
+            speedup = like_time / engine_time if engine_time else 0
+            top = hits[0]['name'] if hits else '-'
+            print(f"{query:<26}{like_time * 1000:>12.2f}{engine_time * 1000:>13.2f}{speedup:>9.1f}x{len(hits):>7}  {top}")
+    finally:
+        if not keep:
+            TechniqueLibrary.query.filter_by(source_site=SOURCE_SITE).delete()
+            db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /api/techniques/search')
+    parser.add_argument('--size', type=int, default=100000, help='Techniques to generate')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per query (best time is reported)')
+    parser.add_argument('--limit', type=int, default=20, help='Page size')
+    parser.add_argument('--database-url', help='Database to benchmark against (default: temporary SQLite file)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated techniques')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(temp_dir, 'search_bench.db')}"
+
+        from app import create_app, db
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            benchmark(app, db, args.size, args.repeat, args.limit, args.keep)
+
+
+if __name__ == '__main__':
+    main()
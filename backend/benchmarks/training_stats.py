@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Training statistics benchmark for DojoTracker
+Compares the former load-everything Python aggregation with the daily-rollup
+engine behind /api/training/stats
+
+Usage:
+    python benchmarks/training_stats.py                          # 1k, 10k and 100k sessions in a temp SQLite DB
+    python benchmarks/training_stats.py --sizes 1000 50000 --repeat 5
+    python benchmarks/training_stats.py --database-url postgresql://...  # Uses (and cleans up) a scratch user
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+STYLES = ['Karate', 'Brazilian Jiu-Jitsu', 'Muay Thai', 'Judo', 'Taekwondo', 'Boxing', 'Wrestling', 'Kung Fu']
+MASTERY = ['learning', 'practicing', 'competent', 'mastery']
+
+
+def python_training_stats(app, user_id, today):
+    """The former implementation: every session row loaded and aggregated in Python"""
+    TrainingSession = app.TrainingSession
+    TechniqueProgress = app.TechniqueProgress
+
+    sessions = TrainingSession.query.filter_by(user_id=user_id).all()
+    total_minutes = sum(session.duration for session in sessions)
+    intensities = [session.intensity_level for session in sessions if session.intensity_level]
+    recent_sessions = sorted(sessions, key=lambda x: x.date, reverse=True)[:10]
+    week_sessions = [s for s in sessions if s.date >= today - timedelta(days=7)]
+    month_sessions = [s for s in sessions if s.date >= today - timedelta(days=30)]
+
+    techniques = TechniqueProgress.query.filter_by(user_id=user_id).all()
+    breakdown = {}
+    for technique in techniques:
+        breakdown[technique.mastery_status] = breakdown.get(technique.mastery_status, 0) + 1
+
+    return {
+        'total_sessions': len(sessions),
+        'total_hours': round(total_minutes / 60, 2),
+        'avg_intensity': round(sum(intensities) / len(intensities), 1) if intensities else 0,
+        'styles_practiced': sorted(set(session.style for session in sessions)),
+        'this_week': {'sessions': len(week_sessions), 'hours': round(sum(s.duration for s in week_sessions) / 60, 2)},
+        'this_month': {'sessions': len(month_sessions), 'hours': round(sum(s.duration for s in month_sessions) / 60, 2)},
+        'recent_sessions': [session.to_dict() for session in recent_sessions],
+        'technique_stats': {'total_techniques': len(techniques), 'mastery_breakdown': breakdown}
+    }
+
+
+def create_user(app, db, label):
+    user = app.User(
+        email=f'bench-{label}-{int(time.time() * 1000)}@example.com',
+        username=f'bench_{label}_{int(time.time() * 1000)}',
+        password='benchmark-password',
+        first_name='Bench',
+        last_name=label
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def populate(app, db, user_id, session_count, today, rng):
+    """Bulk insert sessions spread over ~5 years plus some technique progress"""
+    now = datetime.utcnow()
+    batch = []
+    for i in range(session_count):
+        batch.append({
+            'user_id': user_id,
+            'date': today - timedelta(days=rng.randint(0, 5 * 365)),
+            'duration': rng.randint(20, 150),
+            'style': rng.choice(STYLES),
+            'techniques_practiced': [],
+            'intensity_level': rng.randint(1, 10),
+            'created_at': now,
+            'updated_at': now
+        })
+        if len(batch) == 5000 or i == session_count - 1:
+            db.session.execute(app.TrainingSession.__table__.insert(), batch)
+            batch = []
+
+    db.session.execute(app.TechniqueProgress.__table__.insert(), [{
+        'user_id': user_id,
+        'technique_name': f'Technique {i}',
+        'style': rng.choice(STYLES),
+        'proficiency_level': rng.randint(1, 10),
+        'practice_count': 0,
+        'mastery_status': rng.choice(MASTERY),
+        'created_at': now,
+        'updated_at': now
+    } for i in range(200)])
+    db.session.commit()
+
+
+def best_time(function, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark(app, db, sizes, repeat, keep):
+    from services.training_stats import compute_training_stats
+    from services.training_rollup import get_training_rollup_service
+
+    rng = random.Random(42)
+    today = date.today()
+
+    print(f"\n{'='*74}")
+    print(f"📊 Training statistics benchmark (best of {repeat})")
+    print('='*74)
+    print(f"{'sessions':>10}{'backfill (s)':>14}{'python (s)':>12}{'rollup (s)':>12}{'speedup':>10}  result")
+
+    for size in sizes:
+        user_id = create_user(app, db, str(size))
+        try:
+            populate(app, db, user_id, size, today, rng)
+            # Bulk inserts bypass the session routes that maintain the rollup
+            backfill_time, _ = best_time(lambda: get_training_rollup_service().backfill(user_id), 1)
+
+            python_time, expected = best_time(lambda: python_training_stats(app, user_id, today), repeat)
+            sql_time, actual = best_time(lambda: compute_training_stats(user_id, today=today), repeat)
+            db.session.expunge_all()
+
+            speedup = python_time / sql_time if sql_time else 0
+            note = '✅ same' if actual == expected else '⚠️ differs'
+            print(f"{size:>10}{backfill_time:>14.3f}{python_time:>12.3f}{sql_time:>12.4f}{speedup:>9.1f}x  {note}")
+        finally:
+            if not keep:
+                app.TrainingDailyRollup.query.filter_by(user_id=user_id).delete()
+                app.TrainingSession.query.filter_by(user_id=user_id).delete()
+                app.TechniqueProgress.query.filter_by(user_id=user_id).delete()
+                app.User.query.filter_by(id=user_id).delete()
+                db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /api/training/stats aggregation')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Sessions per user')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation (best time is reported)')
+    parser.add_argument('--database-url', help='Database to benchmark against (default: temporary SQLite file)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated users and sessions')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(temp_dir, 'stats_bench.db')}"
+
+        from app import create_app, db
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            benchmark(app, db, args.sizes, args.repeat, args.keep)
+
+
+if __name__ == '__main__':
+    main()
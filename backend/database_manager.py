@@ -259,6 +259,8 @@ def clean_test_data():
             TrainingSession = app.TrainingSession
             UserTechniqueBookmark = app.UserTechniqueBookmark
             TechniqueProgress = app.TechniqueProgress
+            TrainingDailyRollup = app.TrainingDailyRollup
+            TrainingContextSnapshot = app.TrainingContextSnapshot
             
             # Find test users (emails containing 'test' or 'demo')
             test_users = User.query.filter(
@@ -307,6 +309,10 @@ def clean_test_data():
                     db.session.delete(progress)
                     deleted_progress += 1
                 
+                # Delete derived training aggregates
+                TrainingDailyRollup.query.filter_by(user_id=user.id).delete()
+                TrainingContextSnapshot.query.filter_by(user_id=user.id).delete()
+                
                 # Delete user
                 db.session.delete(user)
             
@@ -402,14 +408,71 @@ def export_data():
     
     return True
 
+def backfill_rollups(user_id=None):
+    """Rebuild the daily training rollup from training sessions"""
+    print_header("BACKFILLING DAILY TRAINING ROLLUP")
+    
+    app = create_app_context()
+    
+    with app.app_context():
+        from app import db
+        from services.training_rollup import get_training_rollup_service
+        
+        try:
+            db.create_all()
+            scope = f"user {user_id}" if user_id is not None else "all users"
+            print(f"🔄 Rebuilding rollup rows for {scope}...")
+            
+            rows = get_training_rollup_service().backfill(user_id)
+            print_step(f"Wrote {rows} rollup rows")
+            
+            # Training context snapshots are built from the rollup
+            snapshots = app.TrainingContextSnapshot.query
+            if user_id is not None:
+                snapshots = snapshots.filter_by(user_id=user_id)
+            snapshots.update({'data': None}, synchronize_session=False)
+            db.session.commit()
+            print_step("Marked training context snapshots for rebuild")
+            
+        except Exception as e:
+            db.session.rollback()
+            print_step("Rollup backfill failed", False, str(e))
+            return False
+    
+    return True
+
+def rebuild_search():
+    """Create (if missing) and rebuild the technique library full-text index"""
+    print_header("REBUILDING TECHNIQUE SEARCH INDEX")
+    
+    app = create_app_context()
+    
+    with app.app_context():
+        from app import db
+        from services.technique_search import create_technique_search_schema
+        
+        try:
+            db.create_all()
+            engine = create_technique_search_schema(db)
+            engine.rebuild()
+            print_step(f"Rebuilt {engine.name} index for {app.TechniqueLibrary.query.count()} techniques")
+            
+        except Exception as e:
+            print_step("Search index rebuild failed", False, str(e))
+            return False
+    
+    return True
+
 def main():
     """Main function with command line interface"""
     import argparse
     
     parser = argparse.ArgumentParser(description='DojoTracker Database Manager')
     parser.add_argument('command', choices=[
-        'inspect', 'reset', 'backup', 'restore', 'clean-test', 'export'
+        'inspect', 'reset', 'backup', 'restore', 'clean-test', 'export', 'backfill-rollups',
+        'rebuild-search'
     ], help='Database operation to perform')
+    parser.add_argument('--user-id', type=int, help='Limit backfill-rollups to one user')
     
     args = parser.parse_args()
     
@@ -428,6 +491,10 @@ def main():
         clean_test_data()
     elif args.command == 'export':
         export_data()
+    elif args.command == 'backfill-rollups':
+        backfill_rollups(args.user_id)
+    elif args.command == 'rebuild-search':
+        rebuild_search()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
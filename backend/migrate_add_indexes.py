@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the composite indexes declared on the models
+and the technique library full-text index
+Safe to re-run: indexes that already exist are skipped
+
+Usage:
+    python migrate_add_indexes.py             # Create missing indexes (CONCURRENTLY on PostgreSQL)
+    python migrate_add_indexes.py --dry-run   # Only list what is missing
+    python migrate_add_indexes.py --blocking  # Plain CREATE INDEX, e.g. inside a maintenance window
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+
+def migrate(dry_run=False, concurrently=True):
+    from app import create_app, db
+    from services.technique_search import SEARCH_ENGINES, create_technique_search_schema
+    from utils.schema import add_missing_indexes, missing_indexes
+
+    app = create_app()
+    with app.app_context():
+        print(f"🗄️ Database: {db.engine.url.render_as_string(hide_password=True)}")
+
+        missing = missing_indexes(db)
+        search_engine = SEARCH_ENGINES.get(db.engine.dialect.name)
+        search_missing = search_engine is not None and not search_engine(db).schema_ready()
+        if not missing and not search_missing:
+            print("✅ All declared indexes exist")
+            return True
+
+        if missing:
+            print(f"📋 {len(missing)} missing indexes:")
+        for table_name, index in missing:
+            columns = ', '.join(column.name for column in index.columns)
+            print(f"   • {index.name} ON {table_name} ({columns})")
+        if search_missing:
+            print(f"📋 Technique search index missing ({search_engine.name})")
+
+        if dry_run:
+            return True
+
+        try:
+            created = add_missing_indexes(db, concurrently=concurrently)
+            print(f"✅ Created {len(created)} indexes")
+
+            if search_missing:
+                # On PostgreSQL the generated search_vector column rewrites technique_library
+                engine = create_technique_search_schema(db, concurrently=concurrently)
+                print(f"✅ Technique search index created ({engine.name})")
+
+            # Fresh statistics so the planner considers the new indexes straight away.
+            # SQLite is left without sqlite_stat1, where the planner assumes large
+            # tables and prefers indexes; statistics of a small dev DB would not
+            if db.engine.dialect.name == 'postgresql':
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql('ANALYZE')
+                print("✅ Table statistics updated")
+            return True
+        except Exception as e:
+            print(f"❌ Index migration failed: {e}")
+            return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create missing composite indexes')
+    parser.add_argument('--dry-run', action='store_true', help='List missing indexes without creating them')
+    parser.add_argument('--blocking', action='store_true', help='Do not use CREATE INDEX CONCURRENTLY on PostgreSQL')
+
+    args = parser.parse_args()
+    success = migrate(dry_run=args.dry_run, concurrently=not args.blocking)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == '__main__':
+    main()
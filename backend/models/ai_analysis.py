@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 
 def create_ai_analysis_models(db):
@@ -12,6 +12,11 @@ def create_ai_analysis_models(db):
         Main analysis results for a video
         """
         __tablename__ = 'video_analyses'
+        __table_args__ = (
+            Index('ix_video_analyses_video_started', 'video_id', 'started_at'),
+            Index('ix_video_analyses_user_status_completed', 'user_id', 'analysis_status', 'completed_at'),
+            Index('ix_video_analyses_user_technique', 'user_id', 'technique_name', 'martial_art_style'),
+        )
         
         id = Column(Integer, primary_key=True)
         
@@ -31,6 +36,7 @@ def create_ai_analysis_models(db):
         # Analysis context
         technique_name = Column(String(100), nullable=True)
         martial_art_style = Column(String(50), nullable=True)
+        batch_id = Column(Integer, ForeignKey('analysis_batches.id'), nullable=True, index=True)  # Set when started by a batch
         
         # Overall results
         overall_score = Column(Float, nullable=True)  # 0-10 scale
@@ -40,6 +46,7 @@ def create_ai_analysis_models(db):
         # Detailed scores (stored as JSON for flexibility)
         detailed_scores = Column(JSON, nullable=True)
         # Example: {"form_analysis": 8.5, "timing_and_flow": 7.2, ...}
+        pose_metrics = Column(JSON, nullable=True)  # Measured joint angles (services/pose_estimation.py)
         
         # Analysis content (stored as JSON)
         strengths = Column(JSON, nullable=True)  # List of strengths
@@ -74,10 +81,12 @@ def create_ai_analysis_models(db):
                 'frames_analyzed': self.frames_analyzed,
                 'technique_name': self.technique_name,
                 'martial_art_style': self.martial_art_style,
+                'batch_id': self.batch_id,
                 'overall_score': self.overall_score,
                 'technique_identified': self.technique_identified,
                 'identified_style': self.identified_style,
                 'detailed_scores': self.detailed_scores,
+                'pose_metrics': self.pose_metrics,
                 'strengths': self.strengths,
                 'areas_for_improvement': self.areas_for_improvement,
                 'coaching_tips': self.coaching_tips,
@@ -86,6 +95,24 @@ def create_ai_analysis_models(db):
                 'error_message': self.error_message
             }
         
+        def apply_results(self, results):
+            """Copy a successful AIVideoAnalysisService result onto this analysis"""
+            self.analysis_status = 'completed'
+            self.completed_at = datetime.utcnow()
+            self.error_message = None
+            self.overall_score = results.get('overall_score')
+            self.technique_identified = results.get('technique_identified')
+            self.identified_style = results.get('martial_art_style')
+            self.detailed_scores = results.get('detailed_scores')
+            self.pose_metrics = results.get('pose_metrics')
+            self.strengths = results.get('strengths')
+            self.areas_for_improvement = results.get('areas_for_improvement')
+            self.coaching_tips = results.get('coaching_tips')
+            self.safety_considerations = results.get('safety_considerations')
+            self.next_steps = results.get('next_steps')
+            self.frames_analyzed = results.get('frames_analyzed', 0)
+            self.raw_ai_response = results.get('raw_response')
+        
         def get_summary_text(self):
             """Generate human-readable summary"""
             if self.analysis_status != 'completed' or not self.overall_score:
@@ -205,5 +232,123 @@ def create_ai_analysis_models(db):
                 return ((self.latest_score - self.first_score) / self.first_score) * 100
             return 0
 
+    class AnalysisJob(db.Model):
+        """
+        Durable queue entry for running a VideoAnalysis in a worker process
+        """
+        __tablename__ = 'analysis_jobs'
+        
+        id = Column(Integer, primary_key=True)
+        analysis_id = Column(Integer, ForeignKey('video_analyses.id'), nullable=False, index=True)
+        video_id = Column(Integer, ForeignKey('training_videos.id'), nullable=False)
+        user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+        
+        # Queue state
+        status = Column(String(20), default='queued', index=True)  # queued, running, completed, failed
+        priority = Column(Integer, default=0)  # Higher runs first
+        attempts = Column(Integer, default=0)
+        max_attempts = Column(Integer, default=3)
+        run_after = Column(DateTime, default=datetime.utcnow, index=True)  # Backoff: not claimable before this
+        
+        # Lease held by the worker currently running the job
+        lease_owner = Column(String(100), nullable=True)
+        lease_expires_at = Column(DateTime, nullable=True)
+        heartbeat_at = Column(DateTime, nullable=True)
+        
+        # Job input and outcome
+        payload = Column(JSON, nullable=True)  # technique_name, martial_art_style, video_path
+        progress = Column(JSON, nullable=True)  # Current stage reported by the worker: stage, current, total, message
+        last_error = Column(Text, nullable=True)
+        
+        created_at = Column(DateTime, default=datetime.utcnow)
+        updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+        
+        analysis = relationship("VideoAnalysis", foreign_keys=[analysis_id])
+        
+        def __repr__(self):
+            return f'<AnalysisJob {self.id}: analysis {self.analysis_id} - {self.status}>'
+        
+        def to_dict(self):
+            return {
+                'id': self.id,
+                'analysis_id': self.analysis_id,
+                'video_id': self.video_id,
+                'status': self.status,
+                'priority': self.priority,
+                'attempts': self.attempts,
+                'max_attempts': self.max_attempts,
+                'run_after': self.run_after.isoformat() if self.run_after else None,
+                'lease_owner': self.lease_owner,
+                'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+                'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+                'progress': self.progress,
+                'last_error': self.last_error,
+                'created_at': self.created_at.isoformat() if self.created_at else None
+            }
+
+    class AnalysisBatch(db.Model):
+        """
+        A group of analyses started together (e.g. a whole class's videos)
+        """
+        __tablename__ = 'analysis_batches'
+        
+        id = Column(Integer, primary_key=True)
+        user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+        name = Column(String(200), nullable=True)
+        
+        # How the videos were chosen and what was left out
+        filters = Column(JSON, nullable=True)  # video_ids or style/technique/analysis_status filter
+        total_analyses = Column(Integer, default=0)
+        skipped = Column(JSON, nullable=True)  # [{'video_id': ..., 'reason': ...}]
+        
+        created_at = Column(DateTime, default=datetime.utcnow)
+        
+        def __repr__(self):
+            return f'<AnalysisBatch {self.id}: {self.total_analyses} analyses>'
+        
+        def to_dict(self):
+            return {
+                'id': self.id,
+                'name': self.name,
+                'filters': self.filters,
+                'total_analyses': self.total_analyses,
+                'skipped': self.skipped or [],
+                'created_at': self.created_at.isoformat() if self.created_at else None
+            }
+
+    class AnalysisCacheEntry(db.Model):
+        """
+        Cached AI analysis result, addressed by video content + prompt + model
+        """
+        __tablename__ = 'analysis_cache'
+        
+        id = Column(Integer, primary_key=True)
+        cache_key = Column(String(64), unique=True, nullable=False, index=True)  # sha256 hex
+        video_hash = Column(String(64), nullable=False, index=True)
+        ai_model = Column(String(50), nullable=False)
+        
+        results = Column(JSON, nullable=False)
+        size_bytes = Column(Integer, default=0)  # Serialized size, used for size-based eviction
+        hit_count = Column(Integer, default=0)
+        
+        created_at = Column(DateTime, default=datetime.utcnow)
+        last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+        
+        def __repr__(self):
+            return f'<AnalysisCacheEntry {self.cache_key[:12]}: {self.hit_count} hits>'
+
+    class AnalysisCacheStat(db.Model):
+        """
+        Named counters for the analysis cache (hits, misses, evictions)
+        """
+        __tablename__ = 'analysis_cache_stats'
+        
+        name = Column(String(50), primary_key=True)
+        value = Column(Integer, default=0)
+        
+        def __repr__(self):
+            return f'<AnalysisCacheStat {self.name}={self.value}>'
+
     # Return all models
-    return VideoAnalysis, AnalysisFeedback, AnalysisProgress
\ No newline at end of file
+    return (VideoAnalysis, AnalysisFeedback, AnalysisProgress, AnalysisJob, AnalysisBatch,
+            AnalysisCacheEntry, AnalysisCacheStat)
\ No newline at end of file
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+def create_chat_models(db):
+    """Factory function to create AI coach chat models with provided db instance"""
+
+    class ChatConversation(db.Model):
+        """A user's conversation with the AI coach"""
+        __tablename__ = 'chat_conversations'
+
+        id = db.Column(db.Integer, primary_key=True)
+        user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+        title = db.Column(db.String(200))
+        message_count = db.Column(db.Integer, default=0, nullable=False)
+
+        # Rolling summary of the turns that no longer go into the prompt verbatim
+        summary = db.Column(db.Text)
+        summarized_through_id = db.Column(db.Integer, default=0, nullable=False)  # Last ChatMessage.id in the summary
+
+        created_at = db.Column(db.DateTime, default=datetime.utcnow)
+        updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+        # Relationships
+        messages = db.relationship('ChatMessage', backref='conversation', lazy='dynamic', cascade='all, delete-orphan')
+
+        # Conversation lists are per user, most recent first
+        __table_args__ = (db.Index('ix_chat_conversations_user_updated', 'user_id', 'updated_at'),)
+
+        def to_dict(self):
+            return {
+                'id': self.id,
+                'title': self.title,
+                'message_count': self.message_count,
+                'has_summary': bool(self.summary),
+                'created_at': self.created_at.isoformat() if self.created_at else None,
+                'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            }
+
+    class ChatMessage(db.Model):
+        """One message of an AI coach conversation"""
+        __tablename__ = 'chat_messages'
+
+        id = db.Column(db.Integer, primary_key=True)
+        conversation_id = db.Column(db.Integer, db.ForeignKey('chat_conversations.id'), nullable=False)
+        role = db.Column(db.String(20), nullable=False)  # 'user' or 'assistant'
+        content = db.Column(db.Text, nullable=False)
+        created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+        # Messages are always read per conversation in id order
+        __table_args__ = (db.Index('ix_chat_messages_conversation_id', 'conversation_id', 'id'),)
+
+        def to_dict(self):
+            return {
+                'id': self.id,
+                'conversation_id': self.conversation_id,
+                'role': self.role,
+                'content': self.content,
+                'created_at': self.created_at.isoformat() if self.created_at else None
+            }
+
+    return ChatConversation, ChatMessage
@@ -4,6 +4,26 @@ from sqlalchemy import text
 def create_technique_models(db):
     """Create technique library models with the provided db instance"""
     
+    class TechniqueTag(db.Model):
+        """One row per technique and tag, mirroring TechniqueLibrary.tags for indexed tag queries"""
+        __tablename__ = 'technique_tags'
+        __table_args__ = (
+            db.Index('ix_technique_tags_technique', 'technique_id'),
+            {'extend_existing': True}  # Allow table redefinition
+        )
+        
+        # (tag, technique_id) primary key: tag lookups are index range scans
+        tag = db.Column(db.String(50), primary_key=True)  # Normalised (lower-case) tag
+        technique_id = db.Column(db.Integer, db.ForeignKey('technique_library.id', ondelete='CASCADE'), primary_key=True)
+        
+        @staticmethod
+        def normalize(tag):
+            """Lookup key for a tag: trimmed, single-spaced, lower-case"""
+            return ' '.join(str(tag).split()).lower()[:50]
+        
+        def __repr__(self):
+            return f'<TechniqueTag {self.tag} Technique:{self.technique_id}>'
+    
     class TechniqueLibrary(db.Model):
         __tablename__ = 'technique_library'
         __table_args__ = {'extend_existing': True}  # Allow table redefinition
@@ -32,6 +52,9 @@ def create_technique_models(db):
         view_count = db.Column(db.Integer, default=0)
         bookmark_count = db.Column(db.Integer, default=0)
         
+        # Normalised copy of tags; always written through set_tags
+        tag_rows = db.relationship(TechniqueTag, cascade='all, delete-orphan')
+        
         def __init__(self, name, style, **kwargs):
             self.name = name
             self.style = style
@@ -44,7 +67,22 @@ def create_technique_models(db):
             self.variations = kwargs.get('variations')
             self.source_url = kwargs.get('source_url')
             self.source_site = kwargs.get('source_site', 'BlackBeltWiki')
-            self.tags = kwargs.get('tags', [])
+            self.set_tags(kwargs.get('tags', []))
+        
+        def set_tags(self, tags):
+            """Set tags and keep technique_tags in step"""
+            self.tags = list(tags or [])
+            self.sync_tag_rows()
+        
+        def sync_tag_rows(self):
+            """Bring technique_tags in line with the tags column (only changed tags are written)"""
+            keys = {TechniqueTag.normalize(tag) for tag in self.tags or []}
+            keys.discard('')
+            
+            self.tag_rows = [row for row in self.tag_rows if row.tag in keys]
+            existing = {row.tag for row in self.tag_rows}
+            for key in sorted(keys - existing):
+                self.tag_rows.append(TechniqueTag(tag=key))
         
         def increment_view_count(self):
             """Increment view count"""
@@ -84,16 +122,14 @@ def create_technique_models(db):
             db.session.commit()
         
         @staticmethod
-        def search(query=None, style=None, category=None, difficulty=None, tags=None, limit=50):
-            """Search techniques with filters"""
-            filters = []
+        def filter_conditions(style=None, category=None, difficulty=None, tags=None, tag_mode='all'):
+            """
+            Filter conditions shared by search and the full-text engines
             
-            if query:
-                filters.append(db.or_(
-                    TechniqueLibrary.name.ilike(f'%{query}%'),
-                    TechniqueLibrary.description.ilike(f'%{query}%'),
-                    TechniqueLibrary.instructions.ilike(f'%{query}%')
-                ))
+            Tags are matched through technique_tags: tag_mode 'all' requires
+            every tag, 'any' at least one.
+            """
+            filters = []
             
             if style:
                 filters.append(TechniqueLibrary.style.ilike(f'%{style}%'))
@@ -105,8 +141,52 @@ def create_technique_models(db):
                 filters.append(TechniqueLibrary.difficulty_level == difficulty)
             
             if tags:
-                for tag in tags:
-                    filters.append(TechniqueLibrary.tags.contains([tag]))
+                keys = sorted({TechniqueTag.normalize(tag) for tag in tags} - {''})
+                tagged = db.select(TechniqueTag.technique_id).where(TechniqueTag.tag.in_(keys))
+                if tag_mode == 'all' and len(keys) > 1:
+                    tagged = tagged.group_by(TechniqueTag.technique_id).having(db.func.count() == len(keys))
+                filters.append(TechniqueLibrary.id.in_(tagged))
+            
+            return filters
+        
+        @staticmethod
+        def tag_facets(conditions=None, limit=50):
+            """(tag, technique count) pairs over techniques matching filter_conditions(), most used first"""
+            count = db.func.count(TechniqueTag.technique_id)
+            query = db.session.query(TechniqueTag.tag, count)
+            if conditions:
+                query = query.join(TechniqueLibrary, TechniqueLibrary.id == TechniqueTag.technique_id).filter(*conditions)
+            return query.group_by(TechniqueTag.tag).order_by(count.desc(), TechniqueTag.tag).limit(limit).all()
+        
+        @staticmethod
+        def backfill_tags(batch_size=500):
+            """Fill technique_tags from the tags column, for rows written before the table existed"""
+            synced = 0
+            last_id = 0
+            while True:
+                techniques = TechniqueLibrary.query.filter(TechniqueLibrary.id > last_id).order_by(
+                    TechniqueLibrary.id
+                ).limit(batch_size).all()
+                if not techniques:
+                    break
+                for technique in techniques:
+                    technique.sync_tag_rows()
+                    synced += 1
+                last_id = techniques[-1].id
+                db.session.commit()
+            return synced
+        
+        @staticmethod
+        def search(query=None, style=None, category=None, difficulty=None, tags=None, limit=50):
+            """Search techniques with filters (substring matching; see services.technique_search for ranked search)"""
+            filters = TechniqueLibrary.filter_conditions(style=style, category=category, difficulty=difficulty, tags=tags)
+            
+            if query:
+                filters.append(db.or_(
+                    TechniqueLibrary.name.ilike(f'%{query}%'),
+                    TechniqueLibrary.description.ilike(f'%{query}%'),
+                    TechniqueLibrary.instructions.ilike(f'%{query}%')
+                ))
             
             query_obj = TechniqueLibrary.query
             if filters:
@@ -131,6 +211,7 @@ def create_technique_models(db):
         __tablename__ = 'user_technique_bookmarks'
         __table_args__ = (
             db.UniqueConstraint('user_id', 'technique_id', name='unique_user_technique_bookmark'),
+            db.Index('ix_user_technique_bookmarks_user_updated', 'user_id', 'updated_at'),
             {'extend_existing': True}  # Allow table redefinition
         )
         
@@ -268,4 +349,4 @@ def create_technique_models(db):
         def __repr__(self):
             return f'<TechniqueCategory {self.name}>'
 
-    return TechniqueLibrary, UserTechniqueBookmark, TechniqueCategory
\ No newline at end of file
+    return TechniqueLibrary, UserTechniqueBookmark, TechniqueCategory, TechniqueTag
\ No newline at end of file
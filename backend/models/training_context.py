@@ -0,0 +1,17 @@
+from datetime import datetime
+
+def create_training_context_models(db):
+    """Factory function to create the training context snapshot model with provided db instance"""
+
+    class TrainingContextSnapshot(db.Model):
+        """Materialised per-user training context shared by the AI endpoints"""
+        __tablename__ = 'training_context_snapshots'
+
+        user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+        version = db.Column(db.Integer, nullable=False)  # Snapshot layout version, older ones are rebuilt
+        data = db.Column(db.JSON, nullable=True)  # None marks the snapshot stale
+
+        created_at = db.Column(db.DateTime, default=datetime.utcnow)
+        updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    return TrainingContextSnapshot
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+def create_training_rollup_models(db):
+    """Factory function to create the daily training rollup model with provided db instance"""
+
+    class TrainingDailyRollup(db.Model):
+        """Per user, day and style totals of training sessions"""
+        __tablename__ = 'training_daily_rollup'
+
+        id = db.Column(db.Integer, primary_key=True)
+        user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+        date = db.Column(db.Date, nullable=False)
+        style = db.Column(db.String(50), nullable=False)
+
+        session_count = db.Column(db.Integer, nullable=False, default=0)
+        minutes = db.Column(db.Integer, nullable=False, default=0)
+        intensity_sum = db.Column(db.Integer, nullable=False, default=0)
+        intensity_count = db.Column(db.Integer, nullable=False, default=0)  # Sessions with an intensity rating
+        calories = db.Column(db.Integer, nullable=False, default=0)
+
+        updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+        # One row per (user, day, style); dashboards scan a user's date range
+        __table_args__ = (
+            db.UniqueConstraint('user_id', 'date', 'style', name='unique_user_date_style_rollup'),
+            db.Index('ix_training_daily_rollup_user_date', 'user_id', 'date'),
+        )
+
+        def to_dict(self):
+            return {
+                'date': self.date.isoformat() if self.date else None,
+                'style': self.style,
+                'sessions': self.session_count,
+                'minutes': self.minutes,
+                'avg_intensity': round(self.intensity_sum / self.intensity_count, 1) if self.intensity_count else 0,
+                'calories': self.calories
+            }
+
+    return TrainingDailyRollup
@@ -95,12 +95,14 @@ def create_models(db):
         def get_training_stats(self):
             """Get user's training statistics"""
             from sqlalchemy import func
+            from flask import current_app
             
-            # Get session count and total hours
+            # Get session count and total hours from the daily rollup
+            TrainingDailyRollup = current_app.TrainingDailyRollup
             session_stats = db.session.query(
-                func.count(TrainingSession.id).label('session_count'),
-                func.coalesce(func.sum(TrainingSession.duration), 0).label('total_minutes')
-            ).filter_by(user_id=self.id).first()
+                func.coalesce(func.sum(TrainingDailyRollup.session_count), 0).label('session_count'),
+                func.coalesce(func.sum(TrainingDailyRollup.minutes), 0).label('total_minutes')
+            ).filter(TrainingDailyRollup.user_id == self.id).first()
             
             # Get technique count
             technique_count = TechniqueProgress.query.filter_by(user_id=self.id).count()
@@ -257,7 +259,13 @@ def create_models(db):
 
     class TrainingSession(db.Model):
         __tablename__ = 'training_sessions'
-        __table_args__ = {'extend_existing': True}  # ADDED: This fixes the duplicate table error
+        __table_args__ = (
+            # Session lists page by (date, id) within a user
+            db.Index('ix_training_sessions_user_date', 'user_id', 'date', 'id'),
+            db.Index('ix_training_sessions_user_style_date', 'user_id', 'style', 'date'),
+            db.Index('ix_training_sessions_user_created', 'user_id', 'created_at'),  # AI insight timeframes
+            {'extend_existing': True}  # ADDED: This fixes the duplicate table error
+        )
         
         id = db.Column(db.Integer, primary_key=True)
         user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -364,6 +372,9 @@ def create_models(db):
         # FIXED: Ensure unique technique per user per style AND allow extending table
         __table_args__ = (
             db.UniqueConstraint('user_id', 'technique_name', 'style', name='unique_user_technique_style'),
+            # The unique constraint serves user_id lookups ordered by technique_name
+            db.Index('ix_technique_progress_user_style_name', 'user_id', 'style', 'technique_name'),
+            db.Index('ix_technique_progress_user_status', 'user_id', 'mastery_status'),
             {'extend_existing': True}  # ADDED: This fixes the duplicate table error
         )
         
@@ -444,7 +455,13 @@ def create_models(db):
         
     class TrainingVideo(db.Model):
         __tablename__ = 'training_videos'
-        __table_args__ = {'extend_existing': True}
+        __table_args__ = (
+            # Video lists page by (created_at, id) within a user
+            db.Index('ix_training_videos_user_created', 'user_id', 'created_at', 'id'),
+            db.Index('ix_training_videos_user_style', 'user_id', 'style', 'created_at'),
+            db.Index('ix_training_videos_user_status', 'user_id', 'analysis_status'),
+            {'extend_existing': True}
+        )
         
         id = db.Column(db.Integer, primary_key=True)
         user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -455,6 +472,12 @@ def create_models(db):
         file_path = db.Column(db.String(500), nullable=False)
         file_size = db.Column(db.Integer, nullable=False)  # Size in bytes
         duration = db.Column(db.Float, nullable=True)  # Duration in seconds
+        width = db.Column(db.Integer, nullable=True)  # Source resolution
+        height = db.Column(db.Integer, nullable=True)
+        video_codec = db.Column(db.String(50), nullable=True)  # Source codec, e.g. h264, hevc
+        hls_playlist_path = db.Column(db.String(500), nullable=True)  # Master playlist once transcoded
+        content_hash = db.Column(db.String(64), nullable=True, index=True)  # sha256 of the file contents
+        assets_path = db.Column(db.String(500), nullable=True)  # Poster, sprite sheet and keyframes
         
         # Video metadata
         title = db.Column(db.String(200), nullable=True)
@@ -463,7 +486,7 @@ def create_models(db):
         style = db.Column(db.String(50), nullable=True)
         
         # Analysis and processing status
-        upload_status = db.Column(db.String(20), default='uploaded')  # uploaded, processing, analyzed, error
+        upload_status = db.Column(db.String(20), default='uploaded')  # uploaded, processing, ready, analyzed, error
         analysis_status = db.Column(db.String(20), default='pending')  # pending, processing, completed, failed
         analysis_results = db.Column(db.JSON, nullable=True)  # Store AI analysis results
         analysis_score = db.Column(db.Float, nullable=True)  # Overall technique score
@@ -485,6 +508,9 @@ def create_models(db):
         technique_progress = db.relationship('TechniqueProgress', backref='videos')
         training_session = db.relationship('TrainingSession', backref='videos')
         
+        # Callables(video, status) notified once a set_processing_status change is saved (e.g. the HLS transcoder)
+        status_listeners = []
+        
         def __init__(self, user_id, filename, original_filename, file_path, file_size, **kwargs):
             self.user_id = user_id
             self.filename = filename
@@ -492,6 +518,7 @@ def create_models(db):
             self.file_path = file_path
             self.file_size = file_size
             self.duration = kwargs.get('duration')
+            self.content_hash = kwargs.get('content_hash')
             self.title = kwargs.get('title')
             self.description = kwargs.get('description')
             self.technique_name = kwargs.get('technique_name')
@@ -512,6 +539,10 @@ def create_models(db):
                 'file_size_mb': round(self.file_size / (1024 * 1024), 2),
                 'duration': self.duration,
                 'duration_formatted': self.format_duration() if self.duration else None,
+                'width': self.width,
+                'height': self.height,
+                'resolution': f'{self.width}x{self.height}' if self.width and self.height else None,
+                'video_codec': self.video_codec,
                 'title': self.title,
                 'description': self.description,
                 'technique_name': self.technique_name,
@@ -525,7 +556,10 @@ def create_models(db):
                 'training_session_id': self.training_session_id,
                 'created_at': self.created_at.isoformat() if self.created_at else None,
                 'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-                'file_url': f'/api/training/videos/{self.id}/file'  # URL to access video file
+                'file_url': f'/api/training/videos/{self.id}/file',  # URL to access video file
+                'hls_url': f'/api/training/videos/{self.id}/hls/master.m3u8' if self.hls_playlist_path else None,
+                'thumbnail_url': f'/api/training/videos/{self.id}/thumbnail' if self.assets_path else None,
+                'assets_url': f'/api/training/videos/{self.id}/assets' if self.assets_path else None
             }
             
             if include_analysis and self.analysis_results:
@@ -549,12 +583,35 @@ def create_models(db):
             self.analysis_status = 'completed'
             self.updated_at = datetime.utcnow()
         
+        def apply_transcode_result(self, result):
+            """Store probe metadata and the HLS playlist produced by the transcoder"""
+            self.duration = result.get('duration')
+            self.width = result.get('width')
+            self.height = result.get('height')
+            self.video_codec = result.get('codec')
+            self.hls_playlist_path = result.get('playlist')
+            self.updated_at = datetime.utcnow()
+        
         def set_processing_status(self, status):
-            """Set processing status"""
-            valid_statuses = ['uploaded', 'processing', 'analyzed', 'error']
+            """Set processing status; status listeners are notified after save() commits it"""
+            valid_statuses = ['uploaded', 'processing', 'ready', 'analyzed', 'error']
             if status in valid_statuses:
                 self.upload_status = status
                 self.updated_at = datetime.utcnow()
+                self._pending_status = status
+        
+        def _notify_status_listeners(self):
+            """Run listeners for a committed status change, so their callbacks never race the commit"""
+            status = getattr(self, '_pending_status', None)
+            self._pending_status = None
+            if status is None:
+                return
+            
+            for listener in TrainingVideo.status_listeners:
+                try:
+                    listener(self, status)
+                except Exception as e:
+                    print(f"Warning: Video status listener failed for video {self.id}: {e}")
         
         def set_analysis_status(self, status):
             """Set analysis status"""
@@ -564,20 +621,28 @@ def create_models(db):
                 self.updated_at = datetime.utcnow()
         
         def save(self):
-            """Save video to database"""
+            """Save video to database, then notify listeners of a status change"""
             db.session.add(self)
             db.session.commit()
+            self._notify_status_listeners()
         
         def delete(self):
             """Delete video and its file"""
             import os
-            # Delete physical file
+            from services.video_storage import get_storage_for
+            # Delete the stored original (local file or object in the bucket)
             try:
-                if os.path.exists(self.file_path):
-                    os.remove(self.file_path)
+                get_storage_for(self.file_path).delete(self.file_path)
             except Exception as e:
                 print(f"Warning: Could not delete video file {self.file_path}: {e}")
             
+            # Delete HLS renditions and derived assets
+            import shutil
+            if self.hls_playlist_path:
+                shutil.rmtree(os.path.dirname(self.hls_playlist_path), ignore_errors=True)
+            if self.assets_path:
+                shutil.rmtree(self.assets_path, ignore_errors=True)
+            
             # Delete database record
             db.session.delete(self)
             db.session.commit()
@@ -602,9 +667,18 @@ def create_models(db):
         @staticmethod
         def get_user_video_stats(user_id):
             """Get video statistics for a user"""
-            videos = TrainingVideo.query.filter_by(user_id=user_id).all()
+            from sqlalchemy import func, case
+            
+            analyzed = db.and_(TrainingVideo.analysis_status == 'completed', TrainingVideo.analysis_score != 0)
+            total_videos, total_size, total_duration, analyzed_videos, score_sum = db.session.query(
+                func.count(TrainingVideo.id),
+                func.coalesce(func.sum(TrainingVideo.file_size), 0),
+                func.coalesce(func.sum(TrainingVideo.duration), 0),
+                func.sum(case((analyzed, 1), else_=0)),
+                func.sum(case((analyzed, TrainingVideo.analysis_score), else_=0))
+            ).filter(TrainingVideo.user_id == user_id).one()
             
-            if not videos:
+            if not total_videos:
                 return {
                     'total_videos': 0,
                     'total_size_mb': 0,
@@ -613,17 +687,15 @@ def create_models(db):
                     'avg_score': 0
                 }
             
-            total_size = sum(video.file_size for video in videos)
-            total_duration = sum(video.duration for video in videos if video.duration)
-            analyzed_videos = [v for v in videos if v.analysis_status == 'completed' and v.analysis_score]
-            avg_score = sum(v.analysis_score for v in analyzed_videos) / len(analyzed_videos) if analyzed_videos else 0
+            analyzed_videos = int(analyzed_videos or 0)
+            avg_score = (score_sum or 0) / analyzed_videos if analyzed_videos else 0
             
             return {
-                'total_videos': len(videos),
+                'total_videos': total_videos,
                 'total_size_mb': round(total_size / (1024 * 1024), 2),
                 'total_duration': total_duration,
                 'total_duration_formatted': f"{int(total_duration // 60)}:{int(total_duration % 60):02d}" if total_duration else "0:00",
-                'analyzed_videos': len(analyzed_videos),
+                'analyzed_videos': analyzed_videos,
                 'avg_score': round(avg_score, 1) if avg_score else 0
             }
         
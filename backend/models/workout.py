@@ -21,7 +21,10 @@ def create_workout_models(db):
         user = db.relationship('User', backref='favorite_exercises')
         
         # Unique constraint - user can only favorite an exercise once
-        __table_args__ = (db.UniqueConstraint('user_id', 'exercise_id', name='unique_user_exercise'),)
+        __table_args__ = (
+            db.UniqueConstraint('user_id', 'exercise_id', name='unique_user_exercise'),
+            db.Index('ix_favorite_exercises_user_created', 'user_id', 'created_at'),
+        )
         
         def to_dict(self):
             return {
@@ -46,6 +49,9 @@ def create_workout_models(db):
         created_at = db.Column(db.DateTime, default=datetime.utcnow)
         updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
         
+        # Active plan lists are per user, most recently updated first
+        __table_args__ = (db.Index('ix_workout_plans_user_active_updated', 'user_id', 'is_active', 'updated_at'),)
+        
         # Relationships
         user = db.relationship('User', backref='workout_plans')
         exercises = db.relationship('WorkoutPlanExercise', backref='workout_plan', cascade='all, delete-orphan')
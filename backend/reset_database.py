@@ -39,7 +39,7 @@ def reset_database():
         User, TrainingSession, TechniqueProgress, UserPreferences = create_models(db)
         
         # Create technique models  
-        TechniqueLibrary, UserTechniqueBookmark, TechniqueCategory = create_technique_models(db)
+        TechniqueLibrary, UserTechniqueBookmark, TechniqueCategory, TechniqueTag = create_technique_models(db)
         
         print("🔨 Creating new database with updated schema...")
         
@@ -1,18 +1,30 @@
 import os
-import threading
+import time
+import queue
 from datetime import datetime
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import and_, desc
 # REMOVED: from models.ai_analysis import VideoAnalysis, AnalysisFeedback, AnalysisProgress
-from services.ai_video_analysis import AIVideoAnalysisService
+from services.ai_video_analysis import AIVideoAnalysisService, GEMINI_MODEL, analysis_cache_model
+from services.pose_estimation import POSE_ESTIMATION
+from services.llm_executor import get_llm_executor
+from services.analysis_queue import get_analysis_queue, BATCH_PRIORITY
+from services.analysis_cache import get_analysis_cache, make_cache_key
+from services.video_storage import get_storage_for
+from services.analysis_events import (
+    get_analysis_event_broker, format_sse, KEEPALIVE_SECONDS, MAX_STREAM_SECONDS, TERMINAL_STAGES
+)
 
 # Create blueprint with unique name to avoid conflicts
 video_analysis_bp = Blueprint('video_analysis', __name__)
 
+MAX_BATCH_SIZE = 100
+BATCH_FILTER_STATUSES = ['pending', 'processing', 'completed', 'failed']
+
 def get_db():
     """Get database instance from current app"""
-    return current_app.extensions['sqlalchemy'].db
+    return current_app.extensions['sqlalchemy']
 
 def get_models():
     """Get model classes from current app - FIXED VERSION"""
@@ -20,10 +32,54 @@ def get_models():
         'VideoAnalysis': getattr(current_app, 'VideoAnalysis', None),
         'AnalysisFeedback': getattr(current_app, 'AnalysisFeedback', None),
         'AnalysisProgress': getattr(current_app, 'AnalysisProgress', None),
+        'AnalysisJob': getattr(current_app, 'AnalysisJob', None),
+        'AnalysisBatch': getattr(current_app, 'AnalysisBatch', None),
+        'AnalysisCacheEntry': getattr(current_app, 'AnalysisCacheEntry', None),
         'TrainingVideo': getattr(current_app, 'TrainingVideo', None),
         'User': getattr(current_app, 'User', None)
     }
 
+def get_stream_user_id():
+    """
+    Authenticate a streaming request from a token parameter or Authorization header
+    
+    EventSource cannot send headers, so the events route accepts ?token=.
+    Returns (user_id, error_message).
+    """
+    token = request.args.get('token') or request.headers.get('Authorization', '').replace('Bearer ', '')
+    if not token:
+        return None, 'Authentication required'
+    
+    try:
+        from flask_jwt_extended import decode_token
+        return int(decode_token(token)['sub']), None
+    except Exception:
+        return None, 'Invalid token'
+
+def get_cache_key(video, technique_name, martial_art_style):
+    """
+    Analysis cache key for a video, plus the content hash it was built from
+
+    Only a content hash stored at upload is used - files are never hashed
+    inside the request; the worker hashes videos that have none yet.
+
+    Returns:
+        (cache_key, video_hash), both None if the video has no stored hash
+    """
+    video_hash = video.content_hash
+    if not video_hash:
+        return None, None
+    prompt = AIVideoAnalysisService.generate_analysis_prompt(technique_name, martial_art_style)
+    return make_cache_key(video_hash, prompt, analysis_cache_model()), video_hash
+
+def get_cache_stats():
+    """Analysis cache counters, or None if the cache tables are unavailable"""
+    try:
+        return get_analysis_cache().get_stats()
+    except Exception as e:
+        print(f"⚠️ Could not read analysis cache stats: {str(e)}")
+        return None
+
 @video_analysis_bp.route('/status', methods=['GET'])
 def ai_status():
     """Check AI analysis service status"""
@@ -34,7 +90,8 @@ def ai_status():
             return jsonify({
                 'status': 'error',
                 'message': 'GEMINI_API_KEY not configured',
-                'ai_enabled': False
+                'ai_enabled': False,
+                'analysis_cache': get_cache_stats()
             }), 500
         
         # Try to initialize service
@@ -44,8 +101,11 @@ def ai_status():
                 'status': 'ready',
                 'message': 'AI analysis service is ready',
                 'ai_enabled': True,
-                'model': 'gemini-1.5-flash',
-                'max_frames': service.max_frames
+                'model': GEMINI_MODEL,
+                'max_frames': service.max_frames,
+                'pose_estimation': POSE_ESTIMATION,
+                'llm_executor': get_llm_executor().get_metrics(),
+                'analysis_cache': get_cache_stats()
             })
         except Exception as service_error:
             return jsonify({
@@ -108,6 +168,12 @@ def trigger_video_analysis(video_id):
         
         print(f"🥋 Analysis params - Technique: {technique_name}, Style: {martial_art_style}")
         
+        # Same bytes + same prompt + same model -> same analysis. Looked up before
+        # this request writes anything: the cache commits and bumps its counters
+        # on its own connection, which must not wait on our open transaction
+        cache_key, video_hash = get_cache_key(video, technique_name, martial_art_style)
+        cached_results = get_analysis_cache().get(cache_key) if cache_key else None
+        
         # Create analysis record
         analysis = VideoAnalysis(
             video_id=video_id,
@@ -115,108 +181,45 @@ def trigger_video_analysis(video_id):
             analysis_status='pending',
             technique_name=technique_name,
             martial_art_style=martial_art_style,
-            ai_model='gemini-1.5-flash',
+            ai_model=GEMINI_MODEL,
             started_at=datetime.utcnow()
         )
         
         db.session.add(analysis)
-        db.session.commit()
+        db.session.flush()
         
         print(f"✅ Created analysis record {analysis.id}")
         
-        # Start analysis in background thread
-        def run_analysis():
-            """Background analysis function"""
-            try:
-                print(f"🚀 Starting background analysis for video {video_id}")
-                
-                # Update status to processing
-                with current_app.app_context():
-                    db = get_db()
-                    models = get_models()
-                    VideoAnalysis = models['VideoAnalysis']
-                    analysis = VideoAnalysis.query.get(analysis.id)
-                    analysis.analysis_status = 'processing'
-                    db.session.commit()
-                
-                # Initialize AI service
-                ai_service = AIVideoAnalysisService()
-                
-                # Get video file path
-                video_file_path = getattr(video, 'file_path', None)
-                if not video_file_path or not os.path.exists(video_file_path):
-                    raise ValueError(f"Video file not found: {video_file_path}")
-                
-                print(f"📹 Analyzing video file: {video_file_path}")
-                
-                # Run AI analysis
-                results = ai_service.analyze_video_file(
-                    video_file_path,
-                    technique_name,
-                    martial_art_style
-                )
-                
-                # Update analysis with results
-                with current_app.app_context():
-                    db = get_db()
-                    models = get_models()
-                    VideoAnalysis = models['VideoAnalysis']
-                    analysis = VideoAnalysis.query.get(analysis.id)
-                    
-                    if 'error' in results:
-                        # Analysis failed
-                        analysis.analysis_status = 'failed'
-                        analysis.error_message = results['error']
-                        analysis.completed_at = datetime.utcnow()
-                        print(f"❌ Analysis failed: {results['error']}")
-                    else:
-                        # Analysis succeeded
-                        analysis.analysis_status = 'completed'
-                        analysis.completed_at = datetime.utcnow()
-                        analysis.overall_score = results.get('overall_score')
-                        analysis.technique_identified = results.get('technique_identified')
-                        analysis.identified_style = results.get('martial_art_style')
-                        analysis.detailed_scores = results.get('detailed_scores')
-                        analysis.strengths = results.get('strengths')
-                        analysis.areas_for_improvement = results.get('areas_for_improvement')
-                        analysis.coaching_tips = results.get('coaching_tips')
-                        analysis.safety_considerations = results.get('safety_considerations')
-                        analysis.next_steps = results.get('next_steps')
-                        analysis.frames_analyzed = results.get('frames_analyzed', 0)
-                        analysis.raw_ai_response = results.get('raw_response')
-                        
-                        print(f"✅ Analysis completed successfully! Score: {analysis.overall_score}/10")
-                        
-                        # Update progress tracking
-                        update_analysis_progress(analysis.user_id, analysis)
-                    
-                    db.session.commit()
-                    
-            except Exception as e:
-                print(f"❌ Background analysis error: {str(e)}")
-                # Update analysis with error
-                try:
-                    with current_app.app_context():
-                        db = get_db()
-                        models = get_models()
-                        VideoAnalysis = models['VideoAnalysis']
-                        analysis = VideoAnalysis.query.get(analysis.id)
-                        analysis.analysis_status = 'failed'
-                        analysis.error_message = str(e)
-                        analysis.completed_at = datetime.utcnow()
-                        db.session.commit()
-                except:
-                    pass  # Avoid nested errors
-        
-        # Start background thread
-        thread = threading.Thread(target=run_analysis)
-        thread.daemon = True
-        thread.start()
+        # Cache hit: complete instantly without touching frames or Gemini
+        if cached_results:
+            analysis.apply_results(cached_results)
+            db.session.commit()
+            update_analysis_progress(analysis.user_id, analysis)
+            
+            print(f"⚡ Analysis {analysis.id} served from cache")
+            
+            return jsonify({
+                'message': 'Analysis completed from cache',
+                'analysis_id': analysis.id,
+                'status': 'completed',
+                'cached': True,
+                'analysis': analysis.to_dict()
+            }), 200
+        
+        # Hand off to the analysis worker pool (see analysis_worker.py);
+        # the row and its job are committed together
+        queue = get_analysis_queue()
+        job = queue.enqueue(analysis, video.file_path, cache_key=cache_key, video_hash=video_hash)
+        db.session.commit()
+        
+        print(f"📥 Queued analysis job {job.id} for analysis {analysis.id}")
         
         return jsonify({
             'message': 'Analysis started successfully',
             'analysis_id': analysis.id,
+            'job_id': job.id,
             'status': 'pending',
+            'cached': False,
             'estimated_time': '1-2 minutes'
         }), 202
         
@@ -224,6 +227,246 @@ def trigger_video_analysis(video_id):
         print(f"❌ Analysis trigger error: {str(e)}")
         return jsonify({'error': f'Failed to start analysis: {str(e)}'}), 500
 
+def validate_batch_request(data):
+    """Validate a batch request body - returns (is_valid, error_message)"""
+    video_ids = data.get('video_ids')
+    filters = data.get('filter')
+    
+    if video_ids is None and filters is None:
+        return False, 'Provide either video_ids or filter'
+    if video_ids is not None and filters is not None:
+        return False, 'Provide video_ids or filter, not both'
+    
+    if video_ids is not None:
+        if not isinstance(video_ids, list) or not video_ids:
+            return False, 'video_ids must be a non-empty list'
+        if not all(isinstance(video_id, int) for video_id in video_ids):
+            return False, 'video_ids must contain integers'
+        if len(set(video_ids)) > MAX_BATCH_SIZE:
+            return False, f'A batch can contain at most {MAX_BATCH_SIZE} videos'
+    
+    if filters is not None:
+        if not isinstance(filters, dict):
+            return False, 'filter must be an object'
+        unknown = set(filters) - {'style', 'technique_name', 'analysis_status'}
+        if unknown:
+            return False, f"Unknown filter fields: {', '.join(sorted(unknown))}"
+        status = filters.get('analysis_status')
+        if status is not None and status not in BATCH_FILTER_STATUSES:
+            return False, f"analysis_status must be one of: {', '.join(BATCH_FILTER_STATUSES)}"
+    
+    return True, None
+
+def batch_response(batch, queue, include_analyses=False):
+    """Batch with its aggregate progress (and optionally each analysis)"""
+    response = batch.to_dict()
+    response['progress'] = queue.get_batch_progress(batch.id)
+    
+    if include_analyses:
+        VideoAnalysis = get_models()['VideoAnalysis']
+        analyses = VideoAnalysis.query.filter_by(batch_id=batch.id).order_by(VideoAnalysis.id).all()
+        response['analyses'] = [{
+            'analysis_id': analysis.id,
+            'video_id': analysis.video_id,
+            'technique_name': analysis.technique_name,
+            'status': analysis.analysis_status,
+            'overall_score': analysis.overall_score,
+            'error_message': analysis.error_message
+        } for analysis in analyses]
+    
+    return response
+
+@video_analysis_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def trigger_batch_analysis():
+    """
+    Start AI analysis for many videos at once
+    
+    Body: {"video_ids": [...]} or {"filter": {"style", "technique_name", "analysis_status"}},
+    plus optional "name", "technique_name" and "martial_art_style" overrides.
+    All analysis rows and jobs are created in one transaction; the worker pool
+    runs them with per-user fairness. Poll GET /batch/<id> for progress.
+    """
+    try:
+        user_id = get_jwt_identity()
+        db = get_db()
+        models = get_models()
+        
+        VideoAnalysis = models['VideoAnalysis']
+        TrainingVideo = models['TrainingVideo']
+        AnalysisBatch = models['AnalysisBatch']
+        
+        if not VideoAnalysis or not TrainingVideo or not AnalysisBatch:
+            return jsonify({'error': 'Required models not available'}), 500
+        
+        data = request.get_json() or {}
+        is_valid, error_message = validate_batch_request(data)
+        if not is_valid:
+            return jsonify({'error': error_message}), 400
+        
+        skipped = []
+        
+        # Resolve the videos in one query
+        if data.get('video_ids') is not None:
+            requested_ids = list(dict.fromkeys(data['video_ids']))
+            videos = TrainingVideo.query.filter(
+                TrainingVideo.user_id == user_id,
+                TrainingVideo.id.in_(requested_ids)
+            ).all()
+            found_ids = {video.id for video in videos}
+            skipped.extend(
+                {'video_id': video_id, 'reason': 'Video not found or access denied'}
+                for video_id in requested_ids if video_id not in found_ids
+            )
+        else:
+            filters = data['filter']
+            query = TrainingVideo.query.filter_by(user_id=user_id)
+            if filters.get('style'):
+                query = query.filter(TrainingVideo.style == filters['style'])
+            if filters.get('technique_name'):
+                query = query.filter(TrainingVideo.technique_name.ilike(f"%{filters['technique_name']}%"))
+            if filters.get('analysis_status'):
+                query = query.filter(TrainingVideo.analysis_status == filters['analysis_status'])
+            
+            videos = query.order_by(TrainingVideo.created_at).limit(MAX_BATCH_SIZE + 1).all()
+            if len(videos) > MAX_BATCH_SIZE:
+                return jsonify({
+                    'error': f'Filter matches more than {MAX_BATCH_SIZE} videos - narrow it down'
+                }), 400
+        
+        # Videos that already have an analysis running are left alone
+        in_progress_ids = {
+            video_id for (video_id,) in db.session.query(VideoAnalysis.video_id).filter(
+                VideoAnalysis.user_id == user_id,
+                VideoAnalysis.video_id.in_([video.id for video in videos]),
+                VideoAnalysis.analysis_status.in_(['pending', 'processing'])
+            ).distinct()
+        } if videos else set()
+        
+        runnable = []
+        for video in videos:
+            if video.id in in_progress_ids:
+                skipped.append({'video_id': video.id, 'reason': 'Analysis already in progress'})
+            elif not video.file_path or not get_storage_for(video.file_path).exists(video.file_path):
+                skipped.append({'video_id': video.id, 'reason': 'Video file not found'})
+            else:
+                runnable.append(video)
+        
+        if not runnable:
+            return jsonify({
+                'error': 'No videos to analyze',
+                'skipped': skipped
+            }), 400
+        
+        # Cache lookups first: they commit their own counters, so they must
+        # happen before the batch transaction starts
+        cache = get_analysis_cache()
+        plans = []
+        for video in runnable:
+            technique_name = data.get('technique_name', video.technique_name)
+            martial_art_style = data.get('martial_art_style', video.style)
+            cache_key, video_hash = get_cache_key(video, technique_name, martial_art_style)
+            cached_results = cache.get(cache_key) if cache_key else None
+            plans.append((video, technique_name, martial_art_style, cache_key, video_hash, cached_results))
+        
+        print(f"📦 Batch analysis request by user {user_id}: {len(plans)} videos, {len(skipped)} skipped")
+        
+        # One transaction: batch, analyses and jobs are committed together
+        batch = AnalysisBatch(
+            user_id=user_id,
+            name=data.get('name'),
+            filters={'video_ids': data['video_ids']} if data.get('video_ids') is not None else data['filter'],
+            total_analyses=len(plans),
+            skipped=skipped
+        )
+        db.session.add(batch)
+        db.session.flush()
+        
+        analyses = []
+        for video, technique_name, martial_art_style, _, _, _ in plans:
+            analysis = VideoAnalysis(
+                video_id=video.id,
+                user_id=user_id,
+                analysis_status='pending',
+                technique_name=technique_name,
+                martial_art_style=martial_art_style,
+                ai_model=GEMINI_MODEL,
+                batch_id=batch.id,
+                started_at=datetime.utcnow()
+            )
+            analyses.append(analysis)
+        db.session.add_all(analyses)
+        db.session.flush()
+        
+        queue = get_analysis_queue()
+        cached_analyses = []
+        for analysis, (video, _, _, cache_key, video_hash, cached_results) in zip(analyses, plans):
+            if cached_results:
+                analysis.apply_results(cached_results)
+                cached_analyses.append(analysis)
+            else:
+                queue.enqueue(analysis, video.file_path, priority=BATCH_PRIORITY,
+                              cache_key=cache_key, video_hash=video_hash)
+        
+        db.session.commit()
+        
+        for analysis in cached_analyses:
+            update_analysis_progress(analysis.user_id, analysis)
+        
+        print(f"📥 Batch {batch.id}: {len(plans) - len(cached_analyses)} queued, {len(cached_analyses)} from cache")
+        
+        return jsonify({
+            'message': 'Batch analysis started',
+            'batch': batch_response(batch, queue)
+        }), 202
+        
+    except Exception as e:
+        print(f"❌ Batch analysis error: {str(e)}")
+        get_db().session.rollback()
+        return jsonify({'error': f'Failed to start batch analysis: {str(e)}'}), 500
+
+@video_analysis_bp.route('/batch/<int:batch_id>', methods=['GET'])
+@jwt_required()
+def get_batch_analysis(batch_id):
+    """Aggregate progress of a batch, with the status of each analysis"""
+    try:
+        user_id = get_jwt_identity()
+        AnalysisBatch = get_models()['AnalysisBatch']
+        
+        if not AnalysisBatch:
+            return jsonify({'error': 'AnalysisBatch model not available'}), 500
+        
+        batch = AnalysisBatch.query.filter_by(id=batch_id, user_id=user_id).first()
+        if not batch:
+            return jsonify({'error': 'Batch not found'}), 404
+        
+        return jsonify({'batch': batch_response(batch, get_analysis_queue(), include_analyses=True)})
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to get batch: {str(e)}'}), 500
+
+@video_analysis_bp.route('/batches', methods=['GET'])
+@jwt_required()
+def get_batch_analyses():
+    """The user's recent batches with their aggregate progress"""
+    try:
+        user_id = get_jwt_identity()
+        AnalysisBatch = get_models()['AnalysisBatch']
+        
+        if not AnalysisBatch:
+            return jsonify({'error': 'AnalysisBatch model not available'}), 500
+        
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        batches = AnalysisBatch.query.filter_by(user_id=user_id).order_by(
+            desc(AnalysisBatch.created_at)
+        ).limit(limit).all()
+        
+        queue = get_analysis_queue()
+        return jsonify({'batches': [batch_response(batch, queue) for batch in batches]})
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to get batches: {str(e)}'}), 500
+
 @video_analysis_bp.route('/analysis/<int:analysis_id>', methods=['GET'])
 @jwt_required()
 def get_analysis_results(analysis_id):
@@ -253,6 +496,72 @@ def get_analysis_results(analysis_id):
     except Exception as e:
         return jsonify({'error': f'Failed to get analysis: {str(e)}'}), 500
 
+@video_analysis_bp.route('/analysis/<int:analysis_id>/events', methods=['GET'])
+def stream_analysis_events(analysis_id):
+    """
+    Server-sent event stream of an analysis' progress
+    
+    Replaces polling GET /analysis/<id>: one long-lived connection receives
+    'progress' events (queued, extracting_frames n/N, calling_model,
+    parsing, done/failed) and closes after the final one.
+    """
+    try:
+        user_id, auth_error = get_stream_user_id()
+        if auth_error:
+            return jsonify({'error': auth_error}), 401
+        
+        VideoAnalysis = get_models()['VideoAnalysis']
+        if not VideoAnalysis or not get_models()['AnalysisJob']:
+            return jsonify({'error': 'Required models not available'}), 500
+        
+        analysis = VideoAnalysis.query.filter_by(id=analysis_id, user_id=user_id).first()
+        if not analysis:
+            return jsonify({'error': 'Analysis not found'}), 404
+        
+        app = current_app._get_current_object()
+        broker = get_analysis_event_broker()
+        
+        # Subscribe before reading the initial state so no transition is missed
+        subscriber = broker.subscribe(app, analysis_id)
+        try:
+            initial_event = broker.load_event(app, analysis_id)
+            broker.prime(initial_event)
+        except Exception:
+            broker.unsubscribe(analysis_id, subscriber)
+            raise
+        
+        def generate():
+            try:
+                yield 'retry: 3000\n\n'
+                yield format_sse(initial_event)
+                if initial_event['stage'] in TERMINAL_STAGES:
+                    return
+                
+                deadline = time.monotonic() + MAX_STREAM_SECONDS
+                while time.monotonic() < deadline:
+                    try:
+                        event = subscriber.get(timeout=KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        yield ': keep-alive\n\n'
+                        continue
+                    
+                    yield format_sse(event)
+                    if event['stage'] in TERMINAL_STAGES:
+                        return
+            finally:
+                broker.unsubscribe(analysis_id, subscriber)
+        
+        response = Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Don't let nginx buffer the stream
+        })
+        # Covers clients that disconnect before the first event is sent
+        response.call_on_close(lambda: broker.unsubscribe(analysis_id, subscriber))
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to stream analysis events: {str(e)}'}), 500
+
 @video_analysis_bp.route('/video/<int:video_id>/analyses', methods=['GET'])
 @jwt_required()
 def get_video_analyses(video_id):
@@ -1,10 +1,17 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
+import json
 import logging
+import threading
 
 # Import the Gemini service
 from services.gemini_service import get_gemini_service, TrainingInsight
+from services.llm_executor import get_llm_executor
+from services.insight_cache import get_insight_cache
+from services.analysis_events import format_sse
+from services.chat_history import get_chat_history_service
+from services.training_context import get_training_context_service
 
 logger = logging.getLogger(__name__)
 
@@ -170,21 +177,50 @@ def get_training_insights():
             'analysis_date': datetime.utcnow().isoformat()
         }
         
-        # Generate AI insights
         gemini_service = get_gemini_service()
-        insights = gemini_service.analyze_training_patterns(analysis_data)
         
-        # Convert insights to JSON-serializable format
-        insights_json = []
-        for insight in insights:
-            insights_json.append({
-                'type': insight.type,
-                'title': insight.title,
-                'message': insight.message.strip(),
-                'confidence': insight.confidence,
-                'action_items': insight.action_items,
-                'data_points': insight.data_points
-            })
+        # Unchanged training data -> serve the insights generated last time
+        insight_cache = get_insight_cache()
+        cache_key = None
+        cached = None
+        if gemini_service.is_enabled():
+            try:
+                cache_key = insight_cache.make_key(
+                    user_id, f"{timeframe}:{include_techniques}",
+                    gemini_service.training_summary_digest(analysis_data)
+                )
+                cached = insight_cache.get(cache_key)
+            except Exception as cache_error:
+                insight_cache.errors += 1
+                logger.warning(f"Insight cache unavailable: {cache_error}")
+        
+        if cached:
+            insights_json = cached['insights']
+            generated_at = cached['generated_at']
+        else:
+            # Generate AI insights
+            insights = gemini_service.analyze_training_patterns(analysis_data)
+            generated_at = datetime.utcnow().isoformat()
+            
+            # Convert insights to JSON-serializable format
+            insights_json = []
+            for insight in insights:
+                insights_json.append({
+                    'type': insight.type,
+                    'title': insight.title,
+                    'message': insight.message.strip(),
+                    'confidence': insight.confidence,
+                    'action_items': insight.action_items,
+                    'data_points': insight.data_points
+                })
+            
+            # Error fallbacks carry the error in data_points - never cache those
+            if cache_key and not any('error' in insight.data_points for insight in insights):
+                try:
+                    insight_cache.put(cache_key, {'insights': insights_json, 'generated_at': generated_at})
+                except Exception as cache_error:
+                    insight_cache.errors += 1
+                    logger.warning(f"Could not cache insights: {cache_error}")
         
         # Calculate basic statistics for context
         total_sessions = len(sessions_data)
@@ -212,7 +248,8 @@ def get_training_insights():
             },
             'ai_service': {
                 'enabled': gemini_service.is_enabled(),
-                'generated_at': datetime.utcnow().isoformat()
+                'generated_at': generated_at,
+                'cached': bool(cached)
             }
         })
         
@@ -363,6 +400,7 @@ def get_technique_analysis():
         }), 500
 
 @ai_bp.route('/test', methods=['GET'])
+@jwt_required()
 def test_ai_service():
     """Test endpoint to verify AI service is working"""
     gemini_service = get_gemini_service()
@@ -463,9 +501,112 @@ def ai_status():
             'Technique progress insights',
             'Workout plan suggestions'
         ],
+        'llm_executor': get_llm_executor().get_metrics(),
+        'insight_cache': get_insight_cache().get_stats(),
         'timestamp': datetime.utcnow().isoformat()
     })
 
+def experience_label(profile, default='Not specified'):
+    """Belt rank and years of training from a training context profile"""
+    parts = []
+    if profile.get('belt_rank'):
+        parts.append(profile['belt_rank'])
+    if profile.get('years_training'):
+        parts.append(f"{profile['years_training']} years training")
+    return ', '.join(parts) or default
+
+def context_sessions(context, limit, include_notes=False):
+    """Recent sessions of a training context in the shape the Gemini prompts expect"""
+    sessions = []
+    for s in context['recent_sessions'][:limit]:
+        session = {
+            'date': s['date'],
+            'duration_minutes': s['duration'],
+            'intensity': s['intensity_level'],
+            'martial_art_style': s['style']
+        }
+        if include_notes:
+            session['notes'] = s['notes']
+        else:
+            session['techniques_practiced'] = s['techniques_practiced']
+        sessions.append(session)
+    return sessions
+
+def build_chat_user_context(user_id):
+    """Profile and recent training of a user for the coach prompt, or None if the user doesn't exist"""
+    context = get_training_context_service().get_context(user_id)
+    if context is None:
+        return None
+    
+    profile = context['profile']
+    return {
+        'name': profile['name'] or 'Student',
+        'experience': experience_label(profile),
+        'primary_art': profile['primary_style'] or 'Various',
+        'recent_sessions': context['rolling']['last_30_days']['sessions'],
+        'total_techniques': len(context['techniques'])
+    }
+
+def prepare_chat_turn(user_id, request_data, message):
+    """
+    Conversation context of a chat request
+    
+    Clients that send `chat_history` themselves (and no conversation_id)
+    keep the stateless behaviour. Otherwise history lives on the server: the
+    turn continues `conversation_id` or, without one, starts a new
+    conversation. Nothing is written here - record_chat_turn() stores the
+    message together with the reply once the model has answered.
+    
+    Returns:
+        (stateful, conversation or None, chat_history, summary, error_message)
+    """
+    conversation_id = request_data.get('conversation_id')
+    if conversation_id is None and 'chat_history' in request_data:
+        return False, None, request_data.get('chat_history') or [], None, None
+    if conversation_id is None:
+        return True, None, [], None, None
+    
+    history_service = get_chat_history_service()
+    conversation = history_service.get_conversation(user_id, conversation_id)
+    if not conversation:
+        return True, None, None, None, 'Conversation not found'
+    
+    summary, chat_history = history_service.build_context(conversation)
+    return True, conversation, chat_history, summary, None
+
+def record_chat_turn(user_id, conversation_id, message, reply):
+    """
+    Store the user's message and the coach's reply in one commit, then fold
+    old turns into the summary when due
+    
+    Only called for replies the model actually generated, so fallback
+    messages never enter the history. A conversation_id of None starts a
+    new conversation.
+    
+    Returns:
+        The conversation id, or None if it was deleted while the reply was generated
+    """
+    db = current_app.extensions['sqlalchemy']
+    history_service = get_chat_history_service()
+    
+    if conversation_id is None:
+        conversation = history_service.start_conversation(user_id, message)
+    else:
+        conversation = history_service.get_conversation(user_id, conversation_id)
+        if not conversation:
+            return None
+    history_service.add_message(conversation, 'user', message)
+    history_service.add_message(conversation, 'assistant', reply)
+    db.session.commit()
+    
+    try:
+        if history_service.summarize_if_needed(conversation, get_gemini_service().summarize_conversation):
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Could not summarize conversation {conversation.id}: {e}")
+    return conversation.id
+
 @ai_bp.route('/chat', methods=['POST'])
 @jwt_required()
 def ai_chat():
@@ -477,7 +618,6 @@ def ai_chat():
         request_data = request.get_json()
         
         message = request_data.get('message', '').strip()
-        chat_history = request_data.get('chat_history', [])
         
         if not message:
             return jsonify({
@@ -485,40 +625,28 @@ def ai_chat():
                 'success': False
             }), 400
         
-        # Get user profile and training data for context
-        User = current_app.User
-        TrainingSession = current_app.TrainingSession
-        TechniqueProgress = current_app.TechniqueProgress
-        
-        user = User.query.get(user_id)
-        if not user:
+        user_context = build_chat_user_context(user_id)
+        if user_context is None:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get recent training data for context
-        recent_sessions = TrainingSession.query.filter(
-            TrainingSession.user_id == user_id
-        ).order_by(TrainingSession.created_at.desc()).limit(5).all()
-        
-        recent_techniques = TechniqueProgress.query.filter(
-            TechniqueProgress.user_id == user_id
-        ).limit(10).all()
-        
-        # Prepare context for AI
-        user_context = {
-            'name': getattr(user, 'first_name', getattr(user, 'username', 'Student')),
-            'experience': getattr(user, 'experience_level', 'Not specified'),
-            'primary_art': getattr(user, 'primary_martial_art', 'Various'),
-            'recent_sessions': len(recent_sessions),
-            'total_techniques': len(recent_techniques)
-        }
+        stateful, conversation, chat_history, summary, error = prepare_chat_turn(user_id, request_data, message)
+        if error:
+            return jsonify({'error': error, 'success': False}), 404
+        conversation_id = conversation.id if conversation else None
         
         # Generate AI response
         gemini_service = get_gemini_service()
-        ai_response = gemini_service.generate_chat_response(message, chat_history, user_context)
+        ai_response, generated = gemini_service.generate_chat_response(
+            message, chat_history, user_context, summary=summary
+        )
+        
+        if stateful and generated:
+            conversation_id = record_chat_turn(user_id, conversation_id, message, ai_response)
         
         return jsonify({
             'success': True,
             'response': ai_response,
+            'conversation_id': conversation_id,
             'timestamp': datetime.utcnow().isoformat()
         })
         
@@ -530,6 +658,216 @@ def ai_chat():
             'success': False
         }), 500
 
+@ai_bp.route('/chat/stream', methods=['POST'])
+@jwt_required()
+def ai_chat_stream():
+    """
+    Streaming AI chat - the coach's reply is forwarded as it is generated
+    
+    Same request body as POST /chat (send conversation_id to continue a
+    stored conversation). Responds with server-sent events
+    ('chunk' events carrying {"text"}, then 'done' with the full response,
+    or 'error'), or with JSON lines ({"type": "chunk" | "done" | "error", ...})
+    for Accept: application/x-ndjson or ?format=ndjson.
+    Disconnecting cancels the model call.
+    """
+    try:
+        user_id = get_jwt_identity()
+        request_data = request.get_json() or {}
+        
+        message = request_data.get('message', '').strip()
+        
+        if not message:
+            return jsonify({
+                'error': 'Message is required',
+                'success': False
+            }), 400
+        
+        user_context = build_chat_user_context(user_id)
+        if user_context is None:
+            return jsonify({'error': 'User not found'}), 404
+        
+        stateful, conversation, chat_history, summary, error = prepare_chat_turn(user_id, request_data, message)
+        if error:
+            return jsonify({'error': error, 'success': False}), 404
+        conversation_id = conversation.id if conversation else None
+        
+        ndjson = (
+            request.args.get('format') == 'ndjson' or
+            request.accept_mimetypes.best_match(['text/event-stream', 'application/x-ndjson']) == 'application/x-ndjson'
+        )
+        
+        def encode(event_type, payload):
+            if ndjson:
+                return json.dumps({'type': event_type, **payload}) + '\n'
+            return format_sse(payload, event_type)
+        
+        app = current_app._get_current_object()
+        gemini_service = get_gemini_service()
+        cancel_event = threading.Event()
+        chunks = gemini_service.stream_chat_response(
+            message, chat_history, user_context, cancel_event, summary=summary
+        )
+        
+        def generate():
+            parts = []
+            turn_conversation_id = conversation_id
+            try:
+                for text in chunks:
+                    parts.append(text)
+                    yield encode('chunk', {'text': text})
+                
+                # Only a completed reply is stored, so an error or disconnect leaves no half turn.
+                # Runs after the view returned, so it needs its own app context
+                ai_response = ''.join(parts).strip()
+                if stateful and gemini_service.is_enabled():
+                    with app.app_context():
+                        turn_conversation_id = record_chat_turn(user_id, conversation_id, message, ai_response)
+                
+                yield encode('done', {
+                    'success': True,
+                    'response': ai_response,
+                    'conversation_id': turn_conversation_id,
+                    'timestamp': datetime.utcnow().isoformat()
+                })
+            except Exception as e:
+                logger.error(f"Error in streaming AI chat: {e}")
+                yield encode('error', {
+                    'error': 'Failed to generate chat response',
+                    'message': str(e),
+                    'success': False
+                })
+            finally:
+                # Runs on client disconnect too (the server closes this generator)
+                cancel_event.set()
+                chunks.close()
+        
+        response = Response(
+            generate(),
+            mimetype='application/x-ndjson' if ndjson else 'text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # Don't let nginx buffer the stream
+            }
+        )
+        response.call_on_close(cancel_event.set)
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error in streaming AI chat: {e}")
+        return jsonify({
+            'error': 'Failed to generate chat response',
+            'message': str(e),
+            'success': False
+        }), 500
+
+@ai_bp.route('/chat/conversations', methods=['GET'])
+@jwt_required()
+def list_chat_conversations():
+    """
+    The user's stored coach conversations, most recent first
+    Query params:
+    - page, per_page (default 1, 20; max 100 per page)
+    """
+    try:
+        user_id = get_jwt_identity()
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        
+        pagination = get_chat_history_service().list_conversations(user_id, page, per_page)
+        
+        return jsonify({
+            'success': True,
+            'conversations': [conversation.to_dict() for conversation in pagination.items],
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error listing chat conversations: {e}")
+        return jsonify({
+            'error': 'Failed to list conversations',
+            'message': str(e),
+            'success': False
+        }), 500
+
+@ai_bp.route('/chat/conversations/<int:conversation_id>/messages', methods=['GET'])
+@jwt_required()
+def get_chat_messages(conversation_id):
+    """
+    Messages of a stored conversation
+    
+    Page 1 holds the most recent messages; higher pages go back in time.
+    Each page is returned in chronological order.
+    Query params:
+    - page, per_page (default 1, 50; max 200 per page)
+    """
+    try:
+        user_id = get_jwt_identity()
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 50, type=int), 200)
+        
+        history_service = get_chat_history_service()
+        conversation = history_service.get_conversation(user_id, conversation_id)
+        if not conversation:
+            return jsonify({'error': 'Conversation not found', 'success': False}), 404
+        
+        pagination = history_service.list_messages(conversation, page, per_page)
+        
+        return jsonify({
+            'success': True,
+            'conversation': conversation.to_dict(),
+            'messages': [message.to_dict() for message in reversed(pagination.items)],
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting chat messages: {e}")
+        return jsonify({
+            'error': 'Failed to get conversation messages',
+            'message': str(e),
+            'success': False
+        }), 500
+
+@ai_bp.route('/chat/conversations/<int:conversation_id>', methods=['DELETE'])
+@jwt_required()
+def delete_chat_conversation(conversation_id):
+    """Delete a stored conversation and its messages"""
+    try:
+        user_id = get_jwt_identity()
+        history_service = get_chat_history_service()
+        
+        conversation = history_service.get_conversation(user_id, conversation_id)
+        if not conversation:
+            return jsonify({'error': 'Conversation not found', 'success': False}), 404
+        
+        history_service.delete_conversation(conversation)
+        current_app.extensions['sqlalchemy'].session.commit()
+        
+        return jsonify({'success': True, 'message': 'Conversation deleted'})
+        
+    except Exception as e:
+        current_app.extensions['sqlalchemy'].session.rollback()
+        logger.error(f"Error deleting chat conversation: {e}")
+        return jsonify({
+            'error': 'Failed to delete conversation',
+            'message': str(e),
+            'success': False
+        }), 500
+
 @ai_bp.route('/chat/suggestions', methods=['GET'])
 @jwt_required()
 def get_chat_suggestions():
@@ -537,13 +875,7 @@ def get_chat_suggestions():
     user_id = get_jwt_identity()
     
     # Get user's training data to provide relevant suggestions
-    User = current_app.User
-    TrainingSession = current_app.TrainingSession
-    
-    user = User.query.get(user_id)
-    recent_sessions = TrainingSession.query.filter(
-        TrainingSession.user_id == user_id
-    ).order_by(TrainingSession.created_at.desc()).limit(3).all()
+    context = get_training_context_service().get_context(user_id)
     
     # Base suggestions
     suggestions = [
@@ -555,15 +887,13 @@ def get_chat_suggestions():
     ]
     
     # Add personalized suggestions based on user data
-    if user and hasattr(user, 'primary_martial_art') and user.primary_martial_art:
-        art = user.primary_martial_art
+    if context and context['profile']['primary_style']:
+        art = context['profile']['primary_style']
         suggestions.insert(0, f"What are the fundamentals I should master in {art}?")
         suggestions.insert(1, f"What's a good training plan for {art}?")
     
-    if recent_sessions:
-        latest_session = recent_sessions[0]
-        if hasattr(latest_session, 'martial_art_style') and latest_session.martial_art_style:
-            suggestions.insert(0, f"How did my last {latest_session.martial_art_style} session look?")
+    if context and context['last_session']:
+        suggestions.insert(0, f"How did my last {context['last_session']['style']} session look?")
     
     return jsonify({
         'success': True,
@@ -580,38 +910,22 @@ def generate_workout_plan():
         preferences = request_data.get('preferences', {})
         
         # Get user data
-        User = current_app.User
-        TrainingSession = current_app.TrainingSession
-        TechniqueProgress = current_app.TechniqueProgress
-        
-        user = User.query.get(user_id)
-        if not user:
+        context = get_training_context_service().get_context(user_id)
+        if context is None:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get training history
-        sessions = TrainingSession.query.filter(
-            TrainingSession.user_id == user_id
-        ).order_by(TrainingSession.created_at.desc()).limit(20).all()
-        
-        techniques = TechniqueProgress.query.filter(
-            TechniqueProgress.user_id == user_id
-        ).all()
-        
         # Prepare data
+        profile = context['profile']
         user_data = {
-            'sessions': [{
-                'date': s.created_at.isoformat() if s.created_at else None,
-                'duration_minutes': getattr(s, 'duration_minutes', getattr(s, 'duration', 0)),
-                'intensity': getattr(s, 'intensity', getattr(s, 'intensity_level', 0)),
-                'martial_art_style': getattr(s, 'martial_art_style', getattr(s, 'style', 'Unknown')),
-                'techniques_practiced': getattr(s, 'techniques_practiced', '')
-            } for s in sessions],
+            'sessions': context_sessions(context, 20),
             'user_profile': {
-                'first_name': getattr(user, 'first_name', getattr(user, 'username', 'Student')),
-                'primary_martial_art': getattr(user, 'primary_martial_art', 'Mixed Martial Arts'),
-                'experience_level': getattr(user, 'experience_level', 'Intermediate'),
-                'goals': getattr(user, 'training_goals', 'General improvement')
-            }
+                'first_name': profile['name'] or 'Student',
+                'primary_martial_art': profile['primary_style'] or 'Mixed Martial Arts',
+                'experience_level': experience_label(profile, 'Intermediate'),
+                'goals': profile['goals'] or 'General improvement'
+            },
+            'top_styles': context['top_styles'],
+            'technique_levels': context['technique_levels']
         }
         
         # Generate workout plan
@@ -636,12 +950,9 @@ def analyze_injury_risk():
         user_id = get_jwt_identity()
         
         # Get training data
-        TrainingSession = current_app.TrainingSession
-        sessions = TrainingSession.query.filter(
-            TrainingSession.user_id == user_id
-        ).order_by(TrainingSession.created_at.desc()).limit(30).all()
+        context = get_training_context_service().get_context(user_id)
         
-        if len(sessions) < 3:
+        if context is None or context['total_sessions'] < 3:
             return jsonify({
                 'error': 'Need at least 3 training sessions for injury risk analysis',
                 'success': False
@@ -649,13 +960,8 @@ def analyze_injury_risk():
         
         # Prepare data
         user_data = {
-            'sessions': [{
-                'date': s.created_at.isoformat() if s.created_at else None,
-                'duration_minutes': getattr(s, 'duration_minutes', getattr(s, 'duration', 0)),
-                'intensity': getattr(s, 'intensity', getattr(s, 'intensity_level', 0)),
-                'martial_art_style': getattr(s, 'martial_art_style', getattr(s, 'style', 'Unknown')),
-                'notes': getattr(s, 'notes', '')
-            } for s in sessions]
+            'sessions': context_sessions(context, 30, include_notes=True),
+            'rolling': context['rolling']
         }
         
         # Analyze injury risk
@@ -691,22 +997,10 @@ def generate_competition_prep():
             }), 400
         
         # Get user data
-        User = current_app.User
-        TrainingSession = current_app.TrainingSession
-        TechniqueProgress = current_app.TechniqueProgress
-        
-        user = User.query.get(user_id)
-        if not user:
+        context = get_training_context_service().get_context(user_id)
+        if context is None:
             return jsonify({'error': 'User not found'}), 404
-        
-        # Get training history
-        sessions = TrainingSession.query.filter(
-            TrainingSession.user_id == user_id
-        ).order_by(TrainingSession.created_at.desc()).limit(15).all()
-        
-        techniques = TechniqueProgress.query.filter(
-            TechniqueProgress.user_id == user_id
-        ).all()
+        profile = context['profile']
         
         # Calculate time until competition
         from datetime import datetime
@@ -726,13 +1020,13 @@ def generate_competition_prep():
         - Current skills focus: {', '.join(current_skills) if current_skills else 'General'}
 
         ATHLETE PROFILE:
-        - Name: {getattr(user, 'first_name', 'Athlete')}
-        - Experience: {getattr(user, 'experience_level', 'Intermediate')}
-        - Primary Art: {getattr(user, 'primary_martial_art', 'Mixed Martial Arts')}
+        - Name: {profile['name'] or 'Athlete'}
+        - Experience: {experience_label(profile, 'Intermediate')}
+        - Primary Art: {profile['primary_style'] or 'Mixed Martial Arts'}
 
         RECENT TRAINING:
-        - Total sessions (last 30 days): {len(sessions)}
-        - Techniques being worked on: {len(techniques)}
+        - Total sessions (last 30 days): {context['rolling']['last_30_days']['sessions']}
+        - Techniques being worked on: {len(context['techniques'])}
 
         CREATE A PHASE-BASED PREPARATION PLAN:
 
@@ -753,7 +1047,7 @@ def generate_competition_prep():
         """
         
         try:
-            response = gemini_service.model.generate_content(prep_prompt)
+            response = gemini_service.generate(prep_prompt)
             
             return jsonify({
                 'success': True,
@@ -787,17 +1081,12 @@ def get_daily_training_tips():
         user_id = get_jwt_identity()
         
         # Get user data
-        User = current_app.User
-        TrainingSession = current_app.TrainingSession
-        
-        user = User.query.get(user_id)
-        if not user:
+        context = get_training_context_service().get_context(user_id)
+        if context is None:
             return jsonify({'error': 'User not found'}), 404
-        
-        # Get recent session
-        latest_session = TrainingSession.query.filter(
-            TrainingSession.user_id == user_id
-        ).order_by(TrainingSession.created_at.desc()).first()
+        profile = context['profile']
+        latest_session = context['last_session']
+        martial_art = profile['primary_style'] or 'Mixed Martial Arts'
         
         gemini_service = get_gemini_service()
         
@@ -805,13 +1094,13 @@ def get_daily_training_tips():
         Provide 3 daily training tips for this martial artist:
 
         MARTIAL ARTIST:
-        - Name: {getattr(user, 'first_name', 'Student')}
-        - Primary Art: {getattr(user, 'primary_martial_art', 'Mixed Martial Arts')}
-        - Experience: {getattr(user, 'experience_level', 'Intermediate')}
+        - Name: {profile['name'] or 'Student'}
+        - Primary Art: {martial_art}
+        - Experience: {experience_label(profile, 'Intermediate')}
 
         RECENT ACTIVITY:
-        - Last session: {latest_session.martial_art_style if latest_session and hasattr(latest_session, 'martial_art_style') else 'No recent sessions'}
-        - Last training date: {latest_session.created_at.strftime('%Y-%m-%d') if latest_session and latest_session.created_at else 'No recent training'}
+        - Last session: {latest_session['style'] if latest_session else 'No recent sessions'}
+        - Last training date: {latest_session['date'] if latest_session and latest_session['date'] else 'No recent training'}
 
         Provide 3 practical, actionable tips:
         1. A technique tip
@@ -822,12 +1111,12 @@ def get_daily_training_tips():
         """
         
         try:
-            response = gemini_service.model.generate_content(tips_prompt)
+            response = gemini_service.generate(tips_prompt)
             
             return jsonify({
                 'success': True,
                 'tips': response.text,
-                'martial_art': getattr(user, 'primary_martial_art', 'Mixed Martial Arts'),
+                'martial_art': martial_art,
                 'generated_at': datetime.utcnow().isoformat()
             })
             
@@ -847,6 +1136,7 @@ def get_daily_training_tips():
         }), 500
 
 @ai_bp.route('/debug-service', methods=['GET'])
+@jwt_required()
 def debug_gemini_service():
     """Debug endpoint to check GeminiService methods"""
     try:
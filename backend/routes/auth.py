@@ -3,6 +3,7 @@ from flask_jwt_extended import create_access_token, create_refresh_token, jwt_re
 from datetime import datetime
 from flask import current_app
 import re
+from services.training_context import get_training_context_service
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -262,6 +263,7 @@ def update_current_user():
                 return jsonify({'message': 'Password must be at least 6 characters long'}), 400
             user.set_password(data['password'])
         
+        get_training_context_service().profile_saved(user)
         user.save()
         
         # Return user data with consistent field names
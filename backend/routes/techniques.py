@@ -24,7 +24,8 @@ def get_technique_service():
     models = {
         'TechniqueLibrary': current_app.TechniqueLibrary,
         'UserTechniqueBookmark': current_app.UserTechniqueBookmark,
-        'TechniqueCategory': current_app.TechniqueCategory
+        'TechniqueCategory': current_app.TechniqueCategory,
+        'TechniqueTag': current_app.TechniqueTag
     }
     
     return TechniqueService(db, models)
@@ -41,9 +42,13 @@ def search_techniques():
         category = request.args.get('category', '').strip()
         difficulty = request.args.get('difficulty', type=int)
         tags = request.args.getlist('tags')
+        tag_mode = request.args.get('tag_mode', 'all').strip().lower()
         limit = min(request.args.get('limit', 20, type=int), 100)  # Max 100
         offset = request.args.get('offset', 0, type=int)
         
+        if tag_mode not in ('all', 'any'):
+            return jsonify({'message': "tag_mode must be 'all' or 'any'"}), 400
+        
         print(f"🔍 Searching techniques: q='{query}', style='{style}', category='{category}'")
         
         # Check if user is authenticated (optional for search)
@@ -61,6 +66,7 @@ def search_techniques():
             category=category if category else None,
             difficulty=difficulty,
             tags=tags if tags else None,
+            tag_mode=tag_mode,
             limit=limit,
             offset=offset
         )
@@ -72,6 +78,30 @@ def search_techniques():
         import traceback
         traceback.print_exc()
         return jsonify({'message': 'Failed to search techniques', 'error': str(e)}), 500
+
+@techniques_bp.route('/autocomplete', methods=['GET'])
+def autocomplete_techniques():
+    """Typo-tolerant technique name suggestions, served from the in-memory index"""
+    try:
+        from services.technique_index import get_technique_index
+        
+        query = request.args.get('q', '').strip()
+        style = request.args.get('style', '').strip()
+        limit = min(request.args.get('limit', 10, type=int), 50)
+        
+        index = get_technique_index()
+        # Only the first request of a process (or after the index ages out) reads the database
+        index.ensure_built(current_app.TechniqueLibrary)
+        suggestions = index.lookup(query, limit=limit, style=style if style else None)
+        
+        return jsonify({
+            'suggestions': suggestions,
+            'count': len(suggestions)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Autocomplete techniques error: {str(e)}")
+        return jsonify({'message': 'Failed to autocomplete techniques'}), 500
     
 @techniques_bp.route('/<int:technique_id>', methods=['GET'])
 def get_technique_detail(technique_id):
@@ -154,6 +184,40 @@ def get_available_categories():
         current_app.logger.error(f"Get categories error: {str(e)}")
         return jsonify({'message': 'Failed to get categories'}), 500
 
+@techniques_bp.route('/tags', methods=['GET'])
+def get_tag_facets():
+    """Tag facet counts, optionally within style/category/difficulty/tag filters"""
+    try:
+        style = request.args.get('style', '').strip()
+        category = request.args.get('category', '').strip()
+        difficulty = request.args.get('difficulty', type=int)
+        tags = request.args.getlist('tags')
+        tag_mode = request.args.get('tag_mode', 'all').strip().lower()
+        limit = min(request.args.get('limit', 50, type=int), 200)
+        
+        if tag_mode not in ('all', 'any'):
+            return jsonify({'message': "tag_mode must be 'all' or 'any'"}), 400
+        
+        service = get_technique_service()
+        facets = service.get_tag_facets(
+            style=style if style else None,
+            category=category if category else None,
+            difficulty=difficulty,
+            tags=tags if tags else None,
+            tag_mode=tag_mode,
+            limit=limit
+        )
+        
+        return jsonify({
+            'tags': facets,
+            'count': len(facets),
+            'message': 'Tags retrieved successfully'
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get tag facets error: {str(e)}")
+        return jsonify({'message': 'Failed to get tags'}), 500
+
 @techniques_bp.route('/stats', methods=['GET'])
 def get_technique_stats():
     """Get general statistics about the technique library"""
@@ -339,10 +403,12 @@ def test_techniques():
             'technique_count': technique_count,
             'endpoints': {
                 'search': 'GET /api/techniques/search',
+                'autocomplete': 'GET /api/techniques/autocomplete',
                 'detail': 'GET /api/techniques/<id>',
                 'popular': 'GET /api/techniques/popular',
                 'styles': 'GET /api/techniques/styles',
                 'categories': 'GET /api/techniques/categories',
+                'tags': 'GET /api/techniques/tags',
                 'stats': 'GET /api/techniques/stats',
                 'bookmarks': 'GET /api/techniques/bookmarks (auth)',
                 'bookmark': 'POST /api/techniques/<id>/bookmark (auth)',
@@ -1,12 +1,22 @@
 import os
 import uuid
 import re
+import hashlib
 from werkzeug.utils import secure_filename
-from flask import send_file
+from werkzeug.utils import safe_join
 import magic
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, redirect, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from services.video_upload import ResumableUploadStore
+from services.video_streaming import send_video_file
+from services.video_storage import get_storage, get_storage_for
+from services.video_assets import get_video_asset_service, load_manifest
+from services.insight_cache import invalidate_user_insights
+from services.training_context import get_training_context_service, session_state
+from services.training_stats import compute_training_stats
+from services.training_rollup import get_training_rollup_service, MAX_SERIES_DAYS
+from utils.pagination import keyset_page, page_size, InvalidCursor
 
 training_bp = Blueprint('training', __name__)
 
@@ -23,8 +33,7 @@ def get_current_user_id():
 
 # Video Upload and Management Routes
 
-# Configuration
-UPLOAD_FOLDER = 'uploads/videos'
+# Configuration (where videos are stored is decided by services/video_storage.py)
 MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
 ALLOWED_VIDEO_EXTENSIONS = {
     'mp4', 'mov', 'avi', 'mkv', 'wmv', 'flv', 'webm', 'm4v'
@@ -34,12 +43,6 @@ ALLOWED_MIME_TYPES = {
     'video/x-ms-wmv', 'video/x-flv', 'video/webm'
 }
 
-def ensure_upload_directory():
-    """Ensure upload directory exists"""
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    return UPLOAD_FOLDER
-
 def allowed_file(filename, file_content):
     """Check if file is allowed based on extension and MIME type"""
     if not filename:
@@ -53,7 +56,10 @@ def allowed_file(filename, file_content):
     if extension not in ALLOWED_VIDEO_EXTENSIONS:
         return False, f"File type .{extension} not allowed. Allowed types: {', '.join(ALLOWED_VIDEO_EXTENSIONS)}"
     
-    # Check MIME type
+    # Check MIME type (skipped when only the extension is being validated)
+    if file_content is None:
+        return True, None
+    
     try:
         mime_type = magic.from_buffer(file_content, mime=True)
         if mime_type not in ALLOWED_MIME_TYPES:
@@ -70,6 +76,55 @@ def generate_unique_filename(original_filename, user_id):
     unique_id = str(uuid.uuid4())
     return f"user_{user_id}_{unique_id}.{extension}"
 
+# Container MIME types for serving originals
+VIDEO_MIME_TYPES = {
+    'mp4': 'video/mp4', 'm4v': 'video/mp4', 'mov': 'video/quicktime',
+    'avi': 'video/x-msvideo', 'mkv': 'video/x-matroska', 'wmv': 'video/x-ms-wmv',
+    'flv': 'video/x-flv', 'webm': 'video/webm'
+}
+HLS_MIME_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t'
+}
+
+def get_video_mimetype(file_path):
+    """MIME type of a stored video based on its extension"""
+    extension = file_path.rsplit('.', 1)[-1].lower()
+    return VIDEO_MIME_TYPES.get(extension, 'video/mp4')
+
+def start_video_processing(video):
+    """Kick off background post-upload work: derived assets and HLS transcoding"""
+    try:
+        # Workers resolve the location to a readable URL when the job starts
+        get_video_asset_service().submit(current_app._get_current_object(), video.id, video.file_path)
+    except Exception as e:
+        print(f"⚠️ Could not queue asset generation for video {video.id}: {e}")
+    
+    if not current_app.TrainingVideo.status_listeners:
+        return  # No processing stage configured (e.g. ffmpeg missing)
+    # save() commits 'processing' before listeners queue the transcode, so a
+    # fast failure callback can't be overwritten by this request's commit
+    video.set_processing_status('processing')
+    video.save()
+
+def get_media_user_id():
+    """
+    Authenticate media requests from a token parameter or Authorization header
+    
+    <video>/<img> tags cannot send headers, so media routes accept ?token=.
+    Returns (user_id, token, error_message).
+    """
+    token = request.args.get('token') or request.headers.get('Authorization', '').replace('Bearer ', '')
+    if not token:
+        return None, None, 'Authentication required'
+    
+    try:
+        from flask_jwt_extended import decode_token
+        decoded_token = decode_token(token)
+        return int(decoded_token['sub']), token, None
+    except Exception:
+        return None, None, 'Invalid token'
+
 @training_bp.route('/videos', methods=['POST'])
 @jwt_required()
 def upload_video():
@@ -85,31 +140,27 @@ def upload_video():
         if file.filename == '':
             return jsonify({'message': 'No file selected'}), 400
         
-        # Read file content for validation
-        file_content = file.read()
-        file.seek(0)  # Reset file pointer
-        
-        # Validate file size
-        if len(file_content) > MAX_FILE_SIZE:
-            return jsonify({
-                'message': f'File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB'
-            }), 400
-        
-        # Validate file type
-        is_valid, error_message = allowed_file(file.filename, file_content)
+        # Validate extension before touching the body
+        is_valid, error_message = allowed_file(file.filename, None)
         if not is_valid:
             return jsonify({'message': error_message}), 400
         
-        # Ensure upload directory exists
-        upload_dir = ensure_upload_directory()
-        
         # Generate unique filename
         original_filename = secure_filename(file.filename)
         unique_filename = generate_unique_filename(original_filename, current_user_id)
-        file_path = os.path.join(upload_dir, unique_filename)
         
-        # Save file
-        file.save(file_path)
+        # Stream file into storage in chunks (MIME sniffed from the first few KB only)
+        try:
+            content_hasher = hashlib.sha256()
+            file_path, file_size = get_storage().save_stream(
+                file.stream,
+                unique_filename,
+                MAX_FILE_SIZE,
+                validator=lambda head: allowed_file(file.filename, head),
+                hasher=content_hasher
+            )
+        except ValueError as validation_error:
+            return jsonify({'message': str(validation_error)}), 400
         
         # Get additional metadata from request
         title = request.form.get('title', '').strip()
@@ -140,8 +191,9 @@ def upload_video():
             filename=unique_filename,
             original_filename=original_filename,
             file_path=file_path,
-            file_size=len(file_content),
+            file_size=file_size,
             duration=duration,
+            content_hash=content_hasher.hexdigest(),
             title=title if title else original_filename,
             description=description,
             technique_name=technique_name,
@@ -151,6 +203,7 @@ def upload_video():
         )
         
         video.save()
+        start_video_processing(video)
         
         print(f"✅ Video uploaded successfully: {original_filename} -> {unique_filename}")
         
@@ -167,55 +220,71 @@ def upload_video():
         
         # Clean up file if it was created
         try:
-            if 'file_path' in locals() and os.path.exists(file_path):
-                os.remove(file_path)
+            if 'file_path' in locals():
+                get_storage_for(file_path).delete(file_path)
         except:
             pass
             
         return jsonify({'message': f'Video upload failed: {str(e)}'}), 500
 
+def list_user_videos(current_user_id):
+    """
+    Video list response shared by /videos and /videos/list
+    
+    Without `limit` or `cursor` every matching video is returned (as
+    before); with either, a keyset page ordered by (created_at, id) newest
+    first plus `next_cursor` to fetch the following page.
+    """
+    # Get query parameters
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    technique_name = request.args.get('technique_name')
+    style = request.args.get('style')
+    analysis_status = request.args.get('analysis_status')
+    
+    TrainingVideo = current_app.TrainingVideo
+    
+    # Build query
+    query = TrainingVideo.query.filter_by(user_id=current_user_id)
+    
+    if technique_name:
+        query = query.filter_by(technique_name=technique_name)
+    if style:
+        query = query.filter_by(style=style)
+    if analysis_status:
+        query = query.filter_by(analysis_status=analysis_status)
+    
+    if limit or cursor:
+        videos, next_cursor = keyset_page(
+            query, [TrainingVideo.created_at, TrainingVideo.id], cursor, page_size(limit, cursor)
+        )
+    else:
+        videos = query.order_by(TrainingVideo.created_at.desc(), TrainingVideo.id.desc()).all()
+        next_cursor = None
+    
+    response = {
+        'videos': [video.to_dict() for video in videos],
+        'count': len(videos),
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        'message': f'Found {len(videos)} videos'
+    }
+    
+    # Video statistics cover all videos, so only the first page carries them
+    if not cursor:
+        response['stats'] = TrainingVideo.get_user_video_stats(current_user_id)
+    
+    return jsonify(response), 200
+
 @training_bp.route('/videos', methods=['GET'])
 @jwt_required()
 def get_videos():
     """Get all videos for the current user"""
     try:
-        current_user_id = get_current_user_id()
-        
-        # Get query parameters
-        limit = request.args.get('limit', type=int)
-        technique_name = request.args.get('technique_name')
-        style = request.args.get('style')
-        analysis_status = request.args.get('analysis_status')
-        
-        TrainingVideo = current_app.TrainingVideo
-        
-        # Build query
-        query = TrainingVideo.query.filter_by(user_id=current_user_id)
-        
-        if technique_name:
-            query = query.filter_by(technique_name=technique_name)
-        if style:
-            query = query.filter_by(style=style)
-        if analysis_status:
-            query = query.filter_by(analysis_status=analysis_status)
-            
-        query = query.order_by(TrainingVideo.created_at.desc())
-        
-        if limit:
-            query = query.limit(limit)
-            
-        videos = query.all()
-        
-        # Get video statistics
-        stats = TrainingVideo.get_user_video_stats(current_user_id)
-        
-        return jsonify({
-            'videos': [video.to_dict() for video in videos],
-            'count': len(videos),
-            'stats': stats,
-            'message': f'Found {len(videos)} videos'
-        }), 200
+        return list_user_videos(get_current_user_id())
         
+    except InvalidCursor:
+        return jsonify({'message': 'Invalid cursor'}), 400
     except Exception as e:
         print(f"❌ Get videos error: {str(e)}")
         return jsonify({'message': f'Failed to get videos: {str(e)}'}), 500
@@ -260,17 +329,27 @@ def get_video_file(video_id):
         if not video:
             return jsonify({'message': 'Video not found'}), 404
         
-        if not os.path.exists(video.file_path):
-            return jsonify({'message': 'Video file not found on disk'}), 404
+        storage = get_storage_for(video.file_path)
+        if not storage.exists(video.file_path):
+            return jsonify({'message': 'Video file not found in storage'}), 404
         
         # Determine if this should be a download or stream
         download = request.args.get('download', 'false').lower() == 'true'
         
-        return send_file(
+        # Remote storage: the client fetches (and range-requests) the object directly
+        presigned_url = storage.presigned_url(
             video.file_path,
+            download_name=video.original_filename if download else None
+        )
+        if presigned_url:
+            return redirect(presigned_url)
+        
+        # Range-aware response (206 partial content, ETag/Last-Modified revalidation)
+        return send_video_file(
+            video.file_path,
+            mimetype=get_video_mimetype(video.file_path),
             as_attachment=download,
-            download_name=video.original_filename if download else None,
-            mimetype='video/mp4'  # Default MIME type
+            download_name=video.original_filename if download else None
         )
         
     except Exception as e:
@@ -382,7 +461,13 @@ def get_video_stats():
 @training_bp.route('/sessions', methods=['GET'])
 @jwt_required()
 def get_training_sessions():
-    """Get all training sessions for the current user"""
+    """
+    Get training sessions for the current user
+    
+    Without `limit` or `cursor` every matching session is returned (as
+    before); with either, a keyset page ordered by (date, id) newest first
+    plus `next_cursor` to fetch the following page.
+    """
     try:
         current_user_id = get_current_user_id()  # Use helper function
         print(f"🔍 Getting sessions for user ID: {current_user_id}")
@@ -391,6 +476,7 @@ def get_training_sessions():
         
         # Get query parameters
         limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
         style = request.args.get('style')
         date_from = request.args.get('from')  # YYYY-MM-DD format
         date_to = request.args.get('to')      # YYYY-MM-DD format
@@ -417,17 +503,23 @@ def get_training_sessions():
             except ValueError:
                 return jsonify({'message': 'Invalid to date format. Use YYYY-MM-DD'}), 400
             
-        query = query.order_by(TrainingSession.date.desc())
-        
-        if limit:
-            query = query.limit(limit)
-            
-        sessions = query.all()
+        if limit or cursor:
+            try:
+                sessions, next_cursor = keyset_page(
+                    query, [TrainingSession.date, TrainingSession.id], cursor, page_size(limit, cursor)
+                )
+            except InvalidCursor:
+                return jsonify({'message': 'Invalid cursor'}), 400
+        else:
+            sessions = query.order_by(TrainingSession.date.desc(), TrainingSession.id.desc()).all()
+            next_cursor = None
         print(f"✅ Found {len(sessions)} sessions")
         
         return jsonify({
             'sessions': [session.to_dict() for session in sessions],
             'count': len(sessions),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
             'message': 'Training sessions retrieved successfully'
         }), 200
         
@@ -504,7 +596,10 @@ def create_training_session():
         )
         
         db.session.add(session)
+        get_training_rollup_service().session_saved(session)
+        get_training_context_service().session_saved(session)
         db.session.commit()
+        invalidate_user_insights(current_user_id)
         
         return jsonify({
             'message': 'Training session created successfully',
@@ -563,6 +658,8 @@ def update_training_session(session_id):
         if not data:
             return jsonify({'message': 'No data provided'}), 400
         
+        previous_state = session_state(session)
+        
         # Update fields
         if 'duration' in data:
             try:
@@ -601,7 +698,10 @@ def update_training_session(session_id):
                 setattr(session, field, data[field])
         
         session.updated_at = datetime.utcnow()
+        get_training_rollup_service().session_saved(session, previous=previous_state)
+        get_training_context_service().session_saved(session, previous=previous_state)
         db.session.commit()
+        invalidate_user_insights(current_user_id)
         
         return jsonify({
             'message': 'Training session updated successfully',
@@ -632,7 +732,10 @@ def delete_training_session(session_id):
             return jsonify({'message': 'Training session not found'}), 404
         
         db.session.delete(session)
+        get_training_rollup_service().session_deleted(session)
+        get_training_context_service().session_deleted(session)
         db.session.commit()
+        invalidate_user_insights(current_user_id)
         
         return jsonify({'message': 'Training session deleted successfully'}), 200
         
@@ -720,7 +823,9 @@ def create_technique_progress():
         )
         
         db.session.add(technique)
+        get_training_context_service().technique_saved(technique)
         db.session.commit()
+        invalidate_user_insights(current_user_id)
         
         return jsonify({
             'message': 'Technique progress created successfully',
@@ -769,7 +874,9 @@ def update_technique_progress(technique_id):
         if 'video_url' in data:
             technique.video_url = data['video_url']
         
+        get_training_context_service().technique_saved(technique)
         db.session.commit()
+        invalidate_user_insights(current_user_id)
         
         return jsonify({
             'message': 'Technique progress updated successfully',
@@ -800,7 +907,9 @@ def delete_technique_progress(technique_id):
             return jsonify({'message': 'Technique not found'}), 404
         
         db.session.delete(technique)
+        get_training_context_service().technique_deleted(technique)
         db.session.commit()
+        invalidate_user_insights(current_user_id)
         
         return jsonify({'message': 'Technique progress deleted successfully'}), 200
         
@@ -819,81 +928,14 @@ def get_training_stats():
         current_user_id = get_current_user_id()  # Use helper function
         print(f"🔍 Getting stats for user ID: {current_user_id}")
         
-        TrainingSession = current_app.TrainingSession
-        TechniqueProgress = current_app.TechniqueProgress
-        
-        # Get all sessions for the user
-        sessions = TrainingSession.query.filter_by(user_id=current_user_id).all()
-        print(f"📊 Found {len(sessions)} training sessions")
-        
-        if not sessions:
-            return jsonify({
-                'total_sessions': 0,
-                'total_hours': 0,
-                'avg_intensity': 0,
-                'styles_practiced': [],
-                'this_week': {'sessions': 0, 'hours': 0},
-                'this_month': {'sessions': 0, 'hours': 0},
-                'recent_sessions': [],
-                'technique_stats': {'total_techniques': 0, 'mastery_breakdown': {}},
-                'message': 'No training sessions found'
-            }), 200
-        
-        # Calculate statistics
-        total_sessions = len(sessions)
-        total_minutes = sum(session.duration for session in sessions)
-        total_hours = round(total_minutes / 60, 2)
-        
-        # Calculate average intensity
-        intensities = [session.intensity_level for session in sessions if session.intensity_level]
-        avg_intensity = round(sum(intensities) / len(intensities), 1) if intensities else 0
-        
-        # Get unique styles
-        styles_practiced = list(set(session.style for session in sessions))
-        
-        # Get recent sessions (last 10)
-        recent_sessions = sorted(sessions, key=lambda x: x.date, reverse=True)[:10]
-        
-        # Calculate weekly/monthly stats
-        from datetime import timedelta
-        today = date.today()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
+        result = compute_training_stats(current_user_id)
+        print(f"📊 Aggregated {result['total_sessions']} training sessions")
         
-        this_week_sessions = [s for s in sessions if s.date >= week_ago]
-        this_month_sessions = [s for s in sessions if s.date >= month_ago]
+        if not result['total_sessions']:
+            result['message'] = 'No training sessions found'
+            return jsonify(result), 200
         
-        # Get technique statistics
-        techniques = TechniqueProgress.query.filter_by(user_id=current_user_id).all()
-        print(f"🎯 Found {len(techniques)} techniques")
-        
-        technique_stats = {
-            'total_techniques': len(techniques),
-            'mastery_breakdown': {}
-        }
-        
-        # Count techniques by mastery status
-        for technique in techniques:
-            status = technique.mastery_status
-            technique_stats['mastery_breakdown'][status] = technique_stats['mastery_breakdown'].get(status, 0) + 1
-        
-        result = {
-            'total_sessions': total_sessions,
-            'total_hours': total_hours,
-            'avg_intensity': avg_intensity,
-            'styles_practiced': styles_practiced,
-            'this_week': {
-                'sessions': len(this_week_sessions),
-                'hours': round(sum(s.duration for s in this_week_sessions) / 60, 2)
-            },
-            'this_month': {
-                'sessions': len(this_month_sessions),
-                'hours': round(sum(s.duration for s in this_month_sessions) / 60, 2)
-            },
-            'recent_sessions': [session.to_dict() for session in recent_sessions],
-            'technique_stats': technique_stats,
-            'message': 'Training statistics retrieved successfully'
-        }
+        result['message'] = 'Training statistics retrieved successfully'
         
         print(f"✅ Stats calculated successfully")
         return jsonify(result), 200
@@ -905,6 +947,54 @@ def get_training_stats():
         current_app.logger.error(f"Get training stats error: {str(e)}")
         return jsonify({'message': f'Failed to get training statistics: {str(e)}'}), 500
 
+@training_bp.route('/stats/daily', methods=['GET'])
+@jwt_required()
+def get_daily_training_stats():
+    """
+    Per-day training totals for charts
+    Query params:
+    - days: number of days up to today (default 30, max 366)
+    - start_date / end_date: YYYY-MM-DD range instead of days
+    - style: only sessions of this style
+    """
+    try:
+        current_user_id = get_current_user_id()
+        
+        try:
+            end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() if request.args.get('end_date') else date.today()
+            if request.args.get('start_date'):
+                start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date()
+            else:
+                days = max(1, min(request.args.get('days', 30, type=int), MAX_SERIES_DAYS))
+                start_date = end_date - timedelta(days=days - 1)
+        except ValueError:
+            return jsonify({'message': 'Dates must be in YYYY-MM-DD format'}), 400
+        
+        if start_date > end_date:
+            return jsonify({'message': 'start_date must not be after end_date'}), 400
+        if (end_date - start_date).days >= MAX_SERIES_DAYS:
+            return jsonify({'message': f'Date range is limited to {MAX_SERIES_DAYS} days'}), 400
+        
+        series = get_training_rollup_service().daily_series(
+            current_user_id, start_date, end_date, style=request.args.get('style')
+        )
+        
+        return jsonify({
+            'days': series,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'totals': {
+                'sessions': sum(day['sessions'] for day in series),
+                'hours': round(sum(day['minutes'] for day in series) / 60, 2),
+                'calories': sum(day['calories'] for day in series)
+            },
+            'message': 'Daily training statistics retrieved successfully'
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get daily training stats error: {str(e)}")
+        return jsonify({'message': 'Failed to get daily training statistics'}), 500
+
 @training_bp.route('/styles', methods=['GET'])
 @jwt_required()
 def get_user_styles():
@@ -947,7 +1037,6 @@ def get_user_styles():
 # Video Upload and Management Routes
 
 # Configuration for video uploads
-UPLOAD_FOLDER = 'uploads/videos'
 MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
 ALLOWED_VIDEO_EXTENSIONS = {
     'mp4', 'mov', 'avi', 'mkv', 'wmv', 'flv', 'webm', 'm4v'
@@ -957,12 +1046,6 @@ ALLOWED_MIME_TYPES = {
     'video/x-ms-wmv', 'video/x-flv', 'video/webm'
 }
 
-def ensure_upload_directory():
-    """Ensure upload directory exists"""
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    return UPLOAD_FOLDER
-
 def allowed_file(filename, file_content):
     """Check if file is allowed based on extension and MIME type"""
     if not filename:
@@ -976,7 +1059,10 @@ def allowed_file(filename, file_content):
     if extension not in ALLOWED_VIDEO_EXTENSIONS:
         return False, f"File type .{extension} not allowed. Allowed types: {', '.join(ALLOWED_VIDEO_EXTENSIONS)}"
     
-    # Check MIME type
+    # Check MIME type (skipped when only the extension is being validated)
+    if file_content is None:
+        return True, None
+    
     try:
         mime_type = magic.from_buffer(file_content, mime=True)
         if mime_type not in ALLOWED_MIME_TYPES:
@@ -1008,31 +1094,27 @@ def upload_training_video():  # CHANGED FUNCTION NAME TO AVOID CONFLICTS
         if file.filename == '':
             return jsonify({'message': 'No file selected'}), 400
         
-        # Read file content for validation
-        file_content = file.read()
-        file.seek(0)  # Reset file pointer
-        
-        # Validate file size
-        if len(file_content) > MAX_FILE_SIZE:
-            return jsonify({
-                'message': f'File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB'
-            }), 400
-        
-        # Validate file type
-        is_valid, error_message = allowed_file(file.filename, file_content)
+        # Validate extension before touching the body
+        is_valid, error_message = allowed_file(file.filename, None)
         if not is_valid:
             return jsonify({'message': error_message}), 400
         
-        # Ensure upload directory exists
-        upload_dir = ensure_upload_directory()
-        
         # Generate unique filename
         original_filename = secure_filename(file.filename)
         unique_filename = generate_unique_filename(original_filename, current_user_id)
-        file_path = os.path.join(upload_dir, unique_filename)
         
-        # Save file
-        file.save(file_path)
+        # Stream file into storage in chunks (MIME sniffed from the first few KB only)
+        try:
+            content_hasher = hashlib.sha256()
+            file_path, file_size = get_storage().save_stream(
+                file.stream,
+                unique_filename,
+                MAX_FILE_SIZE,
+                validator=lambda head: allowed_file(file.filename, head),
+                hasher=content_hasher
+            )
+        except ValueError as validation_error:
+            return jsonify({'message': str(validation_error)}), 400
         
         # Get additional metadata from request
         title = request.form.get('title', '').strip()
@@ -1062,8 +1144,9 @@ def upload_training_video():  # CHANGED FUNCTION NAME TO AVOID CONFLICTS
             filename=unique_filename,
             original_filename=original_filename,
             file_path=file_path,
-            file_size=len(file_content),
+            file_size=file_size,
             duration=duration,
+            content_hash=content_hasher.hexdigest(),
             title=title if title else original_filename,
             description=description,
             technique_name=technique_name,
@@ -1073,6 +1156,7 @@ def upload_training_video():  # CHANGED FUNCTION NAME TO AVOID CONFLICTS
         )
         
         video.save()
+        start_video_processing(video)
         
         print(f"✅ Video uploaded successfully: {original_filename} -> {unique_filename}")
         
@@ -1089,55 +1173,257 @@ def upload_training_video():  # CHANGED FUNCTION NAME TO AVOID CONFLICTS
         
         # Clean up file if it was created
         try:
-            if 'file_path' in locals() and os.path.exists(file_path):
-                os.remove(file_path)
+            if 'file_path' in locals():
+                get_storage_for(file_path).delete(file_path)
         except:
             pass
             
         return jsonify({'message': f'Video upload failed: {str(e)}'}), 500
 
-@training_bp.route('/videos/list', methods=['GET'])  # CHANGED PATH TO AVOID CONFLICTS
+# Resumable (chunked) video uploads
+
+CHUNK_UPLOAD_FOLDER = 'uploads/chunks'
+
+def get_resumable_upload_store():
+    """Get the on-disk store used for resumable uploads"""
+    return ResumableUploadStore(CHUNK_UPLOAD_FOLDER, MAX_FILE_SIZE)
+
+def get_owned_upload(store, upload_id, user_id):
+    """Load an upload manifest and make sure it belongs to the user"""
+    try:
+        manifest = store.get_manifest(upload_id)
+    except ValueError:
+        return None
+    
+    if not manifest or manifest.get('user_id') != user_id:
+        return None
+    return manifest
+
+@training_bp.route('/videos/uploads', methods=['POST'])
 @jwt_required()
-def get_training_videos():  # CHANGED FUNCTION NAME TO AVOID CONFLICTS
-    """Get all videos for the current user"""
+def init_resumable_upload():
+    """Start a resumable upload and return its upload id"""
     try:
         current_user_id = get_current_user_id()
+        data = request.get_json()
         
-        # Get query parameters
-        limit = request.args.get('limit', type=int)
-        technique_name = request.args.get('technique_name')
-        style = request.args.get('style')
-        analysis_status = request.args.get('analysis_status')
+        if not data:
+            return jsonify({'message': 'No data provided'}), 400
         
-        TrainingVideo = current_app.TrainingVideo
+        # Sanitize before validating - secure_filename can strip the extension,
+        # which would otherwise only fail when the upload completes
+        filename = secure_filename((data.get('filename') or '').strip())
+        is_valid, error_message = allowed_file(filename, None)
+        if not is_valid:
+            return jsonify({'message': error_message}), 400
         
-        # Build query
-        query = TrainingVideo.query.filter_by(user_id=current_user_id)
+        try:
+            total_size = int(data.get('total_size'))
+        except (ValueError, TypeError):
+            return jsonify({'message': 'total_size must be a valid number'}), 400
         
-        if technique_name:
-            query = query.filter_by(technique_name=technique_name)
-        if style:
-            query = query.filter_by(style=style)
-        if analysis_status:
-            query = query.filter_by(analysis_status=analysis_status)
-            
-        query = query.order_by(TrainingVideo.created_at.desc())
+        chunk_size = data.get('chunk_size')
+        if chunk_size is not None:
+            try:
+                chunk_size = int(chunk_size)
+            except (ValueError, TypeError):
+                return jsonify({'message': 'chunk_size must be a valid number'}), 400
         
-        if limit:
-            query = query.limit(limit)
-            
-        videos = query.all()
+        # Parse tags
+        tags = data.get('tags', [])
+        if isinstance(tags, str):
+            tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+        
+        metadata = {
+            'title': (data.get('title') or '').strip(),
+            'description': (data.get('description') or '').strip(),
+            'technique_name': (data.get('technique_name') or '').strip(),
+            'style': (data.get('style') or '').strip(),
+            'is_private': bool(data.get('is_private', True)),
+            'tags': tags
+        }
         
-        # Get video statistics
-        stats = TrainingVideo.get_user_video_stats(current_user_id)
+        store = get_resumable_upload_store()
+        try:
+            manifest = store.create(
+                current_user_id,
+                filename,
+                total_size,
+                chunk_size=chunk_size,
+                metadata=metadata
+            )
+        except ValueError as validation_error:
+            return jsonify({'message': str(validation_error)}), 400
+        
+        print(f"📦 Resumable upload started: {manifest['upload_id']} ({total_size} bytes, {manifest['total_chunks']} chunks)")
         
         return jsonify({
-            'videos': [video.to_dict() for video in videos],
-            'count': len(videos),
-            'stats': stats,
-            'message': f'Found {len(videos)} videos'
+            'message': 'Upload initialized',
+            'upload_id': manifest['upload_id'],
+            'chunk_size': manifest['chunk_size'],
+            'total_chunks': manifest['total_chunks'],
+            'total_size': manifest['total_size']
+        }), 201
+        
+    except Exception as e:
+        print(f"❌ Upload init error: {str(e)}")
+        return jsonify({'message': f'Failed to initialize upload: {str(e)}'}), 500
+
+@training_bp.route('/videos/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_resumable_upload_status(upload_id):
+    """Report which chunks of an upload the server already has"""
+    try:
+        current_user_id = get_current_user_id()
+        store = get_resumable_upload_store()
+        
+        if not get_owned_upload(store, upload_id, current_user_id):
+            return jsonify({'message': 'Upload not found'}), 404
+        
+        return jsonify({
+            'upload': store.get_status(upload_id),
+            'message': 'Upload status retrieved successfully'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'Failed to get upload status: {str(e)}'}), 500
+
+@training_bp.route('/videos/uploads/<upload_id>/chunks/<int:chunk_index>', methods=['PUT'])
+@jwt_required()
+def upload_video_chunk(upload_id, chunk_index):
+    """Store one numbered chunk (raw request body) of a resumable upload"""
+    try:
+        current_user_id = get_current_user_id()
+        store = get_resumable_upload_store()
+        
+        if not get_owned_upload(store, upload_id, current_user_id):
+            return jsonify({'message': 'Upload not found'}), 404
+        
+        try:
+            store.write_chunk(upload_id, chunk_index, request.stream)
+        except ValueError as validation_error:
+            return jsonify({'message': str(validation_error)}), 400
+        
+        status = store.get_status(upload_id)
+        
+        return jsonify({
+            'message': f'Chunk {chunk_index} stored',
+            'chunk_index': chunk_index,
+            'received_bytes': status['received_bytes'],
+            'missing_chunks': status['missing_chunks'],
+            'complete': status['complete']
         }), 200
         
+    except Exception as e:
+        print(f"❌ Chunk upload error: {str(e)}")
+        return jsonify({'message': f'Failed to store chunk: {str(e)}'}), 500
+
+@training_bp.route('/videos/uploads/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_resumable_upload(upload_id):
+    """Assemble a fully received upload and create the video record"""
+    try:
+        current_user_id = get_current_user_id()
+        store = get_resumable_upload_store()
+        
+        manifest = get_owned_upload(store, upload_id, current_user_id)
+        if not manifest:
+            return jsonify({'message': 'Upload not found'}), 404
+        
+        original_filename = manifest['filename']
+        unique_filename = generate_unique_filename(original_filename, current_user_id)
+        assembled_path = os.path.join(CHUNK_UPLOAD_FOLDER, f'{upload_id}.assembled')
+        
+        # Chunks are already in place on disk - finalizing is a validate + hash
+        # + rename, then a move into storage (a rename again for local storage)
+        try:
+            content_hasher = hashlib.sha256()
+            store.finalize(
+                upload_id,
+                assembled_path,
+                validator=lambda head: allowed_file(original_filename, head),
+                hasher=content_hasher
+            )
+        except ValueError as validation_error:
+            return jsonify({'message': str(validation_error)}), 400
+        
+        try:
+            file_path = get_storage().save_file(assembled_path, unique_filename)
+        finally:
+            if os.path.exists(assembled_path):
+                os.remove(assembled_path)
+        
+        metadata = manifest.get('metadata', {})
+        TrainingVideo = current_app.TrainingVideo
+        
+        video = TrainingVideo(
+            user_id=current_user_id,
+            filename=unique_filename,
+            original_filename=original_filename,
+            file_path=file_path,
+            file_size=manifest['total_size'],
+            duration=None,
+            content_hash=content_hasher.hexdigest(),
+            title=metadata.get('title') or original_filename,
+            description=metadata.get('description'),
+            technique_name=metadata.get('technique_name'),
+            style=metadata.get('style'),
+            is_private=metadata.get('is_private', True),
+            tags=metadata.get('tags', [])
+        )
+        
+        video.save()
+        start_video_processing(video)
+        
+        print(f"✅ Resumable upload completed: {original_filename} -> {unique_filename}")
+        
+        return jsonify({
+            'message': 'Video uploaded successfully',
+            'video': video.to_dict(),
+            'next_steps': 'Video is ready for AI analysis'
+        }), 201
+        
+    except Exception as e:
+        print(f"❌ Upload completion error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        
+        # Clean up file if it was moved into place
+        try:
+            if 'file_path' in locals():
+                get_storage_for(file_path).delete(file_path)
+        except:
+            pass
+        
+        return jsonify({'message': f'Failed to complete upload: {str(e)}'}), 500
+
+@training_bp.route('/videos/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_resumable_upload(upload_id):
+    """Abort a resumable upload and discard received chunks"""
+    try:
+        current_user_id = get_current_user_id()
+        store = get_resumable_upload_store()
+        
+        if not get_owned_upload(store, upload_id, current_user_id):
+            return jsonify({'message': 'Upload not found'}), 404
+        
+        store.discard(upload_id)
+        
+        return jsonify({'message': 'Upload aborted'}), 200
+        
+    except Exception as e:
+        return jsonify({'message': f'Failed to abort upload: {str(e)}'}), 500
+
+@training_bp.route('/videos/list', methods=['GET'])  # CHANGED PATH TO AVOID CONFLICTS
+@jwt_required()
+def get_training_videos():  # CHANGED FUNCTION NAME TO AVOID CONFLICTS
+    """Get all videos for the current user"""
+    try:
+        return list_user_videos(get_current_user_id())
+        
+    except InvalidCursor:
+        return jsonify({'message': 'Invalid cursor'}), 400
     except Exception as e:
         print(f"❌ Get videos error: {str(e)}")
         return jsonify({'message': f'Failed to get videos: {str(e)}'}), 500
@@ -1197,28 +1483,40 @@ def stream_training_video_with_auth(video_id):  # Remove @jwt_required() decorat
             print(f"❌ Video {video_id} not found for user {current_user_id}")
             return jsonify({'message': 'Video not found'}), 404
         
-        if not os.path.exists(video.file_path):
-            print(f"❌ Video file not found on disk: {video.file_path}")
-            return jsonify({'message': 'Video file not found on disk'}), 404
+        storage = get_storage_for(video.file_path)
+        if not storage.exists(video.file_path):
+            print(f"❌ Video file not found in storage: {video.file_path}")
+            return jsonify({'message': 'Video file not found in storage'}), 404
         
         print(f"✅ Streaming video: {video.original_filename} ({video.file_size} bytes)")
         
         # Determine if this should be a download or stream
         download = request.args.get('download', 'false').lower() == 'true'
         
+        # Adaptive streaming once the HLS renditions are ready
+        if not download and request.args.get('format') == 'hls' and video.hls_playlist_path:
+            return redirect(f'/api/training/videos/{video.id}/hls/master.m3u8?token={token}')
+        
+        # Remote storage: presigned ranged GETs straight from the bucket
+        presigned_url = storage.presigned_url(
+            video.file_path,
+            download_name=video.original_filename if download else None
+        )
+        if presigned_url:
+            return redirect(presigned_url)
+        
         if download:
-            return send_file(
+            return send_video_file(
                 video.file_path,
+                mimetype=get_video_mimetype(video.file_path),
                 as_attachment=True,
-                download_name=video.original_filename,
-                mimetype='video/mp4'
+                download_name=video.original_filename
             )
         
-        # Simple file streaming (without range requests for now)
-        return send_file(
+        # Byte-range streaming so the player only fetches what it seeks to
+        return send_video_file(
             video.file_path,
-            mimetype='video/mp4',
-            conditional=True
+            mimetype=get_video_mimetype(video.file_path)
         )
         
     except Exception as e:
@@ -1227,6 +1525,173 @@ def stream_training_video_with_auth(video_id):  # Remove @jwt_required() decorat
         traceback.print_exc()
         return jsonify({'message': f'Failed to stream video: {str(e)}'}), 500
 
+def add_token_to_playlist(playlist_text, token):
+    """Append the stream token to every URI in a playlist so segment requests authenticate"""
+    lines = []
+    for line in playlist_text.splitlines():
+        if line and not line.startswith('#'):
+            line = f'{line}?token={token}'
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+@training_bp.route('/videos/<int:video_id>/hls/<path:filename>', methods=['GET'])
+def stream_training_video_hls(video_id, filename):
+    """Serve HLS playlists and segments (token parameter auth, like /stream)"""
+    try:
+        current_user_id, token, auth_error = get_media_user_id()
+        if auth_error:
+            return jsonify({'message': auth_error}), 401
+        
+        TrainingVideo = current_app.TrainingVideo
+        
+        video = TrainingVideo.query.filter_by(
+            id=video_id,
+            user_id=current_user_id
+        ).first()
+        
+        if not video or not video.hls_playlist_path:
+            return jsonify({'message': 'HLS stream not available'}), 404
+        
+        extension = os.path.splitext(filename)[1].lower()
+        file_path = safe_join(os.path.dirname(video.hls_playlist_path), filename)
+        if extension not in HLS_MIME_TYPES or not file_path or not os.path.isfile(file_path):
+            return jsonify({'message': 'HLS file not found'}), 404
+        
+        # Playlists are tiny and need the token threaded through their URIs
+        if extension == '.m3u8':
+            with open(file_path) as playlist_file:
+                playlist = add_token_to_playlist(playlist_file.read(), token)
+            return Response(playlist, mimetype=HLS_MIME_TYPES[extension],
+                            headers={'Cache-Control': 'private, no-cache'})
+        
+        # Segments are immutable once transcoded
+        return send_video_file(file_path, mimetype=HLS_MIME_TYPES[extension], max_age=86400)
+        
+    except Exception as e:
+        print(f"❌ Video streaming error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'message': f'Failed to stream video: {str(e)}'}), 500
+
+# Derived assets (poster, sprite sheet, keyframes)
+
+ASSET_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.webp': 'image/webp'
+}
+
+def get_video_with_assets(video_id, user_id):
+    """Return (video, manifest) for a user's video; manifest is None until assets are generated"""
+    video = current_app.TrainingVideo.query.filter_by(id=video_id, user_id=user_id).first()
+    if not video:
+        return None, None
+    return video, load_manifest(video.assets_path)
+
+def send_asset_file(video, filename):
+    """Serve one file from a video's asset directory with long-lived caching"""
+    extension = os.path.splitext(filename)[1].lower()
+    file_path = safe_join(video.assets_path, filename)
+    if extension not in ASSET_MIME_TYPES or not file_path or not os.path.isfile(file_path):
+        return jsonify({'message': 'Asset not found'}), 404
+    return send_video_file(file_path, mimetype=ASSET_MIME_TYPES[extension], max_age=86400)
+
+@training_bp.route('/videos/<int:video_id>/thumbnail', methods=['GET'])
+def get_video_thumbnail(video_id):
+    """Poster image for a video (?size=small for list views)"""
+    try:
+        current_user_id, token, auth_error = get_media_user_id()
+        if auth_error:
+            return jsonify({'message': auth_error}), 401
+        
+        video, manifest = get_video_with_assets(video_id, current_user_id)
+        if not video:
+            return jsonify({'message': 'Video not found'}), 404
+        if not manifest:
+            return jsonify({'message': 'Thumbnail not generated yet'}), 404
+        
+        poster = manifest['poster_small'] if request.args.get('size') == 'small' else manifest['poster']
+        return send_asset_file(video, poster)
+        
+    except Exception as e:
+        print(f"❌ Thumbnail error: {str(e)}")
+        return jsonify({'message': f'Failed to get thumbnail: {str(e)}'}), 500
+
+@training_bp.route('/videos/<int:video_id>/assets', methods=['GET'])
+@jwt_required()
+def get_video_assets(video_id):
+    """Describe a video's derived assets (poster, scrub sprite grid, keyframes)"""
+    try:
+        current_user_id = get_current_user_id()
+        
+        video, manifest = get_video_with_assets(video_id, current_user_id)
+        if not video:
+            return jsonify({'message': 'Video not found'}), 404
+        if not manifest:
+            return jsonify({
+                'message': 'Assets not generated yet',
+                'video_id': video_id,
+                'ready': False
+            }), 200
+        
+        base_url = f'/api/training/videos/{video_id}/assets'
+        sprite = manifest.get('sprite')
+        
+        return jsonify({
+            'video_id': video_id,
+            'ready': True,
+            'poster_url': f'{base_url}/{manifest["poster"]}',
+            'poster_small_url': f'{base_url}/{manifest["poster_small"]}',
+            'sprite': dict(sprite, url=f'{base_url}/{sprite["file"]}') if sprite else None,
+            'keyframes': [
+                dict(keyframe, url=f'{base_url}/{keyframe["file"]}')
+                for keyframe in manifest.get('keyframes', [])
+            ]
+        }), 200
+        
+    except Exception as e:
+        print(f"❌ Video assets error: {str(e)}")
+        return jsonify({'message': f'Failed to get video assets: {str(e)}'}), 500
+
+@training_bp.route('/videos/<int:video_id>/assets/<path:filename>', methods=['GET'])
+def get_video_asset_file(video_id, filename):
+    """Serve a poster, sprite sheet or keyframe image (token parameter auth)"""
+    try:
+        current_user_id, token, auth_error = get_media_user_id()
+        if auth_error:
+            return jsonify({'message': auth_error}), 401
+        
+        video, manifest = get_video_with_assets(video_id, current_user_id)
+        if not video or not manifest:
+            return jsonify({'message': 'Asset not found'}), 404
+        
+        return send_asset_file(video, filename)
+        
+    except Exception as e:
+        print(f"❌ Video asset error: {str(e)}")
+        return jsonify({'message': f'Failed to get asset: {str(e)}'}), 500
+
+@training_bp.route('/videos/<int:video_id>/assets', methods=['POST'])
+@jwt_required()
+def regenerate_video_assets(video_id):
+    """(Re)generate derived assets, e.g. for videos uploaded before assets existed"""
+    try:
+        current_user_id = get_current_user_id()
+        
+        video = current_app.TrainingVideo.query.filter_by(id=video_id, user_id=current_user_id).first()
+        if not video:
+            return jsonify({'message': 'Video not found'}), 404
+        storage = get_storage_for(video.file_path)
+        if not storage.exists(video.file_path):
+            return jsonify({'message': 'Video file not found in storage'}), 404
+        
+        get_video_asset_service().submit(current_app._get_current_object(), video.id, video.file_path)
+        
+        return jsonify({'message': 'Asset generation started', 'video_id': video_id}), 202
+        
+    except Exception as e:
+        print(f"❌ Asset generation error: {str(e)}")
+        return jsonify({'message': f'Failed to start asset generation: {str(e)}'}), 500
+
 @training_bp.route('/videos/<int:video_id>/update', methods=['PUT'])  # CHANGED PATH TO AVOID CONFLICTS
 @jwt_required()
 def update_training_video(video_id):  # CHANGED FUNCTION NAME TO AVOID CONFLICTS
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 import re
+from services.training_context import get_training_context_service
 
 user_bp = Blueprint('user', __name__)
 
@@ -136,6 +137,7 @@ def update_user_profile():
         
         # Update timestamp
         user.updated_at = datetime.utcnow()
+        get_training_context_service().profile_saved(user)
         
         # Save changes
         try:
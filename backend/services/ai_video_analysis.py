@@ -1,12 +1,45 @@
 import os
-import cv2
-import tempfile
 import json
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import google.generativeai as genai
 from PIL import Image
 import numpy as np
+from services.frame_extraction import get_video_info, iter_key_frames, iter_motion_key_frames
+from services.pose_estimation import POSE_ESTIMATION, estimate_pose_metrics, summarize_for_prompt
+from services.llm_executor import LLM_BACKEND, create_model, get_llm_executor
+
+GEMINI_MODEL = 'gemini-1.5-flash'
+POSE_MODEL_FRAMES = 6  # Images sent alongside measured pose metrics (the numbers carry the detail)
+FRAME_SELECTION = os.getenv('FRAME_SELECTION', 'motion')  # 'motion' or 'uniform'
+
+# Called with (stage, current, total, message) as an analysis moves through its stages
+ProgressCallback = Callable[[str, Optional[int], Optional[int], Optional[str]], None]
+
+def report_progress(progress_callback: Optional[ProgressCallback], stage: str,
+                    current: int = None, total: int = None, message: str = None):
+    """Invoke a progress callback, never letting it break the analysis"""
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(stage, current, total, message)
+    except Exception as e:
+        print(f"⚠️ Progress callback failed: {str(e)}")
+
+def analysis_cache_model() -> str:
+    """
+    Model identity for analysis cache keys - pose metrics change the prompt and
+    image count, and the frame selection strategy changes which images are sent
+    """
+    model = f"{GEMINI_MODEL}+pose" if POSE_ESTIMATION != 'off' else GEMINI_MODEL
+    return f"{model}+{FRAME_SELECTION}"
+
+def select_model_frames(frames: List, count: int) -> List:
+    """Evenly spaced subset of frames, keeping the first and last"""
+    if len(frames) <= count:
+        return frames
+    indices = np.linspace(0, len(frames) - 1, count).round().astype(int)
+    return [frames[i] for i in indices]
 
 class AIVideoAnalysisService:
     """
@@ -16,26 +49,31 @@ class AIVideoAnalysisService:
     def __init__(self):
         """Initialize the AI service with Gemini configuration"""
         self.api_key = os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
+        if not self.api_key and LLM_BACKEND != 'fake':
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
-        # Configure Gemini
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        # Configure Gemini (LLM_BACKEND=fake swaps in a local model for testing)
+        if self.api_key:
+            genai.configure(api_key=self.api_key)
+        self.model = create_model(GEMINI_MODEL)
         
         # Analysis configuration
         self.max_frames = 10  # Number of frames to analyze per video
+        self.max_frame_size = 1024  # Longest side of frames sent to Gemini
+        self.frame_selection = FRAME_SELECTION
         self.analysis_timeout = 60  # Seconds
         
         print("🤖 AI Video Analysis Service initialized with Gemini 1.5 Flash")
 
-    def extract_key_frames(self, video_path: str, num_frames: int = 10) -> List[Image.Image]:
+    def extract_key_frames(self, video_path: str, num_frames: int = 10,
+                           progress_callback: Optional[ProgressCallback] = None) -> List[Image.Image]:
         """
         Extract key frames from video for AI analysis
         
         Args:
             video_path: Path to the video file
             num_frames: Number of frames to extract
+            progress_callback: Receives an 'extracting_frames' n/N update per frame
             
         Returns:
             List of PIL Images representing key frames
@@ -43,49 +81,17 @@ class AIVideoAnalysisService:
         try:
             print(f"📹 Extracting {num_frames} key frames from video...")
             
-            # Open video with OpenCV
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise ValueError(f"Could not open video file: {video_path}")
-            
-            # Get video properties
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames, fps = get_video_info(video_path)
             duration = total_frames / fps if fps > 0 else 0
             
             print(f"📊 Video stats: {total_frames} frames, {fps:.2f} FPS, {duration:.2f}s")
             
-            # Calculate frame indices to extract (evenly distributed)
-            if total_frames <= num_frames:
-                frame_indices = list(range(total_frames))
-            else:
-                frame_indices = [int(i * total_frames / num_frames) for i in range(num_frames)]
-            
+            report_progress(progress_callback, 'extracting_frames', 0, num_frames)
             extracted_frames = []
+            for frame in self.iter_key_frames(video_path, num_frames):
+                extracted_frames.append(frame)
+                report_progress(progress_callback, 'extracting_frames', len(extracted_frames), num_frames)
             
-            for frame_idx in frame_indices:
-                # Set video position to specific frame
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = cap.read()
-                
-                if ret:
-                    # Convert BGR (OpenCV) to RGB (PIL)
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    
-                    # Convert to PIL Image
-                    pil_image = Image.fromarray(frame_rgb)
-                    
-                    # Resize if too large (Gemini has size limits)
-                    max_size = 1024
-                    if max(pil_image.size) > max_size:
-                        pil_image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-                    
-                    extracted_frames.append(pil_image)
-                    print(f"✅ Extracted frame {frame_idx}/{total_frames} ({len(extracted_frames)}/{num_frames})")
-                else:
-                    print(f"⚠️ Could not extract frame {frame_idx}")
-            
-            cap.release()
             print(f"🎬 Successfully extracted {len(extracted_frames)} frames")
             return extracted_frames
             
@@ -93,7 +99,26 @@ class AIVideoAnalysisService:
             print(f"❌ Error extracting frames: {str(e)}")
             return []
 
-    def generate_analysis_prompt(self, technique_name: str = None, martial_art_style: str = None) -> str:
+    def iter_key_frames(self, video_path: str, num_frames: int = 10) -> Iterator[Image.Image]:
+        """
+        Yield key frames as they are decoded (sequential passes, no seeking)
+        
+        With motion selection, frames come from the peak-motion window and
+        near-duplicates are dropped, so fewer than num_frames may be returned.
+        
+        Args:
+            video_path: Path to the video file
+            num_frames: Maximum number of frames to extract
+            
+        Yields:
+            PIL Images, already resized for Gemini
+        """
+        if self.frame_selection == 'motion':
+            return iter_motion_key_frames(video_path, num_frames, max_size=self.max_frame_size)
+        return iter_key_frames(video_path, num_frames, max_size=self.max_frame_size)
+
+    @staticmethod
+    def generate_analysis_prompt(technique_name: str = None, martial_art_style: str = None) -> str:
         """
         Generate a comprehensive prompt for martial arts technique analysis
         
@@ -197,7 +222,9 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
         return base_prompt
 
     def analyze_technique_frames(self, frames: List[Image.Image], technique_name: str = None, 
-                               martial_art_style: str = None) -> Dict:
+                               martial_art_style: str = None,
+                               progress_callback: Optional[ProgressCallback] = None,
+                               pose_metrics: Optional[Dict] = None) -> Dict:
         """
         Analyze martial arts technique using extracted video frames
         
@@ -205,6 +232,9 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
             frames: List of PIL Images from the video
             technique_name: Specific technique being analyzed
             martial_art_style: Martial art style context
+            progress_callback: Receives 'calling_model' and 'parsing' stage updates
+            pose_metrics: Measured pose metrics; their numeric summary is added to the
+                prompt and fewer images are sent
             
         Returns:
             Comprehensive analysis results dictionary
@@ -218,22 +248,31 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
             # Generate analysis prompt
             prompt = self.generate_analysis_prompt(technique_name, martial_art_style)
             
+            # Measured numbers say more than extra images - send a compact summary instead
+            if pose_metrics and pose_metrics.get('frames_with_pose'):
+                prompt += "\n" + summarize_for_prompt(pose_metrics) + "\n"
+                frames = select_model_frames(frames, POSE_MODEL_FRAMES)
+            
             # Prepare content for Gemini (prompt + images)
             content = [prompt] + frames
             
             print("🤖 Sending frames to Gemini for analysis...")
+            report_progress(progress_callback, 'calling_model', message=f'Sending {len(frames)} frames to {GEMINI_MODEL}')
             
-            # Generate analysis with Gemini
-            response = self.model.generate_content(
+            # Generate analysis with Gemini (shared executor: rate limit, retries, deadline)
+            response = get_llm_executor().generate(
+                self.model,
                 content,
                 generation_config=genai.types.GenerationConfig(
                     candidate_count=1,
                     max_output_tokens=2048,
                     temperature=0.7,  # Slightly creative but mostly factual
-                )
+                ),
+                timeout=self.analysis_timeout
             )
             
             print("✅ Received analysis from Gemini")
+            report_progress(progress_callback, 'parsing')
             
             # Extract and parse the response
             analysis_text = response.text
@@ -252,7 +291,7 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
                     # Add metadata
                     analysis_data['analysis_timestamp'] = datetime.utcnow().isoformat()
                     analysis_data['frames_analyzed'] = len(frames)
-                    analysis_data['ai_model'] = 'gemini-1.5-flash'
+                    analysis_data['ai_model'] = GEMINI_MODEL
                     analysis_data['raw_response'] = analysis_text
                     
                     print("🎯 Analysis successfully parsed and structured")
@@ -266,7 +305,7 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
                         "raw_analysis": analysis_text,
                         "analysis_timestamp": datetime.utcnow().isoformat(),
                         "frames_analyzed": len(frames),
-                        "ai_model": 'gemini-1.5-flash'
+                        "ai_model": GEMINI_MODEL
                     }
                     
             except json.JSONDecodeError as json_error:
@@ -276,7 +315,7 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
                     "raw_analysis": analysis_text,
                     "analysis_timestamp": datetime.utcnow().isoformat(),
                     "frames_analyzed": len(frames),
-                    "ai_model": 'gemini-1.5-flash'
+                    "ai_model": GEMINI_MODEL
                 }
                 
         except Exception as e:
@@ -288,7 +327,9 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
             }
 
     def analyze_video_file(self, video_path: str, technique_name: str = None, 
-                          martial_art_style: str = None) -> Dict:
+                          martial_art_style: str = None, frames: Optional[List[Image.Image]] = None,
+                          progress_callback: Optional[ProgressCallback] = None,
+                          pose_metrics: Optional[Dict] = None) -> Dict:
         """
         Complete video analysis pipeline: extract frames and analyze technique
         
@@ -296,6 +337,10 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
             video_path: Path to the video file to analyze
             technique_name: Specific technique being performed
             martial_art_style: Martial art style context
+            frames: Pre-extracted key frames (e.g. from the video's asset store); extracted if None
+            progress_callback: Called with (stage, current, total, message) at each stage
+            pose_metrics: Metrics from an earlier analysis of the same video; estimated
+                from the frames when None and POSE_ESTIMATION is enabled
             
         Returns:
             Complete analysis results
@@ -305,8 +350,12 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
             print(f"🥋 Technique: {technique_name or 'Auto-detect'}")
             print(f"🎯 Style: {martial_art_style or 'Auto-detect'}")
             
-            # Step 1: Extract key frames
-            frames = self.extract_key_frames(video_path, self.max_frames)
+            # Step 1: Extract key frames (unless they were already stored)
+            if frames:
+                print(f"🗂️ Using {len(frames)} stored key frames")
+                report_progress(progress_callback, 'extracting_frames', len(frames), len(frames), 'Using stored key frames')
+            else:
+                frames = self.extract_key_frames(video_path, self.max_frames, progress_callback)
             
             if not frames:
                 return {
@@ -314,12 +363,22 @@ Be thorough, constructive, and encouraging in your analysis. Focus on helping th
                     "video_path": video_path
                 }
             
-            # Step 2: Analyze technique
+            # Step 2: Measure joint angles on CPU (optional)
+            if pose_metrics is None and POSE_ESTIMATION != 'off':
+                report_progress(progress_callback, 'estimating_pose', message=f'Detecting pose in {len(frames)} frames')
+                try:
+                    pose_metrics = estimate_pose_metrics(frames)
+                except Exception as e:
+                    # Pose metrics are an enhancement - the analysis runs without them
+                    print(f"⚠️ Pose estimation failed: {str(e)}")
+            
+            # Step 3: Analyze technique
             analysis_results = self.analyze_technique_frames(
-                frames, technique_name, martial_art_style
+                frames, technique_name, martial_art_style, progress_callback, pose_metrics
             )
+            analysis_results['pose_metrics'] = pose_metrics
             
-            # Step 3: Add video metadata
+            # Step 4: Add video metadata
             analysis_results['video_path'] = video_path
             analysis_results['extraction_success'] = len(frames) > 0
             
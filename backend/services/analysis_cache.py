@@ -0,0 +1,211 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import func, update, insert
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+ANALYSIS_CACHE_TTL_DAYS = int(os.getenv('ANALYSIS_CACHE_TTL_DAYS', '30'))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv('ANALYSIS_CACHE_MAX_MB', '100')) * 1024 * 1024
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', '5000'))
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Result fields that describe one particular run rather than the video
+UNCACHED_FIELDS = {'video_path', 'extraction_success'}
+
+
+def hash_file(file_path, chunk_size=HASH_CHUNK_SIZE):
+    """sha256 of a stored video (local path or storage location), read in fixed-size chunks"""
+    from services.video_storage import get_storage_for
+
+    digest = hashlib.sha256()
+    f = get_storage_for(file_path).open(file_path)
+    try:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    finally:
+        f.close()
+    return digest.hexdigest()
+
+
+def get_video_content_hash(video, db):
+    """Content hash of a TrainingVideo, computed once and stored on the row"""
+    if not video.content_hash:
+        video.content_hash = hash_file(video.file_path)
+        db.session.commit()
+    return video.content_hash
+
+
+def make_cache_key(video_hash, prompt, ai_model):
+    """Cache key: identical bytes + identical prompt + same model -> same analysis"""
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f'{video_hash}:{prompt_hash}:{ai_model}'.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Database-backed cache of AI analysis results
+
+    Lives in the database so the web process and every analysis worker share
+    entries and counters. Entries expire after a TTL and the least recently
+    used ones are evicted when the cache grows past its size/entry limits.
+    """
+
+    def __init__(self, db, models, ttl_days=ANALYSIS_CACHE_TTL_DAYS,
+                 max_bytes=ANALYSIS_CACHE_MAX_BYTES, max_entries=ANALYSIS_CACHE_MAX_ENTRIES):
+        self.db = db
+        self.AnalysisCacheEntry = models['AnalysisCacheEntry']
+        self.AnalysisCacheStat = models['AnalysisCacheStat']
+        self.ttl = timedelta(days=ttl_days)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+    def get(self, cache_key, record_miss=True):
+        """
+        Look up cached results
+
+        Args:
+            cache_key: Key from make_cache_key
+            record_miss: False for opportunistic re-checks that should not skew the miss count
+
+        Returns:
+            Results dict, or None on a miss
+        """
+        AnalysisCacheEntry = self.AnalysisCacheEntry
+        entry = AnalysisCacheEntry.query.filter_by(cache_key=cache_key).first()
+
+        if entry and entry.created_at and entry.created_at < datetime.utcnow() - self.ttl:
+            self.db.session.delete(entry)
+            self.db.session.commit()
+            self._increment('evictions')
+            entry = None
+
+        if not entry:
+            if record_miss:
+                self._increment('misses')
+            return None
+
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_accessed_at = datetime.utcnow()
+        self.db.session.commit()
+        self._increment('hits')
+        return dict(entry.results)
+
+    def put(self, cache_key, video_hash, ai_model, results):
+        """Store results for a key (overwrites an existing entry) and enforce limits"""
+        AnalysisCacheEntry = self.AnalysisCacheEntry
+        cached_results = {k: v for k, v in results.items() if k not in UNCACHED_FIELDS}
+        size_bytes = len(json.dumps(cached_results, default=str))
+
+        entry = AnalysisCacheEntry.query.filter_by(cache_key=cache_key).first()
+        if not entry:
+            entry = AnalysisCacheEntry(cache_key=cache_key, video_hash=video_hash, ai_model=ai_model, hit_count=0)
+            self.db.session.add(entry)
+
+        entry.results = cached_results
+        entry.size_bytes = size_bytes
+        entry.created_at = datetime.utcnow()
+        entry.last_accessed_at = datetime.utcnow()
+
+        try:
+            self.db.session.commit()
+        except IntegrityError:
+            # Another worker stored the same key first - theirs is just as good
+            self.db.session.rollback()
+            return
+
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until within limits"""
+        AnalysisCacheEntry = self.AnalysisCacheEntry
+        evicted = AnalysisCacheEntry.query.filter(
+            AnalysisCacheEntry.created_at < datetime.utcnow() - self.ttl
+        ).delete(synchronize_session=False)
+
+        count, total_bytes = self.db.session.query(
+            func.count(AnalysisCacheEntry.id), func.coalesce(func.sum(AnalysisCacheEntry.size_bytes), 0)
+        ).one()
+
+        if count > self.max_entries or total_bytes > self.max_bytes:
+            oldest = self.db.session.query(
+                AnalysisCacheEntry.id, AnalysisCacheEntry.size_bytes
+            ).order_by(AnalysisCacheEntry.last_accessed_at).yield_per(500)
+
+            doomed = []
+            for entry_id, size_bytes in oldest:
+                if count <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                doomed.append(entry_id)
+                count -= 1
+                total_bytes -= size_bytes or 0
+
+            if doomed:
+                evicted += AnalysisCacheEntry.query.filter(
+                    AnalysisCacheEntry.id.in_(doomed)
+                ).delete(synchronize_session=False)
+
+        self.db.session.commit()
+        if evicted:
+            self._increment('evictions', evicted)
+        return evicted
+
+    def _increment(self, name, amount=1):
+        """Bump a counter on its own connection (atomic across processes)"""
+        table = self.AnalysisCacheStat.__table__
+        try:
+            with self.db.engine.begin() as connection:
+                result = connection.execute(
+                    update(table).where(table.c.name == name).values(value=table.c.value + amount)
+                )
+                if result.rowcount == 0:
+                    connection.execute(insert(table).values(name=name, value=amount))
+        except IntegrityError:
+            # Counter row was created concurrently - retry as an update
+            with self.db.engine.begin() as connection:
+                connection.execute(
+                    update(table).where(table.c.name == name).values(value=table.c.value + amount)
+                )
+        except Exception as e:
+            logger.warning(f"Could not update analysis cache counter {name}: {e}")
+
+    def get_stats(self):
+        """Hit/miss counters plus current size"""
+        AnalysisCacheEntry = self.AnalysisCacheEntry
+        counters = {stat.name: stat.value for stat in self.AnalysisCacheStat.query.all()}
+        count, total_bytes = self.db.session.query(
+            func.count(AnalysisCacheEntry.id), func.coalesce(func.sum(AnalysisCacheEntry.size_bytes), 0)
+        ).one()
+
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        lookups = hits + misses
+
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0,
+            'evictions': counters.get('evictions', 0),
+            'entries': count,
+            'size_mb': round(total_bytes / (1024 * 1024), 2),
+            'max_size_mb': round(self.max_bytes / (1024 * 1024), 2),
+            'max_entries': self.max_entries,
+            'ttl_days': self.ttl.days
+        }
+
+
+def get_analysis_cache():
+    """Build an AnalysisCache from the current app's models"""
+    from flask import current_app
+
+    return AnalysisCache(
+        current_app.extensions['sqlalchemy'],
+        {
+            'AnalysisCacheEntry': current_app.AnalysisCacheEntry,
+            'AnalysisCacheStat': current_app.AnalysisCacheStat
+        }
+    )
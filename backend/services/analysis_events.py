@@ -0,0 +1,191 @@
+import json
+import time
+import queue
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Event stream configuration
+EVENT_POLL_SECONDS = 1.0  # How often the broker reads worker progress from the database
+KEEPALIVE_SECONDS = 15  # Comment line sent on idle streams so proxies keep them open
+MAX_STREAM_SECONDS = 30 * 60  # Streams are closed after this; EventSource reconnects on its own
+SUBSCRIBER_QUEUE_SIZE = 50
+TERMINAL_STAGES = {'done', 'failed'}
+
+
+def build_progress_event(analysis, job=None) -> Dict:
+    """
+    Progress snapshot of one analysis, as sent to stream clients
+
+    Every event carries the full current state, so a client that misses
+    one (or connects late) is never out of sync.
+
+    Args:
+        analysis: VideoAnalysis row
+        job: Latest AnalysisJob for the analysis, if any
+
+    Returns:
+        Dict with analysis_id, status, stage and optional current/total/message
+    """
+    progress = (job.progress if job is not None else None) or {}
+    event = {
+        'analysis_id': analysis.id,
+        'status': analysis.analysis_status,
+        'stage': 'queued',
+        'current': None,
+        'total': None,
+        'message': None,
+        'attempt': job.attempts if job is not None else None
+    }
+
+    if analysis.analysis_status == 'completed':
+        event.update(stage='done', message='Analysis complete')
+        event['overall_score'] = analysis.overall_score
+    elif analysis.analysis_status == 'failed':
+        event.update(stage='failed', message=analysis.error_message)
+    elif job is not None and job.status == 'running':
+        event.update(
+            stage=progress.get('stage', 'starting'),
+            current=progress.get('current'),
+            total=progress.get('total'),
+            message=progress.get('message')
+        )
+    elif job is not None and job.status == 'queued' and (job.attempts or 0) > 0:
+        event.update(
+            stage='retrying',
+            message=f"Retrying after: {job.last_error}" if job.last_error else 'Retrying'
+        )
+        event['retry_at'] = job.run_after.isoformat() if job.run_after else None
+
+    return event
+
+
+def event_signature(event: Dict):
+    """Fields that make an event worth sending again"""
+    return (event['status'], event['stage'], event['current'], event['attempt'])
+
+
+def format_sse(event: Dict, event_name: str = 'progress') -> str:
+    """Serialize an event in text/event-stream format"""
+    return f"event: {event_name}\ndata: {json.dumps(event)}\n\n"
+
+
+class AnalysisEventBroker:
+    """
+    In-process pub/sub for analysis progress
+
+    Analyses run in separate worker processes, which record their current
+    stage on the job row (see AnalysisQueue.report_progress). One broker
+    thread per web process reads those rows for every analysis that has a
+    listener - a single query per tick no matter how many clients are
+    connected - and publishes changes to the subscribers' queues.
+    """
+
+    def __init__(self, poll_interval=EVENT_POLL_SECONDS):
+        self.poll_interval = poll_interval
+        self._subscribers = {}  # analysis_id -> set of queue.Queue
+        self._last_sent = {}  # analysis_id -> event_signature
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, app, analysis_id) -> queue.Queue:
+        """Register a listener; the returned queue receives progress events"""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(analysis_id, set()).add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._poll_loop, args=(app,), daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, analysis_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(analysis_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[analysis_id]
+                self._last_sent.pop(analysis_id, None)
+
+    def publish(self, analysis_id, event):
+        """Deliver an event to every listener of an analysis"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(analysis_id, ()))
+            self._last_sent[analysis_id] = event_signature(event)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # Slow client - events are full snapshots, so skipping one is harmless
+                pass
+
+    def prime(self, event):
+        """Note an initial snapshot sent directly to a new client, unless others are ahead of it"""
+        with self._lock:
+            self._last_sent.setdefault(event['analysis_id'], event_signature(event))
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _poll_loop(self, app):
+        """Broker thread: runs while anyone is listening"""
+        while True:
+            with self._lock:
+                analysis_ids = list(self._subscribers)
+                if not analysis_ids:
+                    self._thread = None
+                    return
+
+            try:
+                with app.app_context():
+                    try:
+                        events = self.load_events(app, analysis_ids)
+                    finally:
+                        # The poll thread's own session; never the request's
+                        app.extensions['sqlalchemy'].session.remove()
+                    for event in events:
+                        with self._lock:
+                            unchanged = self._last_sent.get(event['analysis_id']) == event_signature(event)
+                        if not unchanged:
+                            self.publish(event['analysis_id'], event)
+            except Exception as e:
+                logger.warning(f"Analysis event poll failed: {e}")
+
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def load_events(app, analysis_ids):
+        """
+        Current progress events for many analyses in two queries
+
+        Uses the caller's session (the poll thread's or the request's) and
+        leaves its lifecycle to the caller.
+        """
+        VideoAnalysis = app.VideoAnalysis
+        AnalysisJob = app.AnalysisJob
+
+        analyses = VideoAnalysis.query.filter(VideoAnalysis.id.in_(analysis_ids)).all()
+        jobs = {}
+        for job in AnalysisJob.query.filter(
+            AnalysisJob.analysis_id.in_(analysis_ids)
+        ).order_by(AnalysisJob.id):
+            jobs[job.analysis_id] = job  # Latest job per analysis wins
+
+        return [build_progress_event(analysis, jobs.get(analysis.id)) for analysis in analyses]
+
+    def load_event(self, app, analysis_id) -> Optional[Dict]:
+        events = self.load_events(app, [analysis_id])
+        return events[0] if events else None
+
+
+# Global broker instance (one per web process)
+analysis_event_broker = AnalysisEventBroker()
+
+def get_analysis_event_broker() -> AnalysisEventBroker:
+    """Get the global analysis event broker"""
+    return analysis_event_broker
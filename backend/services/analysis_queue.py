@@ -0,0 +1,353 @@
+import os
+import random
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, update, func, select
+from services.video_storage import get_storage_for
+
+logger = logging.getLogger(__name__)
+
+# Queue configuration
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '2'))
+LEASE_SECONDS = int(os.getenv('ANALYSIS_LEASE_SECONDS', '120'))  # Reclaimed if not renewed in time
+HEARTBEAT_SECONDS = max(5, LEASE_SECONDS // 4)
+POLL_INTERVAL_SECONDS = 2.0
+MAX_ATTEMPTS = 3
+MAX_RUNNING_PER_USER = int(os.getenv('ANALYSIS_MAX_PER_USER', '2'))  # One user's batch can't occupy every worker
+BATCH_PRIORITY = -1  # Single "analyze" clicks run ahead of queued batch work
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 30 * 60
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: 30s, 60s, 120s ... capped at 30 minutes"""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay + random.uniform(0, delay * 0.1)
+
+
+class LeaseLost(Exception):
+    """The job was reclaimed by another worker; this worker's outcome must not be recorded"""
+
+
+class AnalysisQueue:
+    """
+    Database-backed job queue for AI video analyses
+
+    The web process only enqueues; worker processes (see analysis_worker.py)
+    claim jobs under a time-limited lease which they renew with heartbeats.
+    A job whose lease expires - because its worker crashed or was killed - is
+    claimable again, so nothing is lost across restarts.
+
+    Claims are fair across users: users with the fewest running jobs go
+    first and nobody holds more than `max_running_per_user` workers (a soft
+    limit - two workers claiming in the same instant may overshoot by one),
+    so one coach's 40-video batch cannot starve everyone else.
+    """
+
+    def __init__(self, db, models, lease_seconds=LEASE_SECONDS, max_running_per_user=MAX_RUNNING_PER_USER):
+        self.db = db
+        self.AnalysisJob = models['AnalysisJob']
+        self.VideoAnalysis = models['VideoAnalysis']
+        self.TrainingVideo = models.get('TrainingVideo')
+        self.lease_seconds = lease_seconds
+        self.max_running_per_user = max_running_per_user
+
+    def enqueue(self, analysis, video_path, priority=0, max_attempts=MAX_ATTEMPTS, cache_key=None, video_hash=None):
+        """Queue a VideoAnalysis row for processing (caller commits)"""
+        job = self.AnalysisJob(
+            analysis_id=analysis.id,
+            video_id=analysis.video_id,
+            user_id=analysis.user_id,
+            status='queued',
+            priority=priority,
+            max_attempts=max_attempts,
+            run_after=datetime.utcnow(),
+            payload={
+                'video_path': video_path,
+                'technique_name': analysis.technique_name,
+                'martial_art_style': analysis.martial_art_style,
+                'cache_key': cache_key,
+                'video_hash': video_hash
+            }
+        )
+        self.db.session.add(job)
+        self.db.session.flush()
+        return job
+
+    def _claimable(self, now):
+        AnalysisJob = self.AnalysisJob
+        return or_(
+            and_(AnalysisJob.status == 'queued', AnalysisJob.run_after <= now),
+            # Lease ran out without a heartbeat - the worker is gone
+            and_(AnalysisJob.status == 'running', AnalysisJob.lease_expires_at < now)
+        )
+
+    def _running_per_user(self, now):
+        """Subquery of live (unexpired) running jobs per user"""
+        AnalysisJob = self.AnalysisJob
+        return select(
+            AnalysisJob.user_id.label('user_id'),
+            func.count(AnalysisJob.id).label('running')
+        ).where(
+            AnalysisJob.status == 'running',
+            AnalysisJob.lease_expires_at >= now
+        ).group_by(AnalysisJob.user_id).subquery()
+
+    def claim(self, worker_id, batch=5):
+        """
+        Atomically claim the next runnable job for a worker
+
+        Uses a conditional UPDATE per candidate so two workers can never
+        claim the same job, on both SQLite and PostgreSQL. Candidates are
+        ordered by how many jobs their user already has running, then by
+        priority and age; users at the per-user limit are skipped.
+
+        Returns:
+            The claimed AnalysisJob, or None if nothing is runnable
+        """
+        AnalysisJob = self.AnalysisJob
+        now = datetime.utcnow()
+
+        running = self._running_per_user(now)
+        running_count = func.coalesce(running.c.running, 0)
+
+        candidates = self.db.session.query(AnalysisJob.id).outerjoin(
+            running, running.c.user_id == AnalysisJob.user_id
+        ).filter(
+            self._claimable(now),
+            running_count < self.max_running_per_user
+        ).order_by(
+            running_count, AnalysisJob.priority.desc(), AnalysisJob.run_after, AnalysisJob.id
+        ).limit(batch).all()
+
+        for (job_id,) in candidates:
+            result = self.db.session.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == job_id)
+                .where(self._claimable(now))
+                .values(
+                    status='running',
+                    lease_owner=worker_id,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    heartbeat_at=now,
+                    progress={'stage': 'starting'},
+                    attempts=AnalysisJob.attempts + 1,
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            self.db.session.commit()
+
+            if result.rowcount == 1:
+                return self.db.session.get(AnalysisJob, job_id)
+
+        return None
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        Renew a job lease
+
+        Runs on its own connection so it can be called from a heartbeat
+        thread while the job itself holds the session.
+
+        Returns:
+            False if the lease was lost (another worker reclaimed the job)
+        """
+        AnalysisJob = self.AnalysisJob
+        now = datetime.utcnow()
+
+        with self.db.engine.begin() as connection:
+            result = connection.execute(
+                update(AnalysisJob.__table__)
+                .where(AnalysisJob.id == job_id)
+                .where(AnalysisJob.lease_owner == worker_id)
+                .where(AnalysisJob.status == 'running')
+                .values(
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    heartbeat_at=now
+                )
+            )
+        return result.rowcount == 1
+
+    def report_progress(self, job_id, worker_id, stage, current=None, total=None, message=None):
+        """
+        Record the stage a running job has reached (read by the SSE broker)
+
+        Runs on its own connection, like heartbeat(), so it never commits
+        the job's session halfway through.
+        """
+        AnalysisJob = self.AnalysisJob
+        progress = {'stage': stage, 'current': current, 'total': total, 'message': message}
+
+        try:
+            with self.db.engine.begin() as connection:
+                connection.execute(
+                    update(AnalysisJob.__table__)
+                    .where(AnalysisJob.id == job_id)
+                    .where(AnalysisJob.lease_owner == worker_id)
+                    .values(progress=progress, updated_at=datetime.utcnow())
+                )
+        except Exception as e:
+            logger.warning(f"Could not record progress for job {job_id}: {e}")
+
+    def _release(self, job, worker_id, **values):
+        """
+        Record a job outcome and release its lease, only while `worker_id` holds it
+
+        Commits together with whatever the caller changed in the session
+        (e.g. the analysis results), so a worker that lost its lease never
+        overwrites the new owner's work.
+
+        Raises:
+            LeaseLost: If another worker reclaimed the job (nothing is committed)
+        """
+        AnalysisJob = self.AnalysisJob
+        result = self.db.session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job.id)
+            .where(AnalysisJob.lease_owner == worker_id)
+            .values(lease_owner=None, lease_expires_at=None, updated_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            self.db.session.rollback()
+            raise LeaseLost(f'Job {job.id} is no longer leased to {worker_id}')
+        self.db.session.commit()
+
+    def will_retry(self, job):
+        """Whether a failed attempt of `job` would be rescheduled"""
+        return (job.attempts or 0) < (job.max_attempts or MAX_ATTEMPTS)
+
+    def complete(self, job, worker_id):
+        """Mark a job as done and release its lease (raises LeaseLost)"""
+        self._release(job, worker_id, status='completed', last_error=None)
+
+    def fail(self, job, error, worker_id):
+        """
+        Record a failed attempt, rescheduling with backoff while attempts remain
+
+        Returns:
+            True if the job will be retried
+
+        Raises:
+            LeaseLost: If another worker reclaimed the job
+        """
+        will_retry = self.will_retry(job)
+        if will_retry:
+            values = {'status': 'queued', 'run_after': datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts or 1))}
+        else:
+            values = {'status': 'failed'}
+
+        self._release(job, worker_id, last_error=str(error)[:2000], **values)
+        return will_retry
+
+    def recover_stale_analyses(self):
+        """
+        Startup sweep for work orphaned by a crash or restart
+
+        - running jobs with an expired lease go back to 'queued'
+        - pending/processing VideoAnalysis rows without a live job (e.g. rows
+          left by the old in-process threads) are re-queued if the video file
+          still exists and marked failed otherwise
+
+        Returns:
+            Dict with the number of jobs requeued, analyses requeued and analyses failed
+        """
+        AnalysisJob = self.AnalysisJob
+        VideoAnalysis = self.VideoAnalysis
+        now = datetime.utcnow()
+
+        requeued_jobs = AnalysisJob.query.filter(
+            AnalysisJob.status == 'running',
+            AnalysisJob.lease_expires_at < now
+        ).update({
+            'status': 'queued',
+            'lease_owner': None,
+            'lease_expires_at': None,
+            'run_after': now
+        }, synchronize_session=False)
+
+        live_analysis_ids = self.db.session.query(AnalysisJob.analysis_id).filter(
+            AnalysisJob.status.in_(['queued', 'running'])
+        )
+        stale_analyses = VideoAnalysis.query.filter(
+            VideoAnalysis.analysis_status.in_(['pending', 'processing']),
+            ~VideoAnalysis.id.in_(live_analysis_ids)
+        ).all()
+
+        requeued_analyses = 0
+        failed_analyses = 0
+        for analysis in stale_analyses:
+            video = self.db.session.get(self.TrainingVideo, analysis.video_id) if self.TrainingVideo else None
+            video_path = getattr(video, 'file_path', None)
+
+            if video_path and get_storage_for(video_path).exists(video_path):
+                analysis.analysis_status = 'pending'
+                self.enqueue(analysis, video_path)
+                requeued_analyses += 1
+            else:
+                analysis.analysis_status = 'failed'
+                analysis.error_message = 'Analysis interrupted and video file is no longer available'
+                analysis.completed_at = now
+                failed_analyses += 1
+
+        self.db.session.commit()
+
+        return {
+            'requeued_jobs': requeued_jobs,
+            'requeued_analyses': requeued_analyses,
+            'failed_analyses': failed_analyses
+        }
+
+    def get_batch_progress(self, batch_id):
+        """
+        Aggregate progress of every analysis in a batch
+
+        Returns:
+            Dict with counts by status, percent done and the average score so far
+        """
+        VideoAnalysis = self.VideoAnalysis
+        rows = self.db.session.query(
+            VideoAnalysis.analysis_status,
+            func.count(VideoAnalysis.id),
+            func.avg(VideoAnalysis.overall_score)
+        ).filter(VideoAnalysis.batch_id == batch_id).group_by(VideoAnalysis.analysis_status).all()
+
+        counts = {'pending': 0, 'processing': 0, 'completed': 0, 'failed': 0}
+        average_score = None
+        for status, count, average in rows:
+            counts[status] = count
+            if status == 'completed' and average is not None:
+                average_score = round(float(average), 2)
+
+        total = sum(counts.values())
+        finished = counts['completed'] + counts['failed']
+
+        return {
+            'total': total,
+            'counts': counts,
+            'finished': finished,
+            'percent_complete': round(finished / total * 100, 1) if total else 100.0,
+            'done': finished == total,
+            'average_score': average_score
+        }
+
+    def get_stats(self):
+        """Job counts by status"""
+        AnalysisJob = self.AnalysisJob
+        rows = self.db.session.query(AnalysisJob.status, func.count(AnalysisJob.id)).group_by(AnalysisJob.status).all()
+        return {status: count for status, count in rows}
+
+
+def get_analysis_queue():
+    """Build an AnalysisQueue from the current app's models"""
+    from flask import current_app
+
+    return AnalysisQueue(
+        current_app.extensions['sqlalchemy'],
+        {
+            'AnalysisJob': current_app.AnalysisJob,
+            'VideoAnalysis': current_app.VideoAnalysis,
+            'TrainingVideo': getattr(current_app, 'TrainingVideo', None)
+        }
+    )
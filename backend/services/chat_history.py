@@ -0,0 +1,128 @@
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from services.gemini_service import CHAT_CONTEXT_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+# Chat history configuration
+KEEP_VERBATIM_MESSAGES = 8  # Recent messages left out of the summary when older ones are folded in
+SUMMARY_MAX_CHARS = 2000
+MAX_MESSAGE_CHARS = 4000
+TITLE_MAX_CHARS = 60
+
+# Called with (previous_summary, messages) and returns the new summary
+Summarizer = Callable[[Optional[str], List[Dict]], str]
+
+
+class ChatHistoryService:
+    """
+    Server-side memory of AI coach conversations
+
+    The prompt for a turn is built from the conversation's rolling summary
+    plus the messages not yet in it, so its size stays bounded however long
+    the conversation gets. When CHAT_CONTEXT_MESSAGES unsummarized messages
+    have piled up, all but the last KEEP_VERBATIM_MESSAGES are folded into
+    the summary in one model call - a summary call every few turns rather
+    than every turn.
+    """
+
+    def _models(self):
+        return current_app.ChatConversation, current_app.ChatMessage
+
+    def _db(self):
+        return current_app.extensions['sqlalchemy']
+
+    def get_conversation(self, user_id, conversation_id):
+        ChatConversation, _ = self._models()
+        return ChatConversation.query.filter_by(id=conversation_id, user_id=int(user_id)).first()
+
+    def start_conversation(self, user_id, first_message: str):
+        ChatConversation, _ = self._models()
+        title = ' '.join(first_message.split())
+        if len(title) > TITLE_MAX_CHARS:
+            title = title[:TITLE_MAX_CHARS - 3].rstrip() + '...'
+
+        conversation = ChatConversation(user_id=int(user_id), title=title, message_count=0, summarized_through_id=0)
+        self._db().session.add(conversation)
+        self._db().session.flush()
+        return conversation
+
+    def add_message(self, conversation, role: str, content: str):
+        """Store a message (the caller commits)"""
+        _, ChatMessage = self._models()
+        message = ChatMessage(conversation_id=conversation.id, role=role, content=content[:MAX_MESSAGE_CHARS])
+        self._db().session.add(message)
+        conversation.message_count = (conversation.message_count or 0) + 1
+        conversation.updated_at = datetime.utcnow()
+        self._db().session.flush()
+        return message
+
+    def build_context(self, conversation) -> Tuple[Optional[str], List[Dict]]:
+        """
+        Prompt context of a conversation
+
+        Returns:
+            (summary of older turns or None, the messages not in the summary oldest first)
+        """
+        _, ChatMessage = self._models()
+        recent = ChatMessage.query.filter(
+            ChatMessage.conversation_id == conversation.id,
+            ChatMessage.id > (conversation.summarized_through_id or 0)
+        ).order_by(ChatMessage.id.desc()).limit(CHAT_CONTEXT_MESSAGES).all()
+
+        history = [{'role': message.role, 'content': message.content} for message in reversed(recent)]
+        return conversation.summary, history
+
+    def summarize_if_needed(self, conversation, summarizer: Summarizer) -> bool:
+        """
+        Fold messages that fell out of the context window into the summary
+
+        Returns:
+            True if the summary was updated (the caller commits)
+        """
+        _, ChatMessage = self._models()
+        unsummarized = ChatMessage.query.filter(
+            ChatMessage.conversation_id == conversation.id,
+            ChatMessage.id > (conversation.summarized_through_id or 0)
+        )
+        if unsummarized.count() < CHAT_CONTEXT_MESSAGES:
+            return False
+
+        # Everything except the messages that stay quoted verbatim
+        window_start = unsummarized.order_by(ChatMessage.id.desc()).offset(KEEP_VERBATIM_MESSAGES - 1).first()
+        to_fold = unsummarized.filter(ChatMessage.id < window_start.id).order_by(ChatMessage.id).all()
+        if not to_fold:
+            return False
+
+        summary = summarizer(conversation.summary, [message.to_dict() for message in to_fold])
+        conversation.summary = summary[-SUMMARY_MAX_CHARS:]  # Newest facts win if it ever overflows
+        conversation.summarized_through_id = to_fold[-1].id
+        return True
+
+    def list_conversations(self, user_id, page=1, per_page=20):
+        ChatConversation, _ = self._models()
+        return ChatConversation.query.filter_by(user_id=int(user_id)).order_by(
+            ChatConversation.updated_at.desc(), ChatConversation.id.desc()
+        ).paginate(page=page, per_page=per_page, error_out=False)
+
+    def list_messages(self, conversation, page=1, per_page=50):
+        """Messages newest first, so page 1 is the end of the conversation"""
+        _, ChatMessage = self._models()
+        return ChatMessage.query.filter_by(conversation_id=conversation.id).order_by(
+            ChatMessage.id.desc()
+        ).paginate(page=page, per_page=per_page, error_out=False)
+
+    def delete_conversation(self, conversation):
+        self._db().session.delete(conversation)
+
+
+# Global chat history service instance
+chat_history_service = ChatHistoryService()
+
+def get_chat_history_service() -> ChatHistoryService:
+    """Get the global chat history service instance"""
+    return chat_history_service
@@ -0,0 +1,267 @@
+import cv2
+from typing import Iterable, Iterator, List, Tuple
+from PIL import Image
+import numpy as np
+
+# Frames sent to Gemini are downscaled to fit within this box
+MAX_FRAME_SIZE = 1024
+
+# Motion-aware selection
+MOTION_ANALYSIS_WIDTH = 160  # Motion is measured on small grayscale frames
+MOTION_SAMPLES = 300  # Upper bound on frames inspected for motion
+PEAK_WINDOW_THRESHOLD = 0.25  # Window extends while motion stays above this fraction of the peak
+MOTION_WEIGHT = 0.7  # Share of picks driven by motion (the rest spread evenly over the window)
+DUPLICATE_HASH_DISTANCE = 6  # dHash bits (of 64) below which two frames count as duplicates
+
+
+def get_video_info(video_path: str) -> Tuple[int, float]:
+    """Return (frame_count, fps) as reported by the container"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS)
+    finally:
+        cap.release()
+
+
+def sample_frame_indices(total_frames: int, num_frames: int) -> List[int]:
+    """Evenly spaced frame indices across the video"""
+    if total_frames <= num_frames:
+        return list(range(total_frames))
+    return [int(i * total_frames / num_frames) for i in range(num_frames)]
+
+
+def iter_frames_sequential(video_path: str, frame_indices: Iterable[int]) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Decode a video once, front to back, yielding only the requested frames
+
+    grab() advances the demuxer/decoder without converting the frame, and
+    retrieve() is only called for selected indices, so no frame is decoded
+    twice - unlike CAP_PROP_POS_FRAMES seeks, which restart decoding from
+    the previous keyframe every time.
+
+    Args:
+        video_path: Path to the video file
+        frame_indices: Frame numbers to yield (any order, duplicates ignored)
+
+    Yields:
+        (frame_index, BGR frame) tuples in ascending frame order
+    """
+    wanted = sorted(set(frame_indices))
+    if not wanted:
+        return
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+
+    try:
+        position = 0
+        for target in wanted:
+            # Skip cheaply up to the next wanted frame
+            while position < target:
+                if not cap.grab():
+                    return  # Container over-reported its frame count
+                position += 1
+
+            if not cap.grab():
+                return
+            position += 1
+
+            ret, frame = cap.retrieve()
+            if ret:
+                yield target, frame
+    finally:
+        cap.release()
+
+
+def iter_frames_seek(video_path: str, frame_indices: Iterable[int]) -> Iterator[Tuple[int, np.ndarray]]:
+    """Seek-per-frame extraction (the previous approach, kept for benchmarking)"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+
+    try:
+        for frame_idx in sorted(set(frame_indices)):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            ret, frame = cap.read()
+            if ret:
+                yield frame_idx, frame
+    finally:
+        cap.release()
+
+
+def to_pil_image(frame: np.ndarray, max_size: int = MAX_FRAME_SIZE) -> Image.Image:
+    """Convert a BGR OpenCV frame to an RGB PIL image that fits Gemini's size limits"""
+    height, width = frame.shape[:2]
+    scale = max_size / max(height, width)
+    if scale < 1:
+        # Downscale in OpenCV before the PIL conversion - much cheaper on large frames
+        frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+
+def iter_key_frames(video_path: str, num_frames: int = 10, max_size: int = MAX_FRAME_SIZE) -> Iterator[Image.Image]:
+    """
+    Yield evenly spaced key frames as PIL images while the video is decoded
+
+    Frames are converted as they arrive, so callers can resize/encode or
+    upload each one without waiting for the whole video.
+    """
+    total_frames, _ = get_video_info(video_path)
+    for _, frame in iter_frames_sequential(video_path, sample_frame_indices(total_frames, num_frames)):
+        yield to_pil_image(frame, max_size)
+
+
+def _small_gray(frame: np.ndarray, width: int = MOTION_ANALYSIS_WIDTH) -> np.ndarray:
+    """Downscaled grayscale copy of a frame used for motion and hashing"""
+    height, frame_width = frame.shape[:2]
+    small = cv2.resize(frame, (width, max(1, int(height * width / frame_width))), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def compute_motion_energy(video_path: str, max_samples: int = MOTION_SAMPLES) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Measure motion across the video in one sequential pass
+
+    Returns:
+        (frame_indices, energy, gray_frames) where energy[i] is the mean
+        absolute pixel change between sample i-1 and sample i
+    """
+    total_frames, _ = get_video_info(video_path)
+    stride = max(1, total_frames // max_samples) if total_frames else 1
+
+    indices = []
+    grays = []
+    for frame_idx, frame in iter_frames_sequential(video_path, range(0, total_frames, stride)):
+        indices.append(frame_idx)
+        grays.append(_small_gray(frame))
+
+    if not grays:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32), np.empty((0, 0, 0), dtype=np.uint8)
+
+    stack = np.stack(grays)
+    if len(stack) < 2:
+        return np.array(indices), np.zeros(len(stack), dtype=np.float32), stack
+
+    # Vectorised frame differencing over the whole stack at once
+    diffs = np.abs(np.diff(stack.astype(np.int16), axis=0)).mean(axis=(1, 2))
+    energy = np.concatenate([diffs[:1], diffs]).astype(np.float32)
+    return np.array(indices), energy, stack
+
+
+def find_peak_motion_window(energy: np.ndarray, threshold: float = PEAK_WINDOW_THRESHOLD) -> Tuple[int, int]:
+    """
+    Locate the contiguous stretch of samples around the motion peak
+
+    Returns:
+        Inclusive (start, end) sample positions; the whole range if there is no motion
+    """
+    count = len(energy)
+    if count == 0:
+        return 0, -1
+    if energy.max() <= 0:
+        return 0, count - 1
+
+    # Smooth over ~2% of the clip so single noisy frames don't define the window
+    kernel_size = min(count, max(3, count // 50) | 1)
+    smoothed = np.convolve(energy, np.ones(kernel_size) / kernel_size, mode='same')
+
+    peak = int(smoothed.argmax())
+    quiet = np.flatnonzero(smoothed < smoothed[peak] * threshold)
+    before = quiet[quiet < peak]
+    after = quiet[quiet > peak]
+    start = int(before[-1]) + 1 if len(before) else 0
+    end = int(after[0]) - 1 if len(after) else count - 1
+
+    # Keep a little lead-in/follow-through around the technique
+    padding = max(1, (end - start) // 10)
+    return max(0, start - padding), min(count - 1, end + padding)
+
+
+def perceptual_hash(gray: np.ndarray) -> int:
+    """64-bit difference hash (dHash) of a grayscale frame"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    return bin(hash_a ^ hash_b).count('1')
+
+
+def select_motion_frames(video_path: str, max_frames: int = 10, min_frames: int = 3,
+                         duplicate_distance: int = DUPLICATE_HASH_DISTANCE) -> List[int]:
+    """
+    Choose the most informative frames: inside the peak-motion window,
+    weighted towards high motion, with near-duplicates removed
+
+    Args:
+        video_path: Path to the video file
+        max_frames: Upper bound on frames returned
+        min_frames: Duplicates are kept rather than going below this many frames
+        duplicate_distance: dHash Hamming distance treated as "the same frame"
+
+    Returns:
+        Sorted list of frame indices (empty if the video could not be read)
+    """
+    indices, energy, grays = compute_motion_energy(video_path)
+    if len(indices) == 0:
+        return []
+
+    start, end = find_peak_motion_window(energy)
+    window_energy = energy[start:end + 1].astype(np.float64)
+    window_size = len(window_energy)
+
+    # Spread picks by cumulative motion, blended with an even spread
+    if window_energy.sum() > 0:
+        weights = MOTION_WEIGHT * window_energy / window_energy.sum() + (1 - MOTION_WEIGHT) / window_size
+    else:
+        weights = np.full(window_size, 1.0 / window_size)
+    cumulative = np.cumsum(weights)
+    targets = (np.arange(max_frames) + 0.5) / max_frames * cumulative[-1]
+    positions = np.unique(np.clip(np.searchsorted(cumulative, targets), 0, window_size - 1)) + start
+
+    # Drop near-duplicates (static stretches, held poses)
+    candidates = [int(p) for p in positions]
+    hashes = {p: perceptual_hash(grays[p]) for p in candidates}
+    kept = []
+    for i, position in enumerate(candidates):
+        remaining = len(candidates) - i
+        is_duplicate = any(hamming_distance(hashes[position], hashes[k]) <= duplicate_distance for k in kept)
+        if not is_duplicate or len(kept) + remaining <= min_frames:
+            kept.append(position)
+
+    # Refill dropped slots with the next-highest-motion distinct frames,
+    # from the peak window first and then the rest of the clip
+    if len(kept) < max_frames:
+        chosen = set(kept)
+        positions = np.arange(len(energy))
+        outside_window = (positions < start) | (positions > end)
+        for position in np.lexsort((-energy, outside_window)):
+            if len(kept) >= max_frames:
+                break
+            position = int(position)
+            if position in chosen:
+                continue
+            position_hash = perceptual_hash(grays[position])
+            if any(hamming_distance(position_hash, hashes[k]) <= duplicate_distance for k in kept):
+                continue
+            hashes[position] = position_hash
+            kept.append(position)
+            chosen.add(position)
+        kept.sort()
+
+    return [int(indices[p]) for p in kept]
+
+
+def iter_motion_key_frames(video_path: str, max_frames: int = 10, max_size: int = MAX_FRAME_SIZE) -> Iterator[Image.Image]:
+    """Yield motion-selected key frames as PIL images (falls back to even spacing)"""
+    frame_indices = select_motion_frames(video_path, max_frames)
+    if not frame_indices:
+        total_frames, _ = get_video_info(video_path)
+        frame_indices = sample_frame_indices(total_frames, max_frames)
+
+    for _, frame in iter_frames_sequential(video_path, frame_indices):
+        yield to_pil_image(frame, max_size)
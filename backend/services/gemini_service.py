@@ -2,12 +2,19 @@ import os
 import json
 import google.generativeai as genai
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from dataclasses import dataclass
 import logging
+import threading
+from services.llm_executor import LLM_BACKEND, create_model, get_llm_executor
+from services.insight_cache import summary_digest
 
 logger = logging.getLogger(__name__)
 
+CHAT_CONTEXT_MESSAGES = 16  # Most recent chat messages quoted verbatim in the coach prompt
+CHAT_UNAVAILABLE_MESSAGE = "I'm sorry, but the AI coaching service is currently unavailable. Please check back later!"
+CHAT_ERROR_MESSAGE = "I'm having trouble processing your message right now. Could you try rephrasing your question? I'm here to help with your martial arts training!"
+
 @dataclass
 class TrainingInsight:
     """Data class for AI-generated training insights"""
@@ -23,14 +30,15 @@ class GeminiService:
     
     def __init__(self):
         self.api_key = os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
+        if not self.api_key and LLM_BACKEND != 'fake':
             logger.warning("GEMINI_API_KEY not found in environment variables")
             self.enabled = False
             return
             
         try:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            if self.api_key:
+                genai.configure(api_key=self.api_key)
+            self.model = create_model('gemini-1.5-flash')
             self.enabled = True
             logger.info("Gemini service initialized successfully")
         except Exception as e:
@@ -41,6 +49,10 @@ class GeminiService:
         """Check if Gemini service is available"""
         return self.enabled
     
+    def generate(self, prompt, timeout: float = None):
+        """Run a prompt through the shared LLM executor (rate limit, retries, deadline)"""
+        return get_llm_executor().generate(self.model, prompt, timeout=timeout)
+    
     def analyze_training_patterns(self, user_data: Dict[str, Any]) -> List[TrainingInsight]:
         """
         Analyze user's training data and generate insights
@@ -63,7 +75,7 @@ class GeminiService:
             prompt = self._create_analysis_prompt(training_summary, user_data.get('timeframe', 'last_30_days'))
             
             # Get AI response
-            response = self.model.generate_content(prompt)
+            response = self.generate(prompt)
             
             # Parse and structure the response
             insights = self._parse_ai_response(response.text, user_data)
@@ -81,17 +93,49 @@ class GeminiService:
                 data_points={'error': str(e)}
             )]
     
-    def generate_chat_response(self, message: str, chat_history: List[Dict], user_context: Dict[str, Any]) -> str:
-        """Generate conversational response as a martial arts coach"""
+    def generate_chat_response(self, message: str, chat_history: List[Dict], user_context: Dict[str, Any],
+                               summary: str = None) -> Tuple[str, bool]:
+        """
+        Generate conversational response as a martial arts coach
+        
+        Returns:
+            (reply, generated) - generated is False when the reply is a
+            fallback message, which callers must not store as a coach turn
+        """
         if not self.enabled:
-            return "I'm sorry, but the AI coaching service is currently unavailable. Please check back later!"
+            return CHAT_UNAVAILABLE_MESSAGE, False
         
         try:
-            # Build conversation context
-            conversation_context = self._build_chat_context(chat_history, user_context)
+            response = self.generate(self._build_coaching_prompt(message, chat_history, user_context, summary))
+            return response.text.strip(), True
             
-            # Create coaching prompt
-            coaching_prompt = f"""
+        except Exception as e:
+            logger.error(f"Error generating chat response: {e}")
+            return CHAT_ERROR_MESSAGE, False
+    
+    def stream_chat_response(self, message: str, chat_history: List[Dict], user_context: Dict[str, Any],
+                             cancel_event: threading.Event = None, summary: str = None) -> Iterator[str]:
+        """
+        Coach reply in text chunks as the model generates them
+        
+        Closing the iterator (or setting cancel_event) stops the model call.
+        Errors are raised to the caller, which has usually sent part of the reply already.
+        """
+        if not self.enabled:
+            yield CHAT_UNAVAILABLE_MESSAGE
+            return
+        
+        prompt = self._build_coaching_prompt(message, chat_history, user_context, summary)
+        yield from get_llm_executor().stream(self.model, prompt, cancel_event=cancel_event)
+    
+    def _build_coaching_prompt(self, message: str, chat_history: List[Dict], user_context: Dict[str, Any],
+                               summary: str = None) -> str:
+        """Prompt for one coaching chat turn"""
+        # Build conversation context
+        conversation_context = self._build_chat_context(chat_history, user_context, summary)
+        
+        # Create coaching prompt
+        return f"""
             You are an expert martial arts coach and mentor with 20+ years of experience training students in various martial arts disciplines. You are having a conversation with one of your students.
 
             STUDENT PROFILE:
@@ -126,30 +170,62 @@ class GeminiService:
             
             Respond naturally as if you're having a face-to-face conversation with your student.
             """
-            
-            response = self.model.generate_content(coaching_prompt)
-            return response.text.strip()
-            
-        except Exception as e:
-            logger.error(f"Error generating chat response: {e}")
-            return "I'm having trouble processing your message right now. Could you try rephrasing your question? I'm here to help with your martial arts training!"
 
-    def _build_chat_context(self, chat_history: List[Dict], user_context: Dict[str, Any]) -> str:
-        """Build conversation context from chat history"""
-        if not chat_history:
+    def _build_chat_context(self, chat_history: List[Dict], user_context: Dict[str, Any], summary: str = None) -> str:
+        """Build conversation context from the rolling summary and recent chat history"""
+        if not chat_history and not summary:
             return f"This is the start of your conversation with {user_context.get('name', 'your student')}."
         
-        context = "Recent conversation:\n"
-        for chat in chat_history[-5:]:  # Last 5 exchanges
+        context = ""
+        if summary:
+            context += f"Summary of your earlier conversation:\n{summary}\n\n"
+        
+        if chat_history:
+            context += "Recent conversation:\n"
+            context += self._format_transcript(chat_history[-CHAT_CONTEXT_MESSAGES:])
+        
+        return context
+    
+    def _format_transcript(self, messages: List[Dict]) -> str:
+        """Chat messages as Student:/Coach: lines"""
+        lines = ""
+        for chat in messages:
             role = chat.get('role', 'user')
             content = chat.get('content', '')
             
             if role == 'user':
-                context += f"Student: {content}\n"
+                lines += f"Student: {content}\n"
             elif role == 'assistant' or role == 'coach':
-                context += f"Coach: {content}\n"
+                lines += f"Coach: {content}\n"
         
-        return context
+        return lines
+    
+    def summarize_conversation(self, previous_summary: Optional[str], messages: List[Dict]) -> str:
+        """Fold older chat turns into a conversation's rolling summary"""
+        transcript = self._format_transcript(messages)
+        
+        if self.enabled:
+            prompt = f"""
+            Update the running summary of a conversation between a martial arts coach and their student.
+            Keep every fact that matters for future coaching: goals, injuries, techniques discussed,
+            advice given and commitments made. Write at most 150 words of plain text.
+            
+            CURRENT SUMMARY:
+            {previous_summary or 'None yet.'}
+            
+            NEW TURNS TO FOLD IN:
+            {transcript}
+            """
+            try:
+                return self.generate(prompt).text.strip()
+            except Exception as e:
+                logger.warning(f"Could not summarize conversation, keeping a truncated transcript: {e}")
+        
+        # Without the model: keep the opening of each turn
+        condensed = " ".join(
+            f"{'Student' if m.get('role') == 'user' else 'Coach'}: {m.get('content', '')[:120]}" for m in messages
+        )
+        return f"{previous_summary} {condensed}".strip() if previous_summary else condensed
     
     def generate_workout_suggestions(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate AI-powered workout suggestions based on training history"""
@@ -184,7 +260,7 @@ class GeminiService:
             Focus on practical exercises they can actually do, considering their martial arts style and recent training patterns.
             """
             
-            response = self.model.generate_content(prompt)
+            response = self.generate(prompt)
             
             # Try to parse as JSON, fall back to text response
             try:
@@ -264,6 +340,10 @@ class GeminiService:
         
         return summary
     
+    def training_summary_digest(self, user_data: Dict[str, Any]) -> str:
+        """Stable hash of the summary the insights prompt is built from (cache key part)"""
+        return summary_digest(self._prepare_training_summary(user_data))
+    
     def _create_analysis_prompt(self, training_summary: str, timeframe: str) -> str:
         """Create AI prompt for training analysis"""
         return f"""
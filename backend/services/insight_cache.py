@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Insight cache configuration
+INSIGHT_CACHE_BACKEND = os.getenv('INSIGHT_CACHE_BACKEND', 'memory')  # 'memory' or 'redis'
+INSIGHT_CACHE_TTL_SECONDS = int(os.getenv('INSIGHT_CACHE_TTL_SECONDS', str(6 * 60 * 60)))
+INSIGHT_CACHE_MAX_ENTRIES = int(os.getenv('INSIGHT_CACHE_MAX_ENTRIES', '1000'))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+KEY_PREFIX = 'dojo:insights:'
+
+
+class CacheBackend(ABC):
+    """Key/value store behind the insight cache (string values, per-key TTL)"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Value of `key` (counters included), or None when missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: int):
+        """Store `value` under `key` for `ttl` seconds"""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically increment an integer counter (no TTL) and return the new value"""
+
+
+class MemoryLRUBackend(CacheBackend):
+    """
+    In-process LRU with expiry (the default)
+
+    Only shared by the threads of one process - use the Redis backend to
+    share entries between gunicorn workers.
+    """
+
+    def __init__(self, max_entries=INSIGHT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._counters = {}  # key -> int; kept out of the LRU so generations are never evicted
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return str(self._counters[key])
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisBackend(CacheBackend):
+    """
+    Any Redis-protocol server (Redis, Valkey, KeyDB ...) at REDIS_URL
+
+    Pass `client` to use something else speaking the redis-py API, e.g.
+    fakeredis.FakeRedis() as a local stand-in. Requires redis (pip install redis).
+    """
+
+    def __init__(self, url=REDIS_URL, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError('redis is required for the Redis insight cache (pip install redis)')
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.client = client
+
+    def get(self, key):
+        value = self.client.get(key)
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl)
+
+    def incr(self, key):
+        return int(self.client.incr(key))
+
+
+def summary_digest(training_summary: str) -> str:
+    """Stable hash of a training summary (whitespace-insensitive)"""
+    normalized = ' '.join(training_summary.split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class InsightCache:
+    """
+    Cache of generated AI insights
+
+    Keys combine the user, the request variant (timeframe etc.), a digest of
+    the training summary sent to the model and a per-user generation number.
+    Writes to a user's sessions or technique progress bump the generation,
+    which orphans every older entry at once (they age out via TTL/LRU).
+    """
+
+    def __init__(self, backend: CacheBackend, ttl=INSIGHT_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _generation(self, user_id) -> int:
+        value = self.backend.get(f'{KEY_PREFIX}gen:{user_id}')
+        return int(value) if value else 0
+
+    def make_key(self, user_id, variant: str, digest: str) -> str:
+        return f'{KEY_PREFIX}{user_id}:{self._generation(user_id)}:{variant}:{digest}'
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def put(self, key: str, value: Dict[str, Any]):
+        self.backend.set(key, json.dumps(value), self.ttl)
+
+    def invalidate_user(self, user_id):
+        self.backend.incr(f'{KEY_PREFIX}gen:{user_id}')
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'ttl_seconds': self.ttl
+        }
+
+
+def create_backend(name=INSIGHT_CACHE_BACKEND) -> CacheBackend:
+    if name == 'redis':
+        return RedisBackend()
+    if name == 'memory':
+        return MemoryLRUBackend()
+    raise ValueError(f'Unknown INSIGHT_CACHE_BACKEND: {name}')
+
+
+# Global insight cache instance
+_insight_cache = None
+
+def get_insight_cache() -> InsightCache:
+    """Get the global insight cache instance"""
+    global _insight_cache
+    if _insight_cache is None:
+        _insight_cache = InsightCache(create_backend())
+    return _insight_cache
+
+
+def invalidate_user_insights(user_id):
+    """Drop a user's cached insights after their training data changed (never raises)"""
+    try:
+        get_insight_cache().invalidate_user(str(user_id))
+    except Exception as e:
+        logger.warning(f"Could not invalidate insight cache for user {user_id}: {e}")
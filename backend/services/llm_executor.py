@@ -0,0 +1,513 @@
+import os
+import json
+import time
+import queue
+import random
+import hashlib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Executor configuration (limits are per process - each web/worker process has its own executor)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini').lower()  # 'gemini' or 'fake'
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+LLM_RATE_PER_MINUTE = float(os.getenv('LLM_RATE_PER_MINUTE', '60'))
+LLM_BURST = int(os.getenv('LLM_BURST', '10'))
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '60'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+LATENCY_WINDOW = 500  # Recent call latencies kept for percentiles
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """A model call that failed for good (after retries, or not retryable)"""
+
+    def __init__(self, message, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code  # HTTP status of the underlying API error, if any
+
+
+class LLMTimeoutError(LLMError):
+    """A model call that did not finish before its deadline"""
+
+
+def error_status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a model API error (google.api_core and HTTP-style errors), if any"""
+    for attribute in ('code', 'status_code', 'status'):
+        value = getattr(error, attribute, None)
+        value = getattr(value, 'value', value)  # grpc/http enums
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits (429) and server errors (5xx) are worth retrying"""
+    return error_status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for retry number `attempt` (1-based)"""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)))
+
+
+def content_fingerprint(model_name: str, content, generation_config=None) -> Optional[str]:
+    """
+    Key identifying identical requests, or None if the content can't be fingerprinted
+
+    Text parts are hashed as-is and PIL images by their pixels, so the same
+    prompt (with the same frames) sent twice at once maps to the same key.
+    """
+    parts = content if isinstance(content, (list, tuple)) else [content]
+    digest = hashlib.sha256(model_name.encode('utf-8'))
+    digest.update(repr(generation_config).encode('utf-8'))
+
+    for part in parts:
+        if isinstance(part, str):
+            digest.update(b'text:' + part.encode('utf-8'))
+        elif hasattr(part, 'tobytes') and hasattr(part, 'size'):
+            digest.update(f'image:{part.size}:{getattr(part, "mode", "")}:'.encode('utf-8'))
+            digest.update(part.tobytes())
+        else:
+            return None
+    return digest.hexdigest()
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`
+
+    Thread-safe; callers block in acquire() until a token is available or
+    their deadline passes.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0 on success or the seconds until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def acquire(self, deadline: float = None) -> bool:
+        """Block until a token is taken (True) or the deadline would pass first (False)"""
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class LLMMetrics:
+    """Counters and latency percentiles of model calls"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._first_chunk_latencies = deque(maxlen=window)  # Streaming calls: time to first chunk
+        self.counters = {
+            'submitted': 0, 'coalesced': 0, 'succeeded': 0, 'failed': 0,
+            'retries': 0, 'timeouts': 0, 'throttled': 0, 'streams': 0, 'cancelled': 0
+        }
+        self.queue_depth = 0
+        self.in_flight = 0
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def adjust(self, name, amount):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def record_first_chunk(self, seconds):
+        with self._lock:
+            self._first_chunk_latencies.append(seconds)
+
+    @staticmethod
+    def _percentiles(samples) -> Dict[str, Optional[float]]:
+        def percentile(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000, 1)
+        return {'p50': percentile(50), 'p95': percentile(95), 'p99': percentile(99)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            first_chunk_latencies = sorted(self._first_chunk_latencies)
+            counters = dict(self.counters)
+            queue_depth, in_flight = self.queue_depth, self.in_flight
+
+        return {
+            **counters,
+            'queue_depth': queue_depth,
+            'in_flight': in_flight,
+            'latency_ms': self._percentiles(latencies),
+            'latency_samples': len(latencies),
+            'first_chunk_ms': self._percentiles(first_chunk_latencies)
+        }
+
+
+class LLMExecutor:
+    """
+    Shared executor for all model calls in a process
+
+    Calls run on a bounded thread pool behind a token-bucket rate limiter.
+    Every call has a deadline; 429/5xx errors are retried with exponential
+    backoff while the deadline allows, and identical requests that are in
+    flight at the same time share one model call.
+    """
+
+    def __init__(self, max_workers=LLM_MAX_CONCURRENCY, rate_per_minute=LLM_RATE_PER_MINUTE,
+                 burst=LLM_BURST, timeout=LLM_TIMEOUT_SECONDS, max_retries=LLM_MAX_RETRIES):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = TokenBucket(rate_per_minute / 60.0, burst)
+        self.metrics = LLMMetrics()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self._in_flight = {}  # fingerprint -> Future
+        self._lock = threading.Lock()
+
+    def submit(self, model, content, generation_config=None, timeout: float = None,
+               coalesce: bool = True) -> Future:
+        """
+        Schedule a generate_content call
+
+        Args:
+            model: Object with generate_content (genai.GenerativeModel or FakeGenerativeModel)
+            content: Prompt string or list of prompt parts (text and PIL images)
+            generation_config: Passed through to generate_content
+            timeout: Seconds until the call's deadline (default LLM_TIMEOUT_SECONDS)
+            coalesce: Share the result with identical requests already in flight
+
+        Returns:
+            Future resolving to the model response
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self.metrics.increment('submitted')
+
+        key = None
+        if coalesce:
+            key = content_fingerprint(getattr(model, 'model_name', type(model).__name__), content, generation_config)
+
+        with self._lock:
+            if key and key in self._in_flight:
+                self.metrics.increment('coalesced')
+                return self._in_flight[key]
+
+            self.metrics.adjust('queue_depth', 1)
+            future = self._pool.submit(self._run, model, content, generation_config, deadline)
+            if key:
+                self._in_flight[key] = future
+
+        if key:
+            # Outside the lock: the callback runs immediately if the call already finished
+            future.add_done_callback(lambda _: self._forget(key, future))
+        return future
+
+    def generate(self, model, content, generation_config=None, timeout: float = None,
+                 coalesce: bool = True):
+        """
+        Run a generate_content call through the executor and wait for it
+
+        Raises:
+            LLMTimeoutError: If the deadline passes first
+            LLMError: If the call fails for good
+        """
+        timeout = timeout or self.timeout
+        future = self.submit(model, content, generation_config, timeout, coalesce)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Not cancelled: coalesced callers may share the future, and the call gives up at its deadline
+            self.metrics.increment('timeouts')
+            raise LLMTimeoutError(f'Model call did not finish within {timeout:g}s')
+
+    def stream(self, model, content, generation_config=None, timeout: float = None,
+               cancel_event: threading.Event = None) -> Iterator[str]:
+        """
+        Run a streaming generate_content call, yielding text chunks as they arrive
+
+        The call runs on the pool (so it counts against the concurrency and
+        rate limits) and hands chunks over through a queue. Closing the
+        generator - e.g. when the HTTP client disconnects - or setting
+        `cancel_event` stops reading from the model. Failures are retried
+        only until the first chunk has been produced.
+
+        Raises:
+            LLMTimeoutError: If the deadline passes before the stream ends
+            LLMError: If the call fails for good
+        """
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        cancel_event = cancel_event or threading.Event()
+        chunks = queue.Queue()
+
+        self.metrics.increment('submitted')
+        self.metrics.increment('streams')
+        self.metrics.adjust('queue_depth', 1)
+        self._pool.submit(self._run_stream, model, content, generation_config, deadline, cancel_event, chunks)
+
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics.increment('timeouts')
+                    raise LLMTimeoutError(f'Model stream did not finish within {timeout:g}s')
+                try:
+                    kind, value = chunks.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+
+                if kind == 'chunk':
+                    yield value
+                elif kind == 'error':
+                    raise value
+                else:
+                    return
+        finally:
+            cancel_event.set()
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def _wait_for_slot(self, deadline) -> float:
+        """Take a rate-limit token; returns the seconds left until the deadline"""
+        if not self.rate_limiter.acquire(deadline):
+            self.metrics.increment('throttled')
+            raise LLMTimeoutError('Rate limit wait would exceed the call deadline')
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMTimeoutError('Call deadline passed before the model was called')
+        return remaining
+
+    @staticmethod
+    def _call_kwargs(generation_config, remaining):
+        kwargs = {'request_options': {'timeout': remaining}}
+        if generation_config is not None:
+            kwargs['generation_config'] = generation_config
+        return kwargs
+
+    def _backoff_or_raise(self, error, attempt, deadline):
+        """Sleep before retry number `attempt`, or raise LLMError if the error/deadline doesn't allow one"""
+        delay = backoff_delay(attempt)
+        if not is_retryable(error) or attempt > self.max_retries or time.monotonic() + delay >= deadline:
+            raise LLMError(f'Model call failed: {error}', error_status_code(error)) from error
+        self.metrics.increment('retries')
+        logger.warning(f"Model call failed ({error_status_code(error)}), retry {attempt} in {delay:.1f}s: {error}")
+        time.sleep(delay)
+
+    def _run(self, model, content, generation_config, deadline):
+        """Pool thread: rate limit, call, retry until success or the deadline"""
+        self.metrics.adjust('queue_depth', -1)
+        self.metrics.adjust('in_flight', 1)
+        try:
+            attempt = 0
+            while True:
+                remaining = self._wait_for_slot(deadline)
+                started = time.monotonic()
+                try:
+                    response = model.generate_content(content, **self._call_kwargs(generation_config, remaining))
+                    self.metrics.record_latency(time.monotonic() - started)
+                    self.metrics.increment('succeeded')
+                    return response
+
+                except Exception as e:
+                    self.metrics.record_latency(time.monotonic() - started)
+                    attempt += 1
+                    self._backoff_or_raise(e, attempt, deadline)
+
+        except Exception:
+            self.metrics.increment('failed')
+            raise
+        finally:
+            self.metrics.adjust('in_flight', -1)
+
+    def _run_stream(self, model, content, generation_config, deadline, cancel_event, chunks):
+        """Pool thread: like _run, but forwards chunks to the consumer's queue"""
+        self.metrics.adjust('queue_depth', -1)
+        self.metrics.adjust('in_flight', 1)
+        try:
+            attempt = 0
+            while not cancel_event.is_set():
+                remaining = self._wait_for_slot(deadline)
+                started = time.monotonic()
+                first_chunk = True
+                try:
+                    response = model.generate_content(
+                        content, stream=True, **self._call_kwargs(generation_config, remaining)
+                    )
+                    for chunk in response:
+                        if cancel_event.is_set():
+                            # Client went away - stop pulling from the model
+                            self.metrics.increment('cancelled')
+                            break
+                        if first_chunk:
+                            self.metrics.record_first_chunk(time.monotonic() - started)
+                            first_chunk = False
+                        text = getattr(chunk, 'text', '')
+                        if text:
+                            chunks.put(('chunk', text))
+                    else:
+                        self.metrics.increment('succeeded')
+
+                    self.metrics.record_latency(time.monotonic() - started)
+                    break
+
+                except Exception as e:
+                    if not first_chunk:
+                        # Part of the answer was already sent - a retry would repeat it
+                        raise LLMError(f'Model stream failed: {e}', error_status_code(e)) from e
+                    attempt += 1
+                    self._backoff_or_raise(e, attempt, deadline)
+
+            chunks.put(('done', None))
+
+        except Exception as e:
+            self.metrics.increment('failed')
+            chunks.put(('error', e))
+        finally:
+            self.metrics.adjust('in_flight', -1)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Executor settings plus call counters, queue depth and latency percentiles"""
+        return {
+            'backend': LLM_BACKEND,
+            'max_workers': self.max_workers,
+            'rate_per_minute': round(self.rate_limiter.rate * 60, 2),
+            'burst': self.rate_limiter.capacity,
+            'timeout_seconds': self.timeout,
+            'max_retries': self.max_retries,
+            **self.metrics.snapshot()
+        }
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Local stand-in for genai.GenerativeModel (LLM_BACKEND=fake)
+
+    Returns a canned (or computed) response after an optional latency and
+    can fail the first `fail_times` calls with a given HTTP status - enough
+    to exercise rate limiting, retries, deadlines and coalescing offline.
+    With stream=True the response is yielded `chunk_words` words at a time,
+    `chunk_delay` seconds apart, like a token stream.
+    """
+
+    def __init__(self, model_name='fake-model', response_text=None, latency=0.0,
+                 fail_times=0, fail_status=429, responder=None, chunk_words=3, chunk_delay=0.05):
+        self.model_name = model_name
+        self.response_text = response_text
+        self.latency = latency
+        self.fail_times = fail_times
+        self.fail_status = fail_status
+        self.responder = responder
+        self.chunk_words = chunk_words
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.chunks_streamed = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, content, generation_config=None, request_options=None, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call_number = self.calls
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if call_number <= self.fail_times:
+            error = RuntimeError(f'Fake model error {self.fail_status}')
+            error.code = self.fail_status
+            raise error
+
+        text = self._response_for(content)
+        if stream:
+            return self._stream(text)
+        return FakeResponse(text)
+
+    def _response_for(self, content) -> str:
+        if self.responder:
+            return self.responder(content)
+        if self.response_text is not None:
+            return self.response_text
+
+        parts = content if isinstance(content, (list, tuple)) else [content]
+        prompt = next((part for part in parts if isinstance(part, str)), '')
+        return json.dumps({
+            'fake': True,
+            'overall_score': 7.0,
+            'prompt_characters': len(prompt),
+            'images': sum(1 for part in parts if not isinstance(part, str))
+        })
+
+    def _stream(self, text) -> Iterator[FakeResponse]:
+        words = text.split(' ')
+        for start in range(0, len(words), self.chunk_words):
+            if start:
+                time.sleep(self.chunk_delay)
+            chunk = ' '.join(words[start:start + self.chunk_words])
+            with self._lock:
+                self.chunks_streamed += 1
+            yield FakeResponse(chunk if start + self.chunk_words >= len(words) else chunk + ' ')
+
+
+def create_model(model_name: str):
+    """Model client for the configured LLM_BACKEND"""
+    if LLM_BACKEND == 'fake':
+        return FakeGenerativeModel(model_name=f'fake:{model_name}')
+
+    import google.generativeai as genai
+    return genai.GenerativeModel(model_name)
+
+
+# Global executor instance (one per process)
+_llm_executor = None
+_executor_lock = threading.Lock()
+
+def get_llm_executor() -> LLMExecutor:
+    """Get the global LLM executor, created on first use"""
+    global _llm_executor
+    with _executor_lock:
+        if _llm_executor is None:
+            _llm_executor = LLMExecutor()
+        return _llm_executor
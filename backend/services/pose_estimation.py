@@ -0,0 +1,275 @@
+import os
+import logging
+import warnings
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Pose estimation configuration
+POSE_ESTIMATION = os.getenv('POSE_ESTIMATION', 'off').lower()  # 'mediapipe' or 'off'
+POSE_MODEL_PATH = os.getenv('POSE_MODEL_PATH', 'models/pose_landmarker_lite.task')
+MIN_VISIBILITY = 0.5  # Landmarks below this confidence are treated as missing
+GUARD_UP_MARGIN = 0.1  # Wrists count as "up" within this fraction of the torso below the shoulders
+
+# BlazePose landmark indices (33-point topology used by MediaPipe)
+LANDMARKS = {
+    'nose': 0,
+    'left_shoulder': 11, 'right_shoulder': 12,
+    'left_elbow': 13, 'right_elbow': 14,
+    'left_wrist': 15, 'right_wrist': 16,
+    'left_hip': 23, 'right_hip': 24,
+    'left_knee': 25, 'right_knee': 26,
+    'left_ankle': 27, 'right_ankle': 28
+}
+NUM_LANDMARKS = 33
+
+# (a, b, c): the angle measured at joint b
+JOINT_ANGLES = {
+    'left_knee': ('left_hip', 'left_knee', 'left_ankle'),
+    'right_knee': ('right_hip', 'right_knee', 'right_ankle'),
+    'left_elbow': ('left_shoulder', 'left_elbow', 'left_wrist'),
+    'right_elbow': ('right_shoulder', 'right_elbow', 'right_wrist'),
+    'left_hip': ('left_shoulder', 'left_hip', 'left_knee'),
+    'right_hip': ('right_shoulder', 'right_hip', 'right_knee')
+}
+
+
+class PoseEstimator:
+    """
+    CPU pose keypoints for analysis frames via MediaPipe
+
+    Uses the MediaPipe Tasks PoseLandmarker (needs the .task model at
+    POSE_MODEL_PATH) and falls back to the legacy mp.solutions.pose API on
+    older MediaPipe installs without Tasks, or when the model file is missing.
+    """
+
+    backend = 'mediapipe'
+
+    def __init__(self, model_path=POSE_MODEL_PATH):
+        import mediapipe as mp
+
+        self._mp = mp
+        self._landmarker = None
+        self._legacy_pose = None
+
+        try:
+            from mediapipe.tasks.python import BaseOptions, vision
+        except ImportError:
+            vision = None
+
+        if vision is not None and os.path.exists(model_path):
+            self._landmarker = vision.PoseLandmarker.create_from_options(
+                vision.PoseLandmarkerOptions(
+                    base_options=BaseOptions(model_asset_path=model_path),
+                    running_mode=vision.RunningMode.IMAGE,
+                    num_poses=1
+                )
+            )
+        elif hasattr(mp, 'solutions'):
+            logger.info(f"Using the legacy MediaPipe pose API (no Tasks model at {model_path})")
+            self._legacy_pose = mp.solutions.pose.Pose(static_image_mode=True, model_complexity=1)
+        else:
+            raise FileNotFoundError(f'Pose model not found at {model_path} (set POSE_MODEL_PATH)')
+
+    def detect(self, frames) -> Dict[str, np.ndarray]:
+        """
+        Pose landmarks for each frame
+
+        Args:
+            frames: RGB PIL images
+
+        Returns:
+            Dict with 'image' (F, 33, 3) normalized x/y/z and 'world' (F, 33, 3)
+            metric coordinates; landmarks that are missing or low-confidence are NaN
+        """
+        image_points = np.full((len(frames), NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+        world_points = np.full((len(frames), NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+
+        for i, frame in enumerate(frames):
+            rgb = np.ascontiguousarray(np.asarray(frame.convert('RGB')))
+
+            if self._landmarker is not None:
+                result = self._landmarker.detect(self._mp.Image(image_format=self._mp.ImageFormat.SRGB, data=rgb))
+                if not result.pose_landmarks:
+                    continue
+                image_landmarks = result.pose_landmarks[0]
+                world_landmarks = result.pose_world_landmarks[0]
+            else:
+                result = self._legacy_pose.process(rgb)
+                if not result.pose_landmarks:
+                    continue
+                image_landmarks = result.pose_landmarks.landmark
+                world_landmarks = result.pose_world_landmarks.landmark
+
+            for j, (landmark, world) in enumerate(zip(image_landmarks, world_landmarks)):
+                if (landmark.visibility or 0) < MIN_VISIBILITY:
+                    continue
+                image_points[i, j] = (landmark.x, landmark.y, landmark.z)
+                world_points[i, j] = (world.x, world.y, world.z)
+
+        return {'image': image_points, 'world': world_points}
+
+    def close(self):
+        if self._landmarker is not None:
+            self._landmarker.close()
+        if self._legacy_pose is not None:
+            self._legacy_pose.close()
+
+
+def _point(points: np.ndarray, name: str) -> np.ndarray:
+    """(F, 3) coordinates of one landmark across all frames"""
+    return points[:, LANDMARKS[name]]
+
+
+def joint_angle(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Angle at b (degrees) between b->a and b->c, vectorised over frames"""
+    ba = a - b
+    bc = c - b
+    cosine = np.einsum('ij,ij->i', ba, bc) / (np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1))
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+def _series(values: np.ndarray) -> List[Optional[float]]:
+    """JSON-friendly series: rounded, with None for frames without a pose"""
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+def _stat(function, values: np.ndarray) -> Optional[float]:
+    if np.all(np.isnan(values)):
+        return None
+    return round(float(function(values)), 2)
+
+
+def compute_pose_metrics(image_points: np.ndarray, world_points: np.ndarray) -> Dict:
+    """
+    Joint-angle time series and form metrics from pose landmarks
+
+    All metrics are computed with array operations over every frame at once.
+    Image coordinates have y pointing down, so heights are (reference - y)
+    normalized by torso length to be independent of camera distance.
+
+    Returns:
+        Dict with per-frame 'series' and aggregated 'summary' values
+    """
+    frame_count = len(image_points)
+    # Frames without a pose are NaN rows; nan-aware reductions skip them
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        series = {}
+        for name, (a, b, c) in JOINT_ANGLES.items():
+            series[f'{name}_angle'] = joint_angle(
+                _point(world_points, a), _point(world_points, b), _point(world_points, c)
+            )
+
+        shoulder_mid = (_point(image_points, 'left_shoulder') + _point(image_points, 'right_shoulder')) / 2
+        hip_mid = (_point(image_points, 'left_hip') + _point(image_points, 'right_hip')) / 2
+        torso_length = np.linalg.norm(shoulder_mid[:, :2] - hip_mid[:, :2], axis=1)
+
+        # Kick height: highest ankle relative to the hips, in torso lengths (> 0 = above the hips)
+        ankle_heights = np.stack([
+            hip_mid[:, 1] - _point(image_points, 'left_ankle')[:, 1],
+            hip_mid[:, 1] - _point(image_points, 'right_ankle')[:, 1]
+        ]) / torso_length
+        series['kick_height'] = np.where(
+            np.all(np.isnan(ankle_heights), axis=0), np.nan, np.nanmax(ankle_heights, axis=0)
+        ) if frame_count else np.array([])
+
+        # Hip rotation: heading of the hip line in the ground plane (world x/z)
+        hip_line = _point(world_points, 'right_hip') - _point(world_points, 'left_hip')
+        shoulder_line = _point(world_points, 'right_shoulder') - _point(world_points, 'left_shoulder')
+        hip_heading = np.degrees(np.arctan2(hip_line[:, 2], hip_line[:, 0]))
+        shoulder_heading = np.degrees(np.arctan2(shoulder_line[:, 2], shoulder_line[:, 0]))
+        series['hip_rotation'] = hip_heading
+        series['torso_twist'] = (shoulder_heading - hip_heading + 180) % 360 - 180
+
+        # Guard: wrist height relative to the shoulders, in torso lengths (> 0 = above)
+        wrist_heights = np.stack([
+            shoulder_mid[:, 1] - _point(image_points, 'left_wrist')[:, 1],
+            shoulder_mid[:, 1] - _point(image_points, 'right_wrist')[:, 1]
+        ]) / torso_length
+        series['guard_height'] = np.nanmin(wrist_heights, axis=0) if frame_count else np.array([])
+
+        has_pose = ~np.all(np.isnan(image_points[:, :, 0]), axis=1)
+        guard_frames = series['guard_height'][has_pose]
+        guard_frames = guard_frames[~np.isnan(guard_frames)]
+
+        summary = {
+            'max_kick_height': _stat(np.nanmax, series['kick_height']),
+            'hip_rotation_range_deg': (
+                round(float(np.nanmax(hip_heading) - np.nanmin(hip_heading)), 2)
+                if not np.all(np.isnan(hip_heading)) else None
+            ),
+            'max_torso_twist_deg': _stat(lambda v: np.nanmax(np.abs(v)), series['torso_twist']),
+            'guard_up_ratio': (
+                round(float(np.mean(guard_frames >= -GUARD_UP_MARGIN)), 2) if len(guard_frames) else None
+            ),
+            'mean_guard_height': _stat(np.nanmean, series['guard_height'])
+        }
+        for name in JOINT_ANGLES:
+            summary[f'min_{name}_angle'] = _stat(np.nanmin, series[f'{name}_angle'])
+            summary[f'max_{name}_angle'] = _stat(np.nanmax, series[f'{name}_angle'])
+
+    return {
+        'frames_total': frame_count,
+        'frames_with_pose': int(has_pose.sum()),
+        'series': {name: _series(values) for name, values in series.items()},
+        'summary': summary
+    }
+
+
+def summarize_for_prompt(pose_metrics: Dict) -> str:
+    """Compact numeric summary of pose metrics for the model prompt"""
+    summary = pose_metrics.get('summary', {})
+    lines = [
+        f"Measured pose metrics ({pose_metrics.get('frames_with_pose', 0)} of "
+        f"{pose_metrics.get('frames_total', 0)} frames with a detected pose):"
+    ]
+    labels = {
+        'max_kick_height': 'Max kick height (torso lengths above hips)',
+        'hip_rotation_range_deg': 'Hip rotation range (degrees)',
+        'max_torso_twist_deg': 'Max shoulder-hip twist (degrees)',
+        'guard_up_ratio': 'Share of frames with guard up',
+        'min_left_knee_angle': 'Min left knee angle (degrees)',
+        'min_right_knee_angle': 'Min right knee angle (degrees)',
+        'min_left_elbow_angle': 'Min left elbow angle (degrees)',
+        'min_right_elbow_angle': 'Min right elbow angle (degrees)'
+    }
+    for key, label in labels.items():
+        if summary.get(key) is not None:
+            lines.append(f"- {label}: {summary[key]}")
+    return '\n'.join(lines)
+
+
+_pose_estimator = None
+_pose_unavailable = False
+
+def get_pose_estimator() -> Optional[PoseEstimator]:
+    """
+    The shared pose estimator, or None when pose estimation is off or unavailable
+    (MediaPipe not installed, model file missing)
+    """
+    global _pose_estimator, _pose_unavailable
+    if POSE_ESTIMATION != 'mediapipe' or _pose_unavailable:
+        return None
+    if _pose_estimator is None:
+        try:
+            _pose_estimator = PoseEstimator()
+        except Exception as e:
+            logger.warning(f"Pose estimation unavailable: {e}")
+            _pose_unavailable = True
+            return None
+    return _pose_estimator
+
+
+def estimate_pose_metrics(frames) -> Optional[Dict]:
+    """Pose metrics for analysis frames, or None if pose estimation is not available"""
+    estimator = get_pose_estimator()
+    if estimator is None or not frames:
+        return None
+
+    points = estimator.detect(frames)
+    metrics = compute_pose_metrics(points['image'], points['world'])
+    metrics['backend'] = estimator.backend
+    return metrics
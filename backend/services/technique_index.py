@@ -0,0 +1,311 @@
+import os
+import re
+import time
+import heapq
+import bisect
+import logging
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Technique name index configuration
+TECHNIQUE_INDEX_MAX_AGE_SECONDS = int(os.getenv('TECHNIQUE_INDEX_MAX_AGE_SECONDS', str(60 * 60)))
+MAX_PREFIX_EXPANSIONS = 50
+MAX_FUZZY_CANDIDATES = 20
+MIN_TRIGRAM_SIMILARITY = 0.3
+FUZZY_CACHE_SIZE = 10000
+
+# Weight of a term by the field it came from
+FIELD_WEIGHTS = {'name': 3.0, 'alias': 2.5, 'tag': 2.0, 'style': 1.0, 'category': 1.0}
+
+# Equivalent names across styles; a technique named with one phrase is also found by the others
+ALIAS_GROUPS = [
+    ('front kick', 'mae geri', 'ap chagi', 'teep'),
+    ('roundhouse kick', 'round kick', 'turning kick', 'mawashi geri', 'dollyo chagi'),
+    ('side kick', 'yoko geri', 'yop chagi'),
+    ('back kick', 'ushiro geri', 'dwit chagi'),
+    ('hook kick', 'ura mawashi geri', 'huryeo chagi'),
+    ('axe kick', 'kakato otoshi', 'naeryeo chagi'),
+    ('knee strike', 'hiza geri', 'khao'),
+    ('elbow strike', 'empi', 'sok'),
+    ('reverse punch', 'gyaku zuki'),
+    ('lunge punch', 'oi zuki'),
+    ('jab', 'kizami zuki'),
+    ('knife hand', 'shuto'),
+    ('rear naked choke', 'hadaka jime', 'mata leao'),
+    ('triangle choke', 'sankaku jime'),
+    ('cross armlock', 'armbar', 'juji gatame'),
+    ('shoulder throw', 'seoi nage'),
+    ('hip throw', 'o goshi'),
+    ('foot sweep', 'ashi barai'),
+]
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lower-case ASCII folding ("Leão" -> "leao")"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return re.findall(r'[a-z0-9]+', normalize(text))
+
+
+def trigrams(token: str) -> set:
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(token: str) -> int:
+    """Typos tolerated for a query term of this length"""
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 6 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a transposition counts once), or limit + 1 once exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _alias_tokens(name_tokens: List[str]) -> set:
+    name = f" {' '.join(name_tokens)} "
+    tokens = set()
+    for group in ALIAS_GROUPS:
+        if any(f' {phrase} ' in name for phrase in group):
+            for phrase in group:
+                tokens.update(phrase.split())
+    return tokens - set(name_tokens)
+
+
+class TechniqueNameIndex:
+    """
+    In-process inverted index over technique names, aliases, tags and styles
+
+    Serves typo-tolerant lookups and autocomplete from memory: query terms
+    are matched exactly, as a prefix (the term being typed) and, failing
+    those, fuzzily through a trigram index over the vocabulary verified by
+    edit distance, so "roundhose" still finds "Roundhouse Kick" and
+    "mawashi" finds it through ALIAS_GROUPS. build() loads the index from
+    technique_library; refresh() re-indexes techniques written by this
+    process (imports). Other processes' writes are picked up when the
+    index is older than TECHNIQUE_INDEX_MAX_AGE_SECONDS and is next used.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.built_at = None
+
+    def _reset(self):
+        self._documents = {}  # technique id -> summary
+        self._terms = {}  # technique id -> {token: weight}
+        self._postings = {}  # token -> {technique id: weight}
+        self._trigrams = {}  # trigram -> tokens
+        self._vocabulary = []  # sorted tokens, for prefix lookups
+        self._fuzzy_cache = {}  # query token -> fuzzy matches; autocomplete repeats earlier words on every keystroke
+
+    @property
+    def size(self) -> int:
+        return len(self._documents)
+
+    def needs_build(self) -> bool:
+        return self.built_at is None or time.time() - self.built_at > TECHNIQUE_INDEX_MAX_AGE_SECONDS
+
+    def build(self, TechniqueLibrary) -> int:
+        """(Re)build from technique_library, loading only the indexed columns"""
+        rows = TechniqueLibrary.query.with_entities(
+            TechniqueLibrary.id, TechniqueLibrary.name, TechniqueLibrary.style,
+            TechniqueLibrary.category, TechniqueLibrary.tags, TechniqueLibrary.view_count
+        ).all()
+
+        fresh = TechniqueNameIndex()
+        for row in rows:
+            fresh._add(row)
+        fresh._vocabulary = sorted(fresh._postings)
+
+        with self._lock:
+            self._documents, self._terms = fresh._documents, fresh._terms
+            self._postings, self._trigrams, self._vocabulary = fresh._postings, fresh._trigrams, fresh._vocabulary
+            self._fuzzy_cache = {}
+            self.built_at = time.time()
+
+        logger.info(f"Technique name index built: {len(rows)} techniques, {len(self._vocabulary)} terms")
+        return len(rows)
+
+    def ensure_built(self, TechniqueLibrary):
+        if self.needs_build():
+            self.build(TechniqueLibrary)
+
+    def refresh(self, techniques: Iterable):
+        """Re-index techniques created or updated in this process (no-op before the first build)"""
+        with self._lock:
+            if self.built_at is None:
+                return
+            self._fuzzy_cache = {}
+            for technique in techniques:
+                self._remove(technique.id)
+                for token in self._add(technique):
+                    index = bisect.bisect_left(self._vocabulary, token)
+                    if index == len(self._vocabulary) or self._vocabulary[index] != token:
+                        self._vocabulary.insert(index, token)
+
+    def remove(self, technique_id):
+        with self._lock:
+            self._fuzzy_cache = {}
+            self._remove(technique_id)
+
+    def _add(self, technique) -> List[str]:
+        """Index one technique; returns tokens that are new to the vocabulary"""
+        name_tokens = tokenize(technique.name)
+        terms = {}
+
+        def add(tokens, field):
+            for token in tokens:
+                terms[token] = max(terms.get(token, 0), FIELD_WEIGHTS[field])
+
+        add(tokenize(technique.style), 'style')
+        add(tokenize(technique.category), 'category')
+        for tag in technique.tags or []:
+            add(tokenize(tag), 'tag')
+        add(_alias_tokens(name_tokens), 'alias')
+        add(name_tokens, 'name')
+
+        self._documents[technique.id] = {
+            'id': technique.id,
+            'name': technique.name,
+            'style': technique.style,
+            'category': technique.category,
+            'view_count': technique.view_count or 0
+        }
+        self._terms[technique.id] = terms
+
+        new_tokens = []
+        for token, weight in terms.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                new_tokens.append(token)
+                for trigram in trigrams(token):
+                    self._trigrams.setdefault(trigram, set()).add(token)
+            posting[technique.id] = weight
+        return new_tokens
+
+    def _remove(self, technique_id):
+        self._documents.pop(technique_id, None)
+        for token in self._terms.pop(technique_id, {}):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(technique_id, None)
+            if not posting:
+                del self._postings[token]
+                for trigram in trigrams(token):
+                    self._trigrams[trigram].discard(token)
+                index = bisect.bisect_left(self._vocabulary, token)
+                if index < len(self._vocabulary) and self._vocabulary[index] == token:
+                    del self._vocabulary[index]
+
+    def _prefix_matches(self, prefix: str) -> Dict[str, float]:
+        matches = {}
+        index = bisect.bisect_left(self._vocabulary, prefix)
+        while index < len(self._vocabulary) and len(matches) < MAX_PREFIX_EXPANSIONS:
+            token = self._vocabulary[index]
+            if not token.startswith(prefix):
+                break
+            # Completions rank just below an exact term
+            matches[token] = 1.0 if token == prefix else 0.9
+            index += 1
+        return matches
+
+    def _fuzzy_matches(self, token: str) -> Dict[str, float]:
+        limit = max_edits(token)
+        if not limit:
+            return {}
+        cached = self._fuzzy_cache.get(token)
+        if cached is not None:
+            return cached
+
+        query_trigrams = trigrams(token)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+
+        matches = {}
+        for candidate, count in shared.most_common(MAX_FUZZY_CANDIDATES):
+            if 2 * count / (len(query_trigrams) + len(candidate) + 1) < MIN_TRIGRAM_SIMILARITY:
+                break
+            distance = edit_distance(token, candidate, limit)
+            if distance <= limit:
+                matches[candidate] = 0.8 - 0.2 * distance / limit
+
+        if len(self._fuzzy_cache) >= FUZZY_CACHE_SIZE:
+            self._fuzzy_cache = {}
+        self._fuzzy_cache[token] = matches
+        return matches
+
+    def lookup(self, query: str, limit: int = 10, style: Optional[str] = None, prefix: bool = True) -> List[Dict]:
+        """
+        Best matching techniques for a (possibly misspelled) query
+
+        Every term may match exactly or fuzzily; with `prefix` the last one
+        also matches as the start of a word, for search-as-you-type.
+        Techniques matching more terms rank first, then by weighted
+        similarity, then by views.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        style_key = normalize(style) if style else None
+
+        with self._lock:
+            coverage, scores = Counter(), Counter()
+            for position, token in enumerate(tokens):
+                matches = {token: 1.0} if token in self._postings else {}
+                if prefix and position == len(tokens) - 1:
+                    matches.update(self._prefix_matches(token))
+                if not matches:
+                    matches = self._fuzzy_matches(token)
+
+                best = {}
+                for match, similarity in matches.items():
+                    for technique_id, weight in self._postings[match].items():
+                        best[technique_id] = max(best.get(technique_id, 0), weight * similarity)
+                for technique_id, score in best.items():
+                    coverage[technique_id] += 1
+                    scores[technique_id] += score
+
+            documents = self._documents
+            ranked = heapq.nsmallest(
+                limit,
+                (technique_id for technique_id in scores
+                 if not style_key or normalize(documents[technique_id]['style']) == style_key),
+                key=lambda technique_id: (-coverage[technique_id], -scores[technique_id],
+                                          -documents[technique_id]['view_count'], documents[technique_id]['name'])
+            )
+
+            return [dict(documents[technique_id], score=round(scores[technique_id], 3)) for technique_id in ranked]
+
+
+technique_name_index = TechniqueNameIndex()
+
+
+def get_technique_index() -> TechniqueNameIndex:
+    """Get the process-wide technique name index"""
+    return technique_name_index
@@ -0,0 +1,313 @@
+import re
+import html
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import column, func, inspect, literal_column, table, text
+
+logger = logging.getLogger(__name__)
+
+# Technique search configuration
+TEXT_SEARCH_CONFIG = 'english'  # PostgreSQL stemming dictionary
+MAX_QUERY_TERMS = 8
+SNIPPET_START = '<mark>'
+SNIPPET_STOP = '</mark>'
+SNIPPET_WORDS = 16
+# Private-use characters the engines put around matches, swapped for the
+# <mark> tags only after the snippet text has been HTML-escaped
+MATCH_START = '\ue000'
+MATCH_STOP = '\ue001'
+# Relative weight of matches in name, description and instructions
+FIELD_WEIGHTS = (10.0, 3.0, 1.0)
+
+
+def query_terms(query: Optional[str]) -> List[str]:
+    """Lower-cased word terms of a user query, punctuation and operators dropped"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_QUERY_TERMS]
+
+
+def snippet_html(snippet: Optional[str]) -> Optional[str]:
+    """HTML-safe snippet: technique text escaped, matched terms wrapped in <mark>"""
+    if not snippet:
+        return None
+    return html.escape(snippet).replace(MATCH_START, SNIPPET_START).replace(MATCH_STOP, SNIPPET_STOP)
+
+
+def search_hit(technique, relevance=None, snippet=None) -> Dict:
+    data = technique.to_dict(include_content=False)
+    data['relevance'] = round(float(relevance), 4) if relevance is not None else None
+    data['snippet'] = snippet_html(snippet)
+    return data
+
+
+class TechniqueSearch:
+    """
+    Technique library search without a full-text index
+
+    Matches every query term as a substring of name, description or
+    instructions, ordered by name. Used where no full-text engine is
+    available; the subclasses below replace the text match with an
+    indexed, ranked one and keep the same interface.
+    """
+
+    name = 'like'
+
+    def __init__(self, db):
+        self.db = db
+
+    def schema_ready(self) -> bool:
+        """Whether the index structures exist - a cheap check, safe on the request path"""
+        return True
+
+    def ensure_schema(self, concurrently=False):
+        """
+        Create the index structures this engine needs (idempotent)
+
+        Runs DDL, so it belongs in migrations and maintenance commands
+        (create_technique_search_schema), never in a request.
+        """
+
+    def rebuild(self):
+        """Re-index every technique, for data written around the engine's triggers"""
+
+    def search(self, TechniqueLibrary, query=None, style=None, category=None, difficulty=None,
+               tags=None, limit=50, offset=0, tag_mode='all') -> List[Dict]:
+        """
+        One page of techniques matching `query` and the filters, best match first
+
+        Returns:
+            search_hit() dicts with relevance and snippet (None when not ranked)
+        """
+        conditions = TechniqueLibrary.filter_conditions(style=style, category=category, difficulty=difficulty,
+                                                        tags=tags, tag_mode=tag_mode)
+        terms = query_terms(query)
+        if not terms:
+            techniques = TechniqueLibrary.query.filter(*conditions).order_by(
+                TechniqueLibrary.name, TechniqueLibrary.id
+            ).offset(offset).limit(limit).all()
+            return [search_hit(technique) for technique in techniques]
+        return self._search(TechniqueLibrary, terms, conditions, limit, offset)
+
+    def _search(self, TechniqueLibrary, terms, conditions, limit, offset):
+        for term in terms:
+            conditions.append(self.db.or_(
+                TechniqueLibrary.name.ilike(f'%{term}%'),
+                TechniqueLibrary.description.ilike(f'%{term}%'),
+                TechniqueLibrary.instructions.ilike(f'%{term}%')
+            ))
+        techniques = TechniqueLibrary.query.filter(*conditions).order_by(
+            TechniqueLibrary.name, TechniqueLibrary.id
+        ).offset(offset).limit(limit).all()
+        return [search_hit(technique) for technique in techniques]
+
+
+class PostgresTechniqueSearch(TechniqueSearch):
+    """
+    PostgreSQL full-text search over a generated tsvector column
+
+    technique_library.search_vector is a STORED generated column, so
+    PostgreSQL keeps it current on every insert and update (imports
+    included) without triggers. Name, description and instructions are
+    weighted A/B/C and ranked with ts_rank_cd; a GIN index serves the @@
+    match. Every query term matches as a stemmed prefix ("kicking" and
+    "kic" both find "kicks"). Snippets come from ts_headline on the
+    returned page only, as it re-parses the document text.
+    """
+
+    name = 'postgresql'
+
+    def schema_ready(self):
+        inspector = inspect(self.db.engine)
+        columns = {column['name'] for column in inspector.get_columns('technique_library')}
+        indexes = {index['name'] for index in inspector.get_indexes('technique_library')}
+        return 'search_vector' in columns and 'ix_technique_library_search' in indexes
+
+    def ensure_schema(self, concurrently=False):
+        columns = {column['name'] for column in inspect(self.db.engine).get_columns('technique_library')}
+        # Adding a STORED generated column rewrites the table under an exclusive lock
+        if 'search_vector' not in columns:
+            with self.db.engine.begin() as connection:
+                connection.execute(text(f"""
+                    ALTER TABLE technique_library ADD COLUMN search_vector tsvector
+                    GENERATED ALWAYS AS (
+                        setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(name, '')), 'A') ||
+                        setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(description, '')), 'B') ||
+                        setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(instructions, '')), 'C')
+                    ) STORED
+                """))
+
+        create_index = 'CREATE INDEX CONCURRENTLY' if concurrently else 'CREATE INDEX'
+        with self.db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text(
+                f'{create_index} IF NOT EXISTS ix_technique_library_search '
+                'ON technique_library USING GIN (search_vector)'
+            ))
+
+    def _search(self, TechniqueLibrary, terms, conditions, limit, offset):
+        tsquery = func.to_tsquery(TEXT_SEARCH_CONFIG, ' & '.join(f'{term}:*' for term in terms))
+        vector = literal_column('technique_library.search_vector')
+        # ts_rank_cd weights are ordered {D, C, B, A}
+        weights = '{0.1, %s, %s, %s}' % tuple(weight / FIELD_WEIGHTS[0] for weight in reversed(FIELD_WEIGHTS))
+        rank = func.ts_rank_cd(literal_column(f"'{weights}'::float4[]"), vector, tsquery)
+
+        # Rank ids only, then load rows and headlines for the page alone
+        ranked = self.db.session.query(TechniqueLibrary.id, rank).filter(
+            vector.op('@@')(tsquery), *conditions
+        ).order_by(rank.desc(), TechniqueLibrary.id).offset(offset).limit(limit).all()
+        if not ranked:
+            return []
+
+        document = func.concat_ws(' ', TechniqueLibrary.description, TechniqueLibrary.instructions)
+        options = (f'StartSel={MATCH_START}, StopSel={MATCH_STOP}, '
+                   f'MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, MaxFragments=1')
+        rows = self.db.session.query(
+            TechniqueLibrary, func.ts_headline(TEXT_SEARCH_CONFIG, document, tsquery, options)
+        ).filter(TechniqueLibrary.id.in_([technique_id for technique_id, _ in ranked])).all()
+        pages = {technique.id: (technique, snippet) for technique, snippet in rows}
+
+        hits = []
+        for technique_id, relevance in ranked:
+            if technique_id in pages:
+                technique, snippet = pages[technique_id]
+                hits.append(search_hit(technique, relevance, snippet))
+        return hits
+
+
+# FTS5 index over technique_library and the triggers keeping it in step
+SQLITE_SCHEMA = {
+    'technique_search': """
+        CREATE VIRTUAL TABLE technique_search USING fts5(
+            name, description, instructions,
+            content='technique_library', content_rowid='id', tokenize='porter unicode61'
+        )
+    """,
+    'technique_search_insert': """
+        CREATE TRIGGER technique_search_insert AFTER INSERT ON technique_library BEGIN
+            INSERT INTO technique_search(rowid, name, description, instructions)
+            VALUES (new.id, new.name, new.description, new.instructions);
+        END
+    """,
+    'technique_search_delete': """
+        CREATE TRIGGER technique_search_delete AFTER DELETE ON technique_library BEGIN
+            INSERT INTO technique_search(technique_search, rowid, name, description, instructions)
+            VALUES ('delete', old.id, old.name, old.description, old.instructions);
+        END
+    """,
+    'technique_search_update': """
+        CREATE TRIGGER technique_search_update AFTER UPDATE OF name, description, instructions
+        ON technique_library BEGIN
+            INSERT INTO technique_search(technique_search, rowid, name, description, instructions)
+            VALUES ('delete', old.id, old.name, old.description, old.instructions);
+            INSERT INTO technique_search(rowid, name, description, instructions)
+            VALUES (new.id, new.name, new.description, new.instructions);
+        END
+    """
+}
+
+
+class SqliteTechniqueSearch(TechniqueSearch):
+    """
+    SQLite FTS5 search for local deployments
+
+    technique_search is an external-content FTS5 table over
+    technique_library (name, description, instructions) with the porter
+    stemmer; triggers keep it in step with inserts, deletes and content
+    updates. Terms match as stemmed prefixes, results are ordered by
+    weighted bm25 and snippets come from FTS5 snippet(). Every match is
+    scored, so latency follows the match count rather than library size
+    (benchmarks/technique_search.py).
+    """
+
+    name = 'sqlite-fts5'
+
+    def _missing_schema(self, connection) -> List[str]:
+        existing = set(connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE name LIKE 'technique_search%'"
+        )).scalars())
+        return [name for name in SQLITE_SCHEMA if name not in existing]
+
+    def schema_ready(self):
+        with self.db.engine.connect() as connection:
+            return not self._missing_schema(connection)
+
+    def ensure_schema(self, concurrently=False):
+        with self.db.engine.begin() as connection:
+            missing = self._missing_schema(connection)
+            for name in missing:
+                connection.execute(text(SQLITE_SCHEMA[name]))
+            # Triggers dropped with technique_library (e.g. by a reset) leave the index stale
+            if missing:
+                connection.execute(text("INSERT INTO technique_search(technique_search) VALUES ('rebuild')"))
+
+    def rebuild(self):
+        with self.db.engine.begin() as connection:
+            connection.execute(text("INSERT INTO technique_search(technique_search) VALUES ('rebuild')"))
+
+    def _search(self, TechniqueLibrary, terms, conditions, limit, offset):
+        search_table = table('technique_search', column('rowid'))
+        fts = literal_column('technique_search')
+        match = fts.op('MATCH')(' '.join(f'"{term}"*' for term in terms))
+        # bm25 is lower for better matches
+        score = func.bm25(fts, *FIELD_WEIGHTS)
+        snippet = func.snippet(fts, -1, MATCH_START, MATCH_STOP, '…', SNIPPET_WORDS)
+
+        # Ids, scores and snippets only; full rows are loaded for the page alone
+        ranked = self.db.session.query(search_table.c.rowid, score, snippet).filter(match)
+        if conditions:
+            ranked = ranked.join(TechniqueLibrary, TechniqueLibrary.id == search_table.c.rowid).filter(*conditions)
+        ranked = ranked.order_by(score, search_table.c.rowid).offset(offset).limit(limit).all()
+        if not ranked:
+            return []
+
+        techniques = {technique.id: technique for technique in TechniqueLibrary.query.filter(
+            TechniqueLibrary.id.in_([technique_id for technique_id, _, _ in ranked])
+        )}
+        return [search_hit(techniques[technique_id], -score, snippet)
+                for technique_id, score, snippet in ranked if technique_id in techniques]
+
+
+SEARCH_ENGINES = {
+    'postgresql': PostgresTechniqueSearch,
+    'sqlite': SqliteTechniqueSearch
+}
+
+# One engine per database, picked on first use by checking for its schema
+_technique_search = {}
+
+
+def get_technique_search(db) -> TechniqueSearch:
+    """
+    Search engine for `db`'s dialect, falling back to substring matching
+
+    Only detects the full-text schema; create_technique_search_schema builds
+    it. A process that fell back keeps substring matching until restarted.
+    """
+    key = str(db.engine.url)
+    engine = _technique_search.get(key)
+    if engine is None:
+        engine_class = SEARCH_ENGINES.get(db.engine.dialect.name, TechniqueSearch)
+        engine = engine_class(db)
+        try:
+            ready = engine.schema_ready()
+        except Exception as e:
+            logger.warning(f"Could not check {engine.name} technique search schema: {e}")
+            ready = False
+        if not ready:
+            logger.warning(f"{engine.name} technique search index missing, using substring matching "
+                           f"(run `python database_manager.py rebuild-search`)")
+            engine = TechniqueSearch(db)
+        _technique_search[key] = engine
+    return engine
+
+
+def create_technique_search_schema(db, concurrently=False) -> TechniqueSearch:
+    """
+    Build the full-text schema for `db`'s dialect and return the engine now in use
+
+    For migrations and maintenance commands: on PostgreSQL this adds the
+    generated search_vector column, which rewrites technique_library.
+    """
+    engine_class = SEARCH_ENGINES.get(db.engine.dialect.name, TechniqueSearch)
+    engine_class(db).ensure_schema(concurrently=concurrently)
+    _technique_search.pop(str(db.engine.url), None)
+    return get_technique_search(db)
@@ -2,6 +2,9 @@ from datetime import datetime
 from sqlalchemy import or_, and_
 import logging
 
+from services.technique_index import get_technique_index
+from services.technique_search import get_technique_search
+
 class TechniqueService:
     """Service class for managing technique library operations"""
     
@@ -10,6 +13,7 @@ class TechniqueService:
         self.TechniqueLibrary = models['TechniqueLibrary']
         self.UserTechniqueBookmark = models['UserTechniqueBookmark']
         self.TechniqueCategory = models['TechniqueCategory']
+        self.TechniqueTag = models['TechniqueTag']
         self.logger = logging.getLogger(__name__)
     
     def import_scraped_techniques(self, scraped_techniques):
@@ -17,6 +21,7 @@ class TechniqueService:
         imported_count = 0
         updated_count = 0
         skipped_count = 0
+        changed = []
         
         print(f"📥 Importing {len(scraped_techniques)} scraped techniques...")
         
@@ -31,7 +36,7 @@ class TechniqueService:
                 if existing:
                     # Update existing technique if content has changed
                     if self._should_update_technique(existing, technique_data):
-                        self._update_technique(existing, technique_data)
+                        changed.append(self._update_technique(existing, technique_data))
                         updated_count += 1
                         print(f"🔄 Updated: {technique_data['name']}")
                     else:
@@ -39,7 +44,7 @@ class TechniqueService:
                         print(f"⏭️ Skipped: {technique_data['name']} (no changes)")
                 else:
                     # Create new technique
-                    self._create_technique(technique_data)
+                    changed.append(self._create_technique(technique_data))
                     imported_count += 1
                     print(f"✅ Imported: {technique_data['name']}")
                     
@@ -49,6 +54,8 @@ class TechniqueService:
         
         try:
             self.db.session.commit()
+            # Keep autocomplete current without a full rebuild
+            get_technique_index().refresh(changed)
             print(f"\n📊 Import Summary:")
             print(f"   ✅ Imported: {imported_count}")
             print(f"   🔄 Updated: {updated_count}")
@@ -113,7 +120,7 @@ class TechniqueService:
         existing.instructions = cleaned_data['instructions']
         existing.tips = cleaned_data['tips']
         existing.variations = cleaned_data['variations']
-        existing.tags = cleaned_data['tags']
+        existing.set_tags(cleaned_data['tags'])
         existing.difficulty_level = cleaned_data['difficulty_level']
         existing.belt_level = cleaned_data['belt_level']
         existing.last_updated = datetime.utcnow()
@@ -200,26 +207,41 @@ class TechniqueService:
             return None
     
     def search_techniques(self, query=None, style=None, category=None, difficulty=None, 
-                         tags=None, limit=50, offset=0):
-        """Search techniques with various filters"""
+                         tags=None, limit=50, offset=0, tag_mode='all'):
+        """Search techniques with various filters, ranked by full-text relevance when a query is given"""
         try:
-            techniques = self.TechniqueLibrary.search(
+            engine = get_technique_search(self.db)
+            # One extra row tells whether another page exists
+            techniques = engine.search(
+                self.TechniqueLibrary,
                 query=query,
                 style=style,
                 category=category,
                 difficulty=difficulty,
                 tags=tags,
-                limit=limit
+                tag_mode=tag_mode,
+                limit=limit + 1,
+                offset=offset
             )
             
-            return {
-                'techniques': [t.to_dict(include_content=False) for t in techniques],
-                'count': len(techniques),
-                'has_more': len(techniques) == limit
+            result = {
+                'techniques': techniques[:limit],
+                'count': len(techniques[:limit]),
+                'has_more': len(techniques) > limit,
+                'engine': engine.name
             }
             
+            # Nothing matched as typed: offer close technique names ("roundhose kick")
+            if query and not techniques and not offset:
+                index = get_technique_index()
+                index.ensure_built(self.TechniqueLibrary)
+                result['suggestions'] = index.lookup(query, limit=5)
+            
+            return result
+            
         except Exception as e:
             self.logger.error(f"Error searching techniques: {str(e)}")
+            self.db.session.rollback()
             return {'techniques': [], 'count': 0, 'has_more': False}
     
     def get_technique_detail(self, technique_id, user_id=None):
@@ -278,6 +300,18 @@ class TechniqueService:
             self.logger.error(f"Error getting available styles: {str(e)}")
             return []
     
+    def get_tag_facets(self, style=None, category=None, difficulty=None, tags=None, tag_mode='all', limit=50):
+        """Tag counts over the techniques matching the filters"""
+        try:
+            conditions = self.TechniqueLibrary.filter_conditions(
+                style=style, category=category, difficulty=difficulty, tags=tags, tag_mode=tag_mode
+            )
+            facets = self.TechniqueLibrary.tag_facets(conditions, limit=limit)
+            return [{'tag': tag, 'count': count} for tag, count in facets]
+        except Exception as e:
+            self.logger.error(f"Error getting tag facets: {str(e)}")
+            return []
+    
     def get_available_categories(self):
         """Get all available technique categories"""
         try:
@@ -0,0 +1,359 @@
+import copy
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# Training context configuration
+CONTEXT_VERSION = 2  # Bump when the snapshot layout changes; older snapshots are rebuilt on read
+RECENT_SESSIONS = 30  # Largest history any AI endpoint sends (injury risk)
+DAY_BUCKET_DAYS = 90  # Per-day totals kept for the rolling windows
+ROLLING_WINDOWS = (7, 30, 90)
+TOP_STYLES = 5
+NOTES_MAX_CHARS = 300
+
+
+def _iso(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _today() -> date:
+    # Same clock as TrainingSession.date defaults
+    return datetime.utcnow().date()
+
+
+def session_state(session) -> Dict:
+    """Snapshot entry of a training session (take it before an update to pass as `previous`)"""
+    return {
+        'id': session.id,
+        'date': _iso(session.date),
+        'duration': session.duration or 0,
+        'style': session.style,
+        'intensity_level': session.intensity_level,
+        'techniques_practiced': session.techniques_practiced or [],
+        'notes': (session.notes or '')[:NOTES_MAX_CHARS],
+        'mood': session.mood,
+        'calories_burned': session.calories_burned
+    }
+
+
+def technique_state(technique) -> Dict:
+    return {
+        'id': technique.id,
+        'technique_name': technique.technique_name,
+        'style': technique.style,
+        'proficiency_level': technique.proficiency_level,
+        'mastery_status': technique.mastery_status,
+        'practice_count': technique.practice_count or 0,
+        'last_practiced': _iso(technique.last_practiced)
+    }
+
+
+def profile_state(user) -> Dict:
+    return {
+        'name': user.first_name or user.username,
+        'primary_style': user.primary_style,
+        'belt_rank': user.belt_rank,
+        'years_training': user.years_training,
+        'goals': user.goals
+    }
+
+
+def _recent_key(entry: Dict):
+    return (entry['date'] or '', entry['id'])
+
+
+def _prune_days(data: Dict, today: date):
+    cutoff = (today - timedelta(days=DAY_BUCKET_DAYS - 1)).isoformat()
+    data['days'] = {day: bucket for day, bucket in data['days'].items() if day >= cutoff}
+    return cutoff
+
+
+def _apply_session(data: Dict, entry: Dict, sign: int, cutoff: str):
+    """Add (sign=1) or subtract (sign=-1) a session from the aggregates"""
+    totals = data['totals']
+    totals['sessions'] += sign
+    totals['minutes'] += sign * entry['duration']
+    if entry['intensity_level']:  # Unrated sessions don't count towards averages
+        totals['intensity_sum'] += sign * entry['intensity_level']
+        totals['intensity_count'] += sign
+
+    style = data['styles'].setdefault(entry['style'], {'sessions': 0, 'minutes': 0})
+    style['sessions'] += sign
+    style['minutes'] += sign * entry['duration']
+    if style['sessions'] <= 0:
+        del data['styles'][entry['style']]
+
+    if entry['date'] and entry['date'] >= cutoff:
+        day = data['days'].setdefault(entry['date'], {'sessions': 0, 'minutes': 0, 'intensity_sum': 0})
+        day['sessions'] += sign
+        day['minutes'] += sign * entry['duration']
+        day['intensity_sum'] += sign * (entry['intensity_level'] or 0)
+        if day['sessions'] <= 0:
+            del data['days'][entry['date']]
+
+
+def _remove_recent(data: Dict, session_id):
+    data['recent_sessions'] = [entry for entry in data['recent_sessions'] if entry['id'] != session_id]
+
+
+def _insert_recent(data: Dict, entry: Dict):
+    recent = data['recent_sessions']
+    # Sessions left out of the list sort below its last entry; one landing
+    # down there has an unknown position, so leave it to the refill
+    unlisted = data['totals']['sessions'] - 1 - len(recent)
+    if unlisted > 0 and recent and _recent_key(entry) < _recent_key(recent[-1]):
+        return
+    recent.append(entry)
+    recent.sort(key=_recent_key, reverse=True)
+    del recent[RECENT_SESSIONS:]
+
+
+def _recent_incomplete(data: Dict) -> bool:
+    return len(data['recent_sessions']) < min(data['totals']['sessions'], RECENT_SESSIONS)
+
+
+def build_view(user_id, data: Dict, today: Optional[date] = None) -> Dict:
+    """The training context handed to AI endpoints, derived from a stored snapshot"""
+    today = today or _today()
+    totals = data['totals']
+
+    rolling = {}
+    end = today.isoformat()
+    for days in ROLLING_WINDOWS:
+        start = (today - timedelta(days=days - 1)).isoformat()
+        buckets = [bucket for day, bucket in data['days'].items() if start <= day <= end]
+        sessions = sum(bucket['sessions'] for bucket in buckets)
+        rolling[f'last_{days}_days'] = {
+            'sessions': sessions,
+            'minutes': sum(bucket['minutes'] for bucket in buckets),
+            'active_days': len(buckets),
+            'avg_intensity': round(sum(bucket['intensity_sum'] for bucket in buckets) / sessions, 1) if sessions else 0
+        }
+
+    top_styles = sorted(
+        data['styles'].items(), key=lambda item: (item[1]['sessions'], item[1]['minutes']), reverse=True
+    )[:TOP_STYLES]
+
+    techniques = sorted(
+        data['techniques'].values(),
+        key=lambda t: (t['last_practiced'] or '', t['proficiency_level'] or 0),
+        reverse=True
+    )
+
+    return {
+        'user_id': int(user_id),
+        'profile': data['profile'],
+        'total_sessions': totals['sessions'],
+        'total_minutes': totals['minutes'],
+        'avg_intensity': round(totals['intensity_sum'] / totals['intensity_count'], 1) if totals['intensity_count'] else 0,
+        'rolling': rolling,
+        'top_styles': [{'style': style, **counts} for style, counts in top_styles],
+        'recent_sessions': data['recent_sessions'],
+        'last_session': data['recent_sessions'][0] if data['recent_sessions'] else None,
+        'techniques': techniques,
+        'technique_levels': dict(Counter(t['mastery_status'] for t in techniques)),
+        'built_at': data.get('built_at')
+    }
+
+
+class TrainingContextService:
+    """
+    Materialised training context of each user for the AI endpoints
+
+    One snapshot row per user holds the profile, running totals, per-style
+    and per-day aggregates (the last DAY_BUCKET_DAYS days, from which the
+    rolling windows are derived at read time), the RECENT_SESSIONS most
+    recent sessions and all technique progress. Reads are a single primary
+    key lookup; session/technique/profile writes patch the snapshot inside
+    the same transaction instead of the AI endpoints re-querying history.
+
+    A missing, stale or outdated snapshot is rebuilt from the tables on the
+    next read, so a failed patch costs one rebuild, never wrong data.
+    """
+
+    def _model(self):
+        return current_app.TrainingContextSnapshot
+
+    def _db(self):
+        return current_app.extensions['sqlalchemy']
+
+    def get_context(self, user_id) -> Optional[Dict]:
+        """Training context of a user, or None if the user doesn't exist"""
+        user_id = int(user_id)
+        snapshot = self._model().query.get(user_id)
+        if snapshot is not None and snapshot.data is not None and snapshot.version == CONTEXT_VERSION:
+            return build_view(user_id, snapshot.data)
+
+        data = self.rebuild(user_id, snapshot)
+        return build_view(user_id, data) if data is not None else None
+
+    def rebuild(self, user_id, snapshot=None) -> Optional[Dict]:
+        """Recompute a user's snapshot from the training tables and store it"""
+        data = self._build(user_id)
+        if data is None:
+            return None
+
+        db = self._db()
+        try:
+            if snapshot is None:
+                snapshot = self._model()(user_id=user_id, version=CONTEXT_VERSION)
+                db.session.add(snapshot)
+            snapshot.version = CONTEXT_VERSION
+            snapshot.data = data
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request stored it first
+            db.session.rollback()
+        return data
+
+    def _build(self, user_id) -> Optional[Dict]:
+        User = current_app.User
+        TrainingDailyRollup = current_app.TrainingDailyRollup
+        TechniqueProgress = current_app.TechniqueProgress
+        db = self._db()
+
+        user = User.query.get(user_id)
+        if not user:
+            return None
+
+        today = _today()
+        cutoff = today - timedelta(days=DAY_BUCKET_DAYS - 1)
+
+        # Aggregates come from the daily rollup, O(days) rather than O(sessions)
+        count, minutes, intensity_sum, intensity_count = db.session.query(
+            func.coalesce(func.sum(TrainingDailyRollup.session_count), 0),
+            func.coalesce(func.sum(TrainingDailyRollup.minutes), 0),
+            func.coalesce(func.sum(TrainingDailyRollup.intensity_sum), 0),
+            func.coalesce(func.sum(TrainingDailyRollup.intensity_count), 0)
+        ).filter(TrainingDailyRollup.user_id == user_id).one()
+
+        styles = db.session.query(
+            TrainingDailyRollup.style, func.sum(TrainingDailyRollup.session_count), func.sum(TrainingDailyRollup.minutes)
+        ).filter(TrainingDailyRollup.user_id == user_id).group_by(TrainingDailyRollup.style).all()
+
+        days = db.session.query(
+            TrainingDailyRollup.date,
+            func.sum(TrainingDailyRollup.session_count),
+            func.sum(TrainingDailyRollup.minutes),
+            func.sum(TrainingDailyRollup.intensity_sum)
+        ).filter(
+            TrainingDailyRollup.user_id == user_id,
+            TrainingDailyRollup.date >= cutoff
+        ).group_by(TrainingDailyRollup.date).all()
+
+        techniques = TechniqueProgress.query.filter_by(user_id=user_id).all()
+
+        return {
+            'profile': profile_state(user),
+            'totals': {
+                'sessions': int(count),
+                'minutes': int(minutes),
+                'intensity_sum': int(intensity_sum),
+                'intensity_count': int(intensity_count)
+            },
+            'styles': {style: {'sessions': int(n), 'minutes': int(m)} for style, n, m in styles},
+            'days': {
+                _iso(day): {'sessions': int(n), 'minutes': int(m), 'intensity_sum': int(i)}
+                for day, n, m, i in days
+            },
+            'recent_sessions': self._load_recent(user_id),
+            'techniques': {str(t.id): technique_state(t) for t in techniques},
+            'built_at': datetime.utcnow().isoformat()
+        }
+
+    def _load_recent(self, user_id) -> List[Dict]:
+        TrainingSession = current_app.TrainingSession
+        sessions = TrainingSession.query.filter_by(user_id=user_id).order_by(
+            TrainingSession.date.desc(), TrainingSession.id.desc()
+        ).limit(RECENT_SESSIONS).all()
+        return [session_state(session) for session in sessions]
+
+    def _update(self, user_id, change: Callable[[Dict, str], None]):
+        """
+        Patch a user's snapshot in the caller's transaction (the caller commits)
+
+        Without a usable snapshot there is nothing to patch - the next read
+        builds one that already includes this write. Never raises.
+        """
+        snapshot = None
+        try:
+            snapshot = self._model().query.filter_by(user_id=int(user_id)).with_for_update().first()
+            if snapshot is None or snapshot.data is None or snapshot.version != CONTEXT_VERSION:
+                return
+
+            data = copy.deepcopy(snapshot.data)
+            cutoff = _prune_days(data, _today())
+            change(data, cutoff)
+            if _recent_incomplete(data):
+                data['recent_sessions'] = self._load_recent(int(user_id))
+            snapshot.data = data
+        except Exception as e:
+            logger.warning(f"Training context update failed for user {user_id}, rebuilding on next read: {e}")
+            if snapshot is not None:
+                snapshot.data = None
+
+    def session_saved(self, session, previous: Optional[Dict] = None):
+        """Fold a new session, or an updated one with its session_state() from before the update"""
+        self._db().session.flush()  # New sessions need their id
+        entry = session_state(session)
+
+        def change(data, cutoff):
+            if previous:
+                _apply_session(data, previous, -1, cutoff)
+                _remove_recent(data, previous['id'])
+            _apply_session(data, entry, 1, cutoff)
+            _insert_recent(data, entry)
+
+        self._update(session.user_id, change)
+
+    def session_deleted(self, session):
+        """Take a session out (call after db.session.delete so refills skip it)"""
+        entry = session_state(session)
+
+        def change(data, cutoff):
+            _apply_session(data, entry, -1, cutoff)
+            _remove_recent(data, entry['id'])
+
+        self._update(session.user_id, change)
+
+    def technique_saved(self, technique):
+        self._db().session.flush()
+        entry = technique_state(technique)
+
+        def change(data, cutoff):
+            data['techniques'][str(entry['id'])] = entry
+
+        self._update(technique.user_id, change)
+
+    def technique_deleted(self, technique):
+        technique_id = str(technique.id)
+
+        def change(data, cutoff):
+            data['techniques'].pop(technique_id, None)
+
+        self._update(technique.user_id, change)
+
+    def profile_saved(self, user):
+        profile = profile_state(user)
+
+        def change(data, cutoff):
+            data['profile'] = profile
+
+        self._update(user.id, change)
+
+
+# Global training context service instance
+training_context_service = TrainingContextService()
+
+def get_training_context_service() -> TrainingContextService:
+    """Get the global training context service instance"""
+    return training_context_service
@@ -0,0 +1,168 @@
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import case, func, insert
+from sqlalchemy.exc import IntegrityError
+
+from services.training_context import session_state
+
+logger = logging.getLogger(__name__)
+
+# Daily rollup configuration
+MAX_SERIES_DAYS = 366
+
+
+class TrainingRollupService:
+    """
+    training_daily_rollup maintenance and queries
+
+    Each row holds one user's totals for one day and style. The session
+    routes apply every create/update/delete to the matching rows in the
+    same transaction as the session itself, so dashboard aggregates scan
+    O(days) rollup rows instead of O(sessions) session rows. backfill()
+    rebuilds rows from training_sessions (database_manager.py
+    backfill-rollups) for data written before the table existed or
+    outside the routes.
+    """
+
+    def _model(self):
+        return current_app.TrainingDailyRollup
+
+    def _db(self):
+        return current_app.extensions['sqlalchemy']
+
+    def _row(self, user_id, day, style):
+        TrainingDailyRollup = self._model()
+        return TrainingDailyRollup.query.filter_by(user_id=user_id, date=day, style=style).with_for_update().first()
+
+    def _apply(self, user_id, entry: Dict, sign: int):
+        """Add (sign=1) or subtract (sign=-1) a session_state() entry"""
+        TrainingDailyRollup = self._model()
+        db = self._db()
+        day = date.fromisoformat(entry['date'])
+
+        row = self._row(user_id, day, entry['style'])
+        if row is None:
+            if sign < 0:
+                logger.warning(f"No rollup row for user {user_id} {day} {entry['style']}; run backfill-rollups")
+                return
+            try:
+                with db.session.begin_nested():
+                    row = TrainingDailyRollup(
+                        user_id=user_id, date=day, style=entry['style'],
+                        session_count=0, minutes=0, intensity_sum=0, intensity_count=0, calories=0
+                    )
+                    db.session.add(row)
+            except IntegrityError:
+                # A concurrent request created the row first
+                row = self._row(user_id, day, entry['style'])
+
+        row.session_count += sign
+        row.minutes += sign * entry['duration']
+        if entry['intensity_level']:  # Unrated sessions don't count towards averages
+            row.intensity_sum += sign * entry['intensity_level']
+            row.intensity_count += sign
+        row.calories += sign * (entry['calories_burned'] or 0)
+
+        if row.session_count <= 0:
+            db.session.delete(row)
+
+    def session_saved(self, session, previous: Optional[Dict] = None):
+        """Roll up a new session, or an updated one with its session_state() from before the update (the caller commits)"""
+        if previous:
+            self._apply(session.user_id, previous, -1)
+        self._apply(session.user_id, session_state(session), 1)
+
+    def session_deleted(self, session):
+        self._apply(session.user_id, session_state(session), -1)
+
+    def backfill(self, user_id=None) -> int:
+        """
+        Rebuild rollup rows from training_sessions, for one user or everyone
+
+        Returns:
+            Number of rollup rows written
+        """
+        TrainingDailyRollup = self._model()
+        TrainingSession = current_app.TrainingSession
+        db = self._db()
+
+        rated = TrainingSession.intensity_level > 0
+        aggregates = db.session.query(
+            TrainingSession.user_id,
+            TrainingSession.date,
+            TrainingSession.style,
+            func.count(TrainingSession.id),
+            func.coalesce(func.sum(TrainingSession.duration), 0),
+            func.coalesce(func.sum(case((rated, TrainingSession.intensity_level), else_=0)), 0),
+            func.coalesce(func.sum(case((rated, 1), else_=0)), 0),
+            func.coalesce(func.sum(TrainingSession.calories_burned), 0)
+        )
+        existing = TrainingDailyRollup.query
+        if user_id is not None:
+            aggregates = aggregates.filter(TrainingSession.user_id == user_id)
+            existing = existing.filter(TrainingDailyRollup.user_id == user_id)
+        aggregates = aggregates.group_by(TrainingSession.user_id, TrainingSession.date, TrainingSession.style)
+
+        try:
+            existing.delete(synchronize_session=False)
+            result = db.session.execute(insert(TrainingDailyRollup.__table__).from_select(
+                ['user_id', 'date', 'style', 'session_count', 'minutes', 'intensity_sum', 'intensity_count', 'calories'],
+                aggregates
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return result.rowcount
+
+    def needs_backfill(self) -> bool:
+        """True if there are sessions but no rollup rows (e.g. right after the table was added)"""
+        TrainingDailyRollup = self._model()
+        TrainingSession = current_app.TrainingSession
+        return TrainingDailyRollup.query.first() is None and TrainingSession.query.first() is not None
+
+    def daily_series(self, user_id, start: date, end: date, style: Optional[str] = None) -> List[Dict]:
+        """Per-day totals from start to end inclusive, with empty days filled in"""
+        TrainingDailyRollup = self._model()
+        db = self._db()
+
+        query = db.session.query(
+            TrainingDailyRollup.date,
+            func.sum(TrainingDailyRollup.session_count),
+            func.sum(TrainingDailyRollup.minutes),
+            func.sum(TrainingDailyRollup.intensity_sum),
+            func.sum(TrainingDailyRollup.intensity_count),
+            func.sum(TrainingDailyRollup.calories)
+        ).filter(
+            TrainingDailyRollup.user_id == user_id,
+            TrainingDailyRollup.date >= start,
+            TrainingDailyRollup.date <= end
+        )
+        if style:
+            query = query.filter(TrainingDailyRollup.style == style)
+        rows = {day: values for day, *values in query.group_by(TrainingDailyRollup.date).all()}
+
+        series = []
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            sessions, minutes, intensity_sum, intensity_count, calories = [int(v or 0) for v in rows.get(day, (0,) * 5)]
+            series.append({
+                'date': day.isoformat(),
+                'sessions': sessions,
+                'minutes': minutes,
+                'hours': round(minutes / 60, 2),
+                'avg_intensity': round(intensity_sum / intensity_count, 1) if intensity_count else 0,
+                'calories': calories
+            })
+        return series
+
+
+# Global training rollup service instance
+training_rollup_service = TrainingRollupService()
+
+def get_training_rollup_service() -> TrainingRollupService:
+    """Get the global training rollup service instance"""
+    return training_rollup_service
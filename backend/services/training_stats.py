@@ -0,0 +1,94 @@
+import logging
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+from flask import current_app
+from sqlalchemy import case, func
+
+logger = logging.getLogger(__name__)
+
+# Training statistics configuration
+RECENT_SESSIONS = 10
+WEEK_DAYS = 7
+MONTH_DAYS = 30
+
+
+def empty_training_stats() -> Dict:
+    return {
+        'total_sessions': 0,
+        'total_hours': 0,
+        'avg_intensity': 0,
+        'styles_practiced': [],
+        'this_week': {'sessions': 0, 'hours': 0},
+        'this_month': {'sessions': 0, 'hours': 0},
+        'recent_sessions': [],
+        'technique_stats': {'total_techniques': 0, 'mastery_breakdown': {}}
+    }
+
+
+def compute_training_stats(user_id, today: Optional[date] = None) -> Dict:
+    """
+    Training statistics of a user, aggregated from the daily rollup
+
+    Totals, the intensity average and the week/month windows come from one
+    aggregate query with conditional sums over training_daily_rollup (one
+    row per day and style), so the cost grows with days trained rather
+    than sessions logged and no session rows are loaded except the
+    RECENT_SESSIONS returned in full. Runs on SQLite and PostgreSQL (CASE
+    rather than FILTER, which older SQLite lacks).
+    """
+    TrainingSession = current_app.TrainingSession
+    TrainingDailyRollup = current_app.TrainingDailyRollup
+    TechniqueProgress = current_app.TechniqueProgress
+    db = current_app.extensions['sqlalchemy']
+
+    today = today or date.today()
+    week_ago = today - timedelta(days=WEEK_DAYS)
+    month_ago = today - timedelta(days=MONTH_DAYS)
+
+    in_week = TrainingDailyRollup.date >= week_ago
+    in_month = TrainingDailyRollup.date >= month_ago
+
+    totals = db.session.query(
+        func.sum(TrainingDailyRollup.session_count),
+        func.sum(TrainingDailyRollup.minutes),
+        func.sum(TrainingDailyRollup.intensity_sum),
+        func.sum(TrainingDailyRollup.intensity_count),
+        func.sum(case((in_week, TrainingDailyRollup.session_count), else_=0)),
+        func.sum(case((in_week, TrainingDailyRollup.minutes), else_=0)),
+        func.sum(case((in_month, TrainingDailyRollup.session_count), else_=0)),
+        func.sum(case((in_month, TrainingDailyRollup.minutes), else_=0))
+    ).filter(TrainingDailyRollup.user_id == user_id).one()
+
+    (total_sessions, total_minutes, intensity_sum, intensity_count,
+     week_sessions, week_minutes, month_sessions, month_minutes) = [int(value or 0) for value in totals]
+
+    if not total_sessions:
+        return empty_training_stats()
+
+    styles = db.session.query(TrainingDailyRollup.style).filter(
+        TrainingDailyRollup.user_id == user_id
+    ).distinct().order_by(TrainingDailyRollup.style).all()
+
+    # Same order as the former stable sort: newest date first, ties by id
+    recent_sessions = TrainingSession.query.filter_by(user_id=user_id).order_by(
+        TrainingSession.date.desc(), TrainingSession.id
+    ).limit(RECENT_SESSIONS).all()
+
+    mastery = db.session.query(
+        TechniqueProgress.mastery_status, func.count(TechniqueProgress.id)
+    ).filter(TechniqueProgress.user_id == user_id).group_by(TechniqueProgress.mastery_status).all()
+
+    return {
+        'total_sessions': total_sessions,
+        'total_hours': round(total_minutes / 60, 2),
+        'avg_intensity': round(intensity_sum / intensity_count, 1) if intensity_count else 0,
+        'styles_practiced': [style for (style,) in styles],
+        'this_week': {'sessions': week_sessions, 'hours': round(week_minutes / 60, 2)},
+        'this_month': {'sessions': month_sessions, 'hours': round(month_minutes / 60, 2)},
+        'recent_sessions': [session.to_dict() for session in recent_sessions],
+        'technique_stats': {
+            'total_techniques': sum(count for _, count in mastery),
+            'mastery_breakdown': {status: count for status, count in mastery}
+        }
+    }
@@ -0,0 +1,268 @@
+import os
+import json
+import math
+import shutil
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Derived asset configuration
+ASSET_FOLDER = 'uploads/assets'
+MANIFEST_NAME = 'manifest.json'
+KEYFRAME_COUNT = 10  # Matches AIVideoAnalysisService.max_frames
+KEYFRAME_QUALITY = 80
+POSTER_SIZE = 1280
+POSTER_SMALL_SIZE = 320
+SPRITE_TILE_WIDTH = 160
+SPRITE_COLUMNS = 10
+SPRITE_MAX_TILES = 100
+
+
+def _image_format():
+    """WebP when Pillow was built with it, JPEG otherwise"""
+    from PIL import features
+    return ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+
+def sprite_frame_indices(total_frames, fps, max_tiles=SPRITE_MAX_TILES):
+    """
+    Frame indices for scrub-preview tiles, one every `interval` seconds
+
+    Returns:
+        (frame_indices, interval_seconds)
+    """
+    if total_frames <= 0:
+        return [], 0
+    fps = fps if fps and fps > 0 else 30
+    duration = total_frames / fps
+    interval = max(1, math.ceil(duration / max_tiles))
+    step = max(1, int(round(interval * fps)))
+    return list(range(0, total_frames, step))[:max_tiles], interval
+
+
+def generate_video_assets(location, output_dir, frame_selection='motion', max_keyframes=KEYFRAME_COUNT):
+    """
+    Build the derived assets of one video (runs inside a worker process)
+
+    Produces a poster (full and small JPEG), a scrub sprite sheet and the
+    analysis keyframes as compressed WebP/JPEG, decoding the video in
+    sequential passes. Everything is written to a temp directory and renamed
+    into place, so a manifest only ever describes complete assets.
+
+    Args:
+        location: Storage location of the original (local path or s3:// URI);
+            remote videos are read through a URL minted as the job starts
+
+    Returns:
+        The manifest dict (also written to manifest.json)
+    """
+    import cv2
+    from PIL import Image
+    from services.frame_extraction import (
+        MAX_FRAME_SIZE, get_video_info, sample_frame_indices, select_motion_frames,
+        iter_frames_sequential, to_pil_image
+    )
+    from services.video_storage import worker_read_url
+
+    video_path = worker_read_url(location)
+    total_frames, fps = get_video_info(video_path)
+
+    keyframe_indices = []
+    if frame_selection == 'motion':
+        keyframe_indices = select_motion_frames(video_path, max_keyframes)
+    if not keyframe_indices:
+        keyframe_indices = sample_frame_indices(total_frames, max_keyframes)
+
+    sprite_indices, sprite_interval = sprite_frame_indices(total_frames, fps)
+    # The middle keyframe sits in the peak-motion window - a good "action shot"
+    poster_index = keyframe_indices[len(keyframe_indices) // 2] if keyframe_indices else 0
+
+    keyframe_set = set(keyframe_indices)
+    sprite_set = set(sprite_indices)
+    image_format, extension = _image_format()
+
+    temp_dir = f'{output_dir}.tmp'
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(temp_dir, 'keyframes'))
+
+    try:
+        keyframes = []
+        tiles = []
+        poster = None
+
+        for frame_idx, frame in iter_frames_sequential(video_path, keyframe_set | sprite_set | {poster_index}):
+            if frame_idx in keyframe_set:
+                filename = f'keyframes/frame_{frame_idx:06d}.{extension}'
+                to_pil_image(frame, MAX_FRAME_SIZE).save(os.path.join(temp_dir, filename), image_format, quality=KEYFRAME_QUALITY)
+                keyframes.append({
+                    'frame_index': frame_idx,
+                    'timestamp': round(frame_idx / fps, 3) if fps else None,
+                    'file': filename
+                })
+
+            if frame_idx in sprite_set:
+                height, width = frame.shape[:2]
+                tile_height = max(2, int(height * SPRITE_TILE_WIDTH / width) // 2 * 2)
+                tile = cv2.resize(frame, (SPRITE_TILE_WIDTH, tile_height), interpolation=cv2.INTER_AREA)
+                tiles.append(Image.fromarray(cv2.cvtColor(tile, cv2.COLOR_BGR2RGB)))
+
+            if frame_idx == poster_index:
+                poster = to_pil_image(frame, POSTER_SIZE)
+
+        if poster is None:
+            raise RuntimeError('Could not decode any frame for the poster')
+
+        poster.save(os.path.join(temp_dir, 'poster.jpg'), 'JPEG', quality=85, optimize=True, progressive=True)
+        poster_small = poster.copy()
+        poster_small.thumbnail((POSTER_SMALL_SIZE, POSTER_SMALL_SIZE), Image.Resampling.LANCZOS)
+        poster_small.save(os.path.join(temp_dir, 'poster_small.jpg'), 'JPEG', quality=80, optimize=True)
+
+        sprite = None
+        if tiles:
+            tile_width, tile_height = tiles[0].size
+            columns = min(SPRITE_COLUMNS, len(tiles))
+            rows = math.ceil(len(tiles) / columns)
+            sheet = Image.new('RGB', (columns * tile_width, rows * tile_height))
+            for i, tile in enumerate(tiles):
+                sheet.paste(tile, ((i % columns) * tile_width, (i // columns) * tile_height))
+            sheet.save(os.path.join(temp_dir, f'sprite.{extension}'), image_format, quality=70)
+            sprite = {
+                'file': f'sprite.{extension}',
+                'interval_seconds': sprite_interval,
+                'tile_width': tile_width,
+                'tile_height': tile_height,
+                'columns': columns,
+                'rows': rows,
+                'tiles': len(tiles)
+            }
+
+        manifest = {
+            'poster': 'poster.jpg',
+            'poster_small': 'poster_small.jpg',
+            'sprite': sprite,
+            'keyframes': keyframes,
+            'frame_selection': frame_selection,
+            'max_keyframes': max_keyframes,
+            'total_frames': total_frames,
+            'fps': fps
+        }
+        with open(os.path.join(temp_dir, MANIFEST_NAME), 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(temp_dir, output_dir)
+        return manifest
+
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+
+def load_manifest(assets_path):
+    """Read an asset manifest, or None if assets were never generated"""
+    if not assets_path:
+        return None
+    manifest_path = os.path.join(assets_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def load_keyframes(assets_path, frame_selection='motion', max_keyframes=KEYFRAME_COUNT) -> Optional[List]:
+    """
+    Stored analysis keyframes as PIL images, so re-runs skip decoding entirely
+
+    Returns None when the stored set was built with different settings.
+    """
+    from PIL import Image
+
+    manifest = load_manifest(assets_path)
+    if not manifest or not manifest.get('keyframes'):
+        return None
+    if manifest.get('frame_selection') != frame_selection or manifest.get('max_keyframes') != max_keyframes:
+        return None
+
+    frames = []
+    try:
+        for keyframe in manifest['keyframes']:
+            with Image.open(os.path.join(assets_path, keyframe['file'])) as image:
+                frames.append(image.convert('RGB'))
+    except OSError as e:
+        logger.warning(f"Stored keyframes in {assets_path} are unreadable: {e}")
+        return None
+    return frames
+
+
+class VideoAssetService:
+    """Generates derived assets in a background process pool and records them on TrainingVideo"""
+
+    def __init__(self, max_workers=1, output_root=ASSET_FOLDER):
+        self.max_workers = max_workers
+        self.output_root = output_root
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: workers must not inherit the parent's DB connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def output_dir_for(self, video_id):
+        return os.path.join(self.output_root, str(video_id))
+
+    def submit(self, app, video_id, location):
+        """Queue asset generation; assets_path is set on the video when done"""
+        os.makedirs(self.output_root, exist_ok=True)
+        frame_selection = os.getenv('FRAME_SELECTION', 'motion')
+        future = self._get_executor().submit(
+            generate_video_assets, location, self.output_dir_for(video_id), frame_selection
+        )
+        future.add_done_callback(partial(self._on_complete, app, video_id))
+        logger.info(f"Queued asset generation for video {video_id}")
+        return future
+
+    def _on_complete(self, app, video_id, future):
+        """Done-callback (runs on an executor thread in the web process)"""
+        error = future.exception()
+        if error:
+            logger.error(f"Asset generation failed for video {video_id}: {error}")
+            return
+
+        with app.app_context():
+            db = app.extensions['sqlalchemy']
+            try:
+                video = db.session.get(app.TrainingVideo, video_id)
+                if not video:
+                    # Video was deleted while assets were generated
+                    shutil.rmtree(self.output_dir_for(video_id), ignore_errors=True)
+                    return
+
+                video.assets_path = self.output_dir_for(video_id)
+                db.session.commit()
+                logger.info(f"Assets ready for video {video_id}")
+            except Exception as e:
+                logger.error(f"Could not record assets for video {video_id}: {e}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+    def shutdown(self, wait=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+# Global asset service instance
+video_asset_service = VideoAssetService()
+
+def get_video_asset_service() -> VideoAssetService:
+    """Get the global video asset service instance"""
+    return video_asset_service
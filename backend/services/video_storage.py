@@ -0,0 +1,304 @@
+import os
+import shutil
+import logging
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional, Tuple
+
+from services.video_upload import CHUNK_SIZE, read_head, save_stream_atomically
+from services.video_streaming import content_disposition
+
+logger = logging.getLogger(__name__)
+
+# Storage configuration
+VIDEO_STORAGE_BACKEND = os.getenv('VIDEO_STORAGE_BACKEND', 'local')  # 'local' or 's3'
+LOCAL_VIDEO_FOLDER = 'uploads/videos'
+S3_BUCKET = os.getenv('S3_BUCKET')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')  # e.g. http://localhost:9000 for MinIO
+S3_REGION = os.getenv('S3_REGION', 'us-east-1')
+S3_PREFIX = os.getenv('S3_PREFIX', 'videos/')
+PRESIGNED_URL_SECONDS = int(os.getenv('S3_PRESIGNED_URL_SECONDS', '3600'))
+WORKER_URL_SECONDS = int(os.getenv('S3_WORKER_URL_SECONDS', str(12 * 60 * 60)))  # Must outlast one ffmpeg run
+MULTIPART_PART_SIZE = 8 * 1024 * 1024  # S3 requires >= 5MB for every part but the last
+
+S3_SCHEME = 's3://'
+
+
+class VideoStorage(ABC):
+    """
+    Where original training videos live
+
+    A video's *location* (stored in TrainingVideo.file_path) is either a
+    local path or an s3://bucket/key URI, so rows written before a backend
+    switch keep working - get_storage_for() picks the driver per location.
+    """
+
+    @abstractmethod
+    def save_stream(self, stream: BinaryIO, key: str, max_size: int, validator=None, hasher=None) -> Tuple[str, int]:
+        """
+        Store an upload stream without holding it in memory
+
+        Args:
+            stream: File-like object to read from (e.g. FileStorage.stream)
+            key: Object name, e.g. the generated unique filename
+            max_size: Maximum number of bytes accepted
+            validator: Optional callable(head_bytes) -> (is_valid, error_message)
+            hasher: Optional hashlib object updated with every byte stored
+
+        Returns:
+            (location, size_in_bytes)
+
+        Raises:
+            ValueError: If validation fails or the stream exceeds max_size
+        """
+
+    @abstractmethod
+    def save_file(self, local_path: str, key: str) -> str:
+        """Move a finished local file into storage (the local file is consumed); returns its location"""
+
+    @abstractmethod
+    def exists(self, location: str) -> bool:
+        """Whether a stored object exists at `location`"""
+
+    @abstractmethod
+    def delete(self, location: str):
+        """Remove the object at `location`"""
+
+    @abstractmethod
+    def open(self, location: str) -> BinaryIO:
+        """Binary file-like object for streaming reads (caller closes it)"""
+
+    def local_path(self, location: str) -> Optional[str]:
+        """Filesystem path of a location, or None for remote storage"""
+        return None
+
+    def presigned_url(self, location: str, expires_in: int = PRESIGNED_URL_SECONDS,
+                      download_name: str = None) -> Optional[str]:
+        """Time-limited URL clients can fetch directly (with Range requests), or None"""
+        return None
+
+    def read_url(self, location: str, expires_in: int = PRESIGNED_URL_SECONDS) -> str:
+        """
+        Something OpenCV/ffmpeg can open: the local path, or a presigned URL
+        that they read with HTTP range requests - no local copy is made
+        """
+        return self.local_path(location) or self.presigned_url(location, expires_in=expires_in)
+
+
+class LocalStorage(VideoStorage):
+    """Videos on the local filesystem (single node)"""
+
+    def __init__(self, root=LOCAL_VIDEO_FOLDER):
+        self.root = root
+
+    def _path_for(self, key):
+        os.makedirs(self.root, exist_ok=True)
+        return os.path.join(self.root, key)
+
+    def save_stream(self, stream, key, max_size, validator=None, hasher=None):
+        file_path = self._path_for(key)
+        size = save_stream_atomically(stream, file_path, max_size, validator=validator, hasher=hasher)
+        return file_path, size
+
+    def save_file(self, local_path, key):
+        file_path = self._path_for(key)
+        shutil.move(local_path, file_path)  # A rename when on the same filesystem
+        return file_path
+
+    def exists(self, location):
+        return bool(location) and os.path.exists(location)
+
+    def delete(self, location):
+        if self.exists(location):
+            os.remove(location)
+
+    def open(self, location):
+        return open(location, 'rb')
+
+    def local_path(self, location):
+        return location
+
+
+class S3Storage(VideoStorage):
+    """
+    Videos in an S3-compatible bucket (AWS S3, MinIO, ...)
+
+    Uploads are streamed in MULTIPART_PART_SIZE parts, streaming is served by
+    presigned GET URLs (clients send their own Range headers) and OpenCV/ffmpeg
+    read through the same URLs. Point S3_ENDPOINT_URL at a local MinIO (or any
+    S3 stand-in) to run against it.
+
+    Requires boto3 (pip install boto3).
+    """
+
+    def __init__(self, bucket=S3_BUCKET, endpoint_url=S3_ENDPOINT_URL, region=S3_REGION,
+                 prefix=S3_PREFIX, part_size=MULTIPART_PART_SIZE):
+        if not bucket:
+            raise ValueError('S3_BUCKET must be set to use S3 video storage')
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.prefix = prefix
+        self.part_size = part_size
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError:
+                raise RuntimeError('boto3 is required for S3 video storage (pip install boto3)')
+
+            self._client = boto3.client(
+                's3',
+                endpoint_url=self.endpoint_url,
+                region_name=self.region,
+                config=Config(signature_version='s3v4')
+            )
+        return self._client
+
+    def _location(self, object_key):
+        return f'{S3_SCHEME}{self.bucket}/{object_key}'
+
+    def _object_key(self, location):
+        bucket, _, object_key = location[len(S3_SCHEME):].partition('/')
+        if bucket != self.bucket or not object_key:
+            raise ValueError(f'Location {location} is not in bucket {self.bucket}')
+        return object_key
+
+    def save_stream(self, stream, key, max_size, validator=None, hasher=None):
+        object_key = f'{self.prefix}{key}'
+
+        # Only the first few KB are needed to sniff the MIME type
+        head = read_head(stream)
+        if validator:
+            is_valid, error_message = validator(head)
+            if not is_valid:
+                raise ValueError(error_message)
+
+        buffer = bytearray(head)
+        total_bytes = len(head)
+        if hasher:
+            hasher.update(head)
+
+        upload_id = None
+        parts = []
+
+        try:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if chunk:
+                    total_bytes += len(chunk)
+                    if total_bytes > max_size:
+                        raise ValueError(f'File too large. Maximum size is {max_size // (1024*1024)}MB')
+                    buffer.extend(chunk)
+                    if hasher:
+                        hasher.update(chunk)
+
+                if len(buffer) >= self.part_size or (not chunk and upload_id and buffer):
+                    if upload_id is None:
+                        upload_id = self.client.create_multipart_upload(
+                            Bucket=self.bucket, Key=object_key
+                        )['UploadId']
+                    part_number = len(parts) + 1
+                    response = self.client.upload_part(
+                        Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                        PartNumber=part_number, Body=bytes(buffer)
+                    )
+                    parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+                    buffer.clear()
+
+                if not chunk:
+                    break
+
+            if upload_id:
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+            else:
+                # Smaller than one part - a single PUT is enough
+                self.client.put_object(Bucket=self.bucket, Key=object_key, Body=bytes(buffer))
+
+        except BaseException:
+            # Never leave half-finished multipart uploads accruing storage
+            if upload_id:
+                try:
+                    self.client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+                except Exception as e:
+                    logger.warning(f"Could not abort multipart upload of {object_key}: {e}")
+            raise
+
+        return self._location(object_key), total_bytes
+
+    def save_file(self, local_path, key):
+        from boto3.s3.transfer import TransferConfig
+
+        object_key = f'{self.prefix}{key}'
+        self.client.upload_file(
+            local_path, self.bucket, object_key,
+            Config=TransferConfig(multipart_threshold=self.part_size, multipart_chunksize=self.part_size)
+        )
+        os.remove(local_path)
+        return self._location(object_key)
+
+    def exists(self, location):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(location))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def delete(self, location):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(location))
+
+    def open(self, location):
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(location))['Body']
+
+    def presigned_url(self, location, expires_in=PRESIGNED_URL_SECONDS, download_name=None):
+        params = {'Bucket': self.bucket, 'Key': self._object_key(location)}
+        if download_name:
+            params['ResponseContentDisposition'] = content_disposition(download_name)
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+
+
+_storages = {}
+
+def _get_local_storage():
+    if 'local' not in _storages:
+        _storages['local'] = LocalStorage()
+    return _storages['local']
+
+def _get_s3_storage(bucket):
+    key = f's3:{bucket}'
+    if key not in _storages:
+        _storages[key] = S3Storage(bucket=bucket)
+    return _storages[key]
+
+def get_storage() -> VideoStorage:
+    """Storage backend that new uploads go to (VIDEO_STORAGE_BACKEND)"""
+    if VIDEO_STORAGE_BACKEND == 's3':
+        return _get_s3_storage(S3_BUCKET)
+    if VIDEO_STORAGE_BACKEND == 'local':
+        return _get_local_storage()
+    raise ValueError(f'Unknown VIDEO_STORAGE_BACKEND: {VIDEO_STORAGE_BACKEND}')
+
+def get_storage_for(location: str) -> VideoStorage:
+    """Storage backend holding an existing location"""
+    if location and location.startswith(S3_SCHEME):
+        return _get_s3_storage(location[len(S3_SCHEME):].split('/', 1)[0])
+    return _get_local_storage()
+
+def worker_read_url(location: str) -> str:
+    """
+    read_url() for a background job, called when the job starts
+
+    Jobs receive the location rather than a URL, so time spent queued
+    never eats into the presigned URL's lifetime.
+    """
+    return get_storage_for(location).read_url(location, expires_in=WORKER_URL_SECONDS)
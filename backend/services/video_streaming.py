@@ -0,0 +1,238 @@
+import os
+import uuid
+import unicodedata
+from urllib.parse import quote
+from flask import Response, current_app, request
+from werkzeug.http import dump_options_header, http_date, parse_date
+from werkzeug.wsgi import wrap_file
+
+# Range serving configuration
+READ_BLOCK_SIZE = 256 * 1024  # Bytes read per iteration when serving a range
+MAX_RANGES = 16  # More ranges than this are served as the whole file
+
+
+def content_disposition(download_name, disposition='attachment'):
+    """
+    Content-Disposition value for a download name, built like Flask's send_file
+
+    Non-ASCII names get an ASCII fallback plus an RFC 5987 filename* parameter,
+    and quotes/backslashes in the name are escaped.
+    """
+    try:
+        download_name.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        quoted = quote(download_name, safe="!#$&+^`|~")
+        names = {'filename': simple, 'filename*': f"UTF-8''{quoted}"}
+    else:
+        names = {'filename': download_name}
+
+    return dump_options_header(disposition, names)
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when none of the requested byte ranges overlap the file"""
+
+
+def parse_byte_ranges(range_header, file_size):
+    """
+    Parse an HTTP Range header into absolute byte ranges
+
+    Args:
+        range_header: Raw header value, e.g. "bytes=0-499, -500"
+        file_size: Size of the resource in bytes
+
+    Returns:
+        Sorted, coalesced list of (start, end) tuples with inclusive ends,
+        or None if the header is missing/malformed and should be ignored
+
+    Raises:
+        RangeNotSatisfiable: If the header is valid but no range fits the file
+    """
+    if not range_header:
+        return None
+
+    units, _, range_set = range_header.partition('=')
+    if units.strip().lower() != 'bytes' or not range_set.strip():
+        return None
+
+    ranges = []
+    for spec in range_set.split(','):
+        spec = spec.strip()
+        if '-' not in spec:
+            return None
+
+        start_str, _, end_str = spec.partition('-')
+        start_str, end_str = start_str.strip(), end_str.strip()
+
+        try:
+            if not start_str:
+                # Suffix range: last N bytes
+                suffix_length = int(end_str)
+                if suffix_length <= 0:
+                    continue
+                start = max(0, file_size - suffix_length)
+                end = file_size - 1
+            else:
+                start = int(start_str)
+                end = int(end_str) if end_str else max(start, file_size - 1)
+                if start < 0 or end < start:
+                    return None
+                if start >= file_size:
+                    continue
+                end = min(end, file_size - 1)
+        except ValueError:
+            return None
+
+        ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    # Coalesce overlapping/adjacent ranges so each byte is sent once
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > MAX_RANGES:
+        return None
+
+    return merged
+
+
+def iter_file_range(file_path, start, end, block_size=READ_BLOCK_SIZE):
+    """Yield bytes start..end (inclusive) of a file in fixed-size blocks"""
+    remaining = end - start + 1
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def make_etag(stat_result):
+    """Build a validator from inode, size and mtime (cheap - no hashing of content)"""
+    return f'{stat_result.st_ino:x}-{stat_result.st_size:x}-{int(stat_result.st_mtime):x}'
+
+
+def _is_not_modified(etag, last_modified):
+    """Evaluate If-None-Match / If-Modified-Since against the current file"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # Weak comparison: W/"x" matches "x"
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        candidates = [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+        return '*' in candidates or f'"{etag}"' in candidates
+
+    if_modified_since = parse_date(request.headers.get('If-Modified-Since'))
+    if if_modified_since:
+        return int(last_modified) <= int(if_modified_since.timestamp())
+
+    return False
+
+
+def _if_range_matches(etag, last_modified):
+    """A Range header only applies if If-Range (when present) still matches"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+
+    # Strong comparison (RFC 7233): a weak validator never matches, so the full file is sent
+    if_range = if_range.strip()
+    if if_range.startswith('W/'):
+        return False
+    if if_range.startswith('"'):
+        return if_range == f'"{etag}"'
+
+    if_range_date = parse_date(if_range)
+    return bool(if_range_date) and int(last_modified) == int(if_range_date.timestamp())
+
+
+def send_video_file(file_path, mimetype='video/mp4', as_attachment=False, download_name=None, max_age=3600):
+    """
+    Serve a video file with full HTTP range support
+
+    Handles 206 single-range and multipart/byteranges responses, 416 for
+    unsatisfiable ranges and 304 for ETag/Last-Modified revalidation. Whole
+    file responses go through the server's wsgi.file_wrapper (sendfile under
+    gunicorn); with USE_X_SENDFILE enabled the front server serves the file
+    and ranges itself.
+    """
+    stat_result = os.stat(file_path)
+    file_size = stat_result.st_size
+    etag = make_etag(stat_result)
+
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': f'"{etag}"',
+        'Last-Modified': http_date(stat_result.st_mtime),
+        'Cache-Control': f'private, max-age={max_age}'
+    }
+
+    if as_attachment:
+        filename = download_name or os.path.basename(file_path)
+        headers['Content-Disposition'] = content_disposition(filename)
+
+    if _is_not_modified(etag, stat_result.st_mtime):
+        return Response(status=304, headers=headers)
+
+    # Let nginx/Apache do the transfer (and range handling) when configured
+    if current_app.config.get('USE_X_SENDFILE'):
+        headers['X-Sendfile'] = os.path.abspath(file_path)
+        return Response(status=200, headers=headers, mimetype=mimetype)
+
+    ranges = None
+    if request.method in ('GET', 'HEAD') and _if_range_matches(etag, stat_result.st_mtime):
+        try:
+            ranges = parse_byte_ranges(request.headers.get('Range'), file_size)
+        except RangeNotSatisfiable:
+            headers['Content-Range'] = f'bytes */{file_size}'
+            return Response(status=416, headers=headers)
+
+    # Whole file
+    if not ranges:
+        headers['Content-Length'] = str(file_size)
+        body = wrap_file(request.environ, open(file_path, 'rb'), buffer_size=READ_BLOCK_SIZE)
+        return Response(body, status=200, headers=headers, mimetype=mimetype, direct_passthrough=True)
+
+    # Single range
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+        headers['Content-Length'] = str(end - start + 1)
+        return Response(iter_file_range(file_path, start, end), status=206, headers=headers,
+                        mimetype=mimetype, direct_passthrough=True)
+
+    # Multiple ranges -> multipart/byteranges
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (f'--{boundary}\r\nContent-Type: {mimetype}\r\n'
+         f'Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n').encode('latin-1')
+        for start, end in ranges
+    ]
+    closing = f'\r\n--{boundary}--\r\n'.encode('latin-1')
+
+    content_length = len(closing) + sum(
+        len(part_header) + (end - start + 1) + (2 if index else 0)
+        for index, (part_header, (start, end)) in enumerate(zip(part_headers, ranges))
+    )
+
+    def generate_parts():
+        for index, (part_header, (start, end)) in enumerate(zip(part_headers, ranges)):
+            if index:
+                yield b'\r\n'
+            yield part_header
+            yield from iter_file_range(file_path, start, end)
+        yield closing
+
+    headers['Content-Length'] = str(content_length)
+    return Response(generate_parts(), status=206, headers=headers,
+                    content_type=f'multipart/byteranges; boundary={boundary}', direct_passthrough=True)
@@ -0,0 +1,237 @@
+import os
+import json
+import shutil
+import logging
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+# Transcoding configuration
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY', 'ffprobe')
+HLS_FOLDER = 'uploads/hls'
+HLS_SEGMENT_SECONDS = 6
+MASTER_PLAYLIST = 'master.m3u8'
+
+# Bitrate ladder - renditions taller than the source are skipped
+BITRATE_LADDER = [
+    {'name': '360p', 'height': 360, 'video_bitrate': 800, 'audio_bitrate': 96},
+    {'name': '480p', 'height': 480, 'video_bitrate': 1400, 'audio_bitrate': 128},
+    {'name': '720p', 'height': 720, 'video_bitrate': 2800, 'audio_bitrate': 128},
+    {'name': '1080p', 'height': 1080, 'video_bitrate': 5000, 'audio_bitrate': 192},
+]
+
+
+def probe_video(video_path):
+    """
+    Read duration, resolution and codec of a video with ffprobe
+
+    Returns:
+        Dict with duration (seconds), width, height, codec and has_audio
+
+    Raises:
+        RuntimeError: If ffprobe fails or the file has no video stream
+    """
+    result = subprocess.run(
+        [FFPROBE_BINARY, '-v', 'error', '-print_format', 'json',
+         '-show_format', '-show_streams', video_path],
+        capture_output=True, text=True, timeout=60
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'ffprobe failed: {result.stderr.strip()}')
+
+    info = json.loads(result.stdout or '{}')
+    streams = info.get('streams', [])
+    video_stream = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    if not video_stream:
+        raise RuntimeError('No video stream found')
+
+    duration = info.get('format', {}).get('duration') or video_stream.get('duration')
+
+    return {
+        'duration': round(float(duration), 2) if duration else None,
+        'width': int(video_stream.get('width') or 0) or None,
+        'height': int(video_stream.get('height') or 0) or None,
+        'codec': video_stream.get('codec_name'),
+        'has_audio': any(s.get('codec_type') == 'audio' for s in streams)
+    }
+
+
+def select_renditions(source_height):
+    """Pick the ladder rungs that do not upscale the source (always at least one)"""
+    if not source_height:
+        return BITRATE_LADDER[:1]
+    renditions = [r for r in BITRATE_LADDER if r['height'] <= source_height]
+    return renditions or BITRATE_LADDER[:1]
+
+
+def build_hls_command(video_path, output_dir, renditions, has_audio, segment_seconds=HLS_SEGMENT_SECONDS):
+    """Build a single ffmpeg invocation that decodes once and encodes every rendition"""
+    # One decode, split into N scaled outputs
+    split_labels = ''.join(f'[v{i}]' for i in range(len(renditions)))
+    filters = [f'[0:v]split={len(renditions)}{split_labels}']
+    for i, rendition in enumerate(renditions):
+        filters.append(f"[v{i}]scale=-2:{rendition['height']}[v{i}out]")
+
+    command = [FFMPEG_BINARY, '-y', '-v', 'error', '-i', video_path,
+               '-filter_complex', ';'.join(filters)]
+
+    stream_map = []
+    for i, rendition in enumerate(renditions):
+        video_bitrate = rendition['video_bitrate']
+        command += [
+            '-map', f'[v{i}out]',
+            f'-c:v:{i}', 'libx264',
+            f'-b:v:{i}', f'{video_bitrate}k',
+            f'-maxrate:v:{i}', f'{int(video_bitrate * 1.07)}k',
+            f'-bufsize:v:{i}', f'{video_bitrate * 2}k',
+        ]
+        if has_audio:
+            command += ['-map', 'a:0', f'-c:a:{i}', 'aac', f"-b:a:{i}", f"{rendition['audio_bitrate']}k"]
+            stream_map.append(f"v:{i},a:{i},name:{rendition['name']}")
+        else:
+            stream_map.append(f"v:{i},name:{rendition['name']}")
+
+    command += [
+        # Aligned keyframes on segment boundaries so players can switch renditions
+        '-preset', 'veryfast',
+        '-sc_threshold', '0',
+        '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})',
+        '-f', 'hls',
+        '-hls_time', str(segment_seconds),
+        '-hls_playlist_type', 'vod',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_filename', os.path.join(output_dir, '%v', 'segment_%04d.ts'),
+        '-master_pl_name', MASTER_PLAYLIST,
+        '-var_stream_map', ' '.join(stream_map),
+        os.path.join(output_dir, '%v', 'index.m3u8')
+    ]
+    return command
+
+
+def transcode_to_hls(location, output_dir, segment_seconds=HLS_SEGMENT_SECONDS):
+    """
+    Transcode a video into HLS renditions (runs inside a worker process)
+
+    Output is written to a temporary sibling directory and renamed into place
+    once ffmpeg succeeds, so a half-written playlist is never served.
+
+    Args:
+        location: Storage location of the uploaded original (local path or s3:// URI)
+        output_dir: Directory that will contain master.m3u8 and one folder per rendition
+        segment_seconds: Target HLS segment length
+
+    Returns:
+        Dict with probe metadata, rendition names and the master playlist path
+    """
+    from services.video_storage import worker_read_url
+
+    # ffmpeg reads remote originals through a presigned URL minted as the job starts
+    video_path = worker_read_url(location)
+    metadata = probe_video(video_path)
+    renditions = select_renditions(metadata['height'])
+
+    temp_dir = f'{output_dir}.tmp'
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    for rendition in renditions:
+        os.makedirs(os.path.join(temp_dir, rendition['name']))
+
+    try:
+        command = build_hls_command(video_path, temp_dir, renditions, metadata['has_audio'], segment_seconds)
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f'ffmpeg failed: {result.stderr.strip()[-2000:]}')
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(temp_dir, output_dir)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    metadata['renditions'] = [r['name'] for r in renditions]
+    metadata['playlist'] = os.path.join(output_dir, MASTER_PLAYLIST)
+    return metadata
+
+
+class VideoTranscoder:
+    """Runs HLS transcodes in a process pool and records the results on TrainingVideo"""
+
+    def __init__(self, max_workers=None, output_root=HLS_FOLDER):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.output_root = output_root
+        self._executor = None
+
+    @property
+    def available(self):
+        """ffmpeg and ffprobe must both be installed"""
+        return bool(shutil.which(FFMPEG_BINARY) and shutil.which(FFPROBE_BINARY))
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: workers must not inherit the parent's DB connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def output_dir_for(self, video_id):
+        return os.path.join(self.output_root, str(video_id))
+
+    def submit(self, app, video_id, location):
+        """Queue a transcode; the result is written back to the video row when done"""
+        os.makedirs(self.output_root, exist_ok=True)
+        future = self._get_executor().submit(transcode_to_hls, location, self.output_dir_for(video_id))
+        future.add_done_callback(partial(self._on_complete, app, video_id))
+        logger.info(f"Queued HLS transcode for video {video_id}")
+        return future
+
+    def handle_status_change(self, video, status):
+        """TrainingVideo status listener - 'processing' starts a transcode"""
+        if status != 'processing':
+            return
+        from flask import current_app
+        self.submit(current_app._get_current_object(), video.id, video.file_path)
+
+    def _on_complete(self, app, video_id, future):
+        """Done-callback (runs on an executor thread in the web process)"""
+        with app.app_context():
+            db = app.extensions['sqlalchemy']
+            try:
+                video = db.session.get(app.TrainingVideo, video_id)
+                if not video:
+                    # Video was deleted while transcoding
+                    shutil.rmtree(self.output_dir_for(video_id), ignore_errors=True)
+                    return
+
+                error = future.exception()
+                if error:
+                    logger.error(f"HLS transcode failed for video {video_id}: {error}")
+                    video.set_processing_status('error')
+                else:
+                    video.apply_transcode_result(future.result())
+                    video.set_processing_status('ready')
+                    logger.info(f"HLS transcode finished for video {video_id}")
+
+                video.save()
+            except Exception as e:
+                logger.error(f"Could not record transcode result for video {video_id}: {e}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+    def shutdown(self, wait=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+# Global transcoder instance
+video_transcoder = VideoTranscoder()
+
+def get_video_transcoder() -> VideoTranscoder:
+    """Get the global video transcoder instance"""
+    return video_transcoder
@@ -0,0 +1,317 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import tempfile
+
+# Streaming upload configuration
+CHUNK_SIZE = 1024 * 1024  # 1MB per read/write
+SNIFF_SIZE = 8 * 1024  # Bytes handed to libmagic for MIME detection
+
+
+def read_head(stream, size=SNIFF_SIZE):
+    """Read up to `size` bytes from a stream (short reads are retried until EOF)"""
+    head = b''
+    while len(head) < size:
+        chunk = stream.read(size - len(head))
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+
+def save_stream_atomically(stream, dest_path, max_size, validator=None, chunk_size=CHUNK_SIZE, hasher=None):
+    """
+    Copy an upload stream to dest_path without holding it in memory
+
+    The data is written in fixed-size chunks to a hidden temp file next to the
+    destination and renamed into place once complete, so readers never see a
+    partially written video.
+
+    Args:
+        stream: File-like object to read from (e.g. FileStorage.stream)
+        dest_path: Final path of the stored file
+        max_size: Maximum number of bytes accepted
+        validator: Optional callable(head_bytes) -> (is_valid, error_message)
+        chunk_size: Number of bytes read per iteration
+        hasher: Optional hashlib object updated with every byte written
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        ValueError: If validation fails or the stream exceeds max_size
+    """
+    dest_dir = os.path.dirname(dest_path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix='.upload_', suffix='.part')
+
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            # Only the first few KB are needed to sniff the MIME type
+            head = read_head(stream)
+            if validator:
+                is_valid, error_message = validator(head)
+                if not is_valid:
+                    raise ValueError(error_message)
+
+            total_bytes = len(head)
+            out.write(head)
+            if hasher:
+                hasher.update(head)
+
+            while total_bytes <= max_size:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                total_bytes += len(chunk)
+                if total_bytes > max_size:
+                    break
+                out.write(chunk)
+                if hasher:
+                    hasher.update(chunk)
+
+            if total_bytes > max_size:
+                raise ValueError(f'File too large. Maximum size is {max_size // (1024*1024)}MB')
+
+            out.flush()
+            os.fsync(out.fileno())
+
+        os.replace(temp_path, dest_path)
+        return total_bytes
+
+    except BaseException:
+        # Never leave partial uploads behind
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ResumableUploadStore:
+    """
+    Disk-backed state for resumable, multi-part video uploads
+
+    Each upload gets its own directory holding a JSON manifest, a pre-sized
+    data file and one empty marker file per received chunk. Chunks are
+    written straight into the data file at their offset, so they can arrive
+    in any order (or in parallel) and nothing is reassembled in memory.
+    """
+
+    DEFAULT_CHUNK_SIZE = 5 * 1024 * 1024  # 5MB
+    MIN_CHUNK_SIZE = 256 * 1024
+    MAX_CHUNK_SIZE = 50 * 1024 * 1024
+    EXPIRY_SECONDS = 24 * 60 * 60  # Abandoned uploads are removed after a day
+
+    def __init__(self, base_dir, max_size):
+        self.base_dir = base_dir
+        self.max_size = max_size
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    # Paths
+
+    def _upload_dir(self, upload_id):
+        if not upload_id or len(upload_id) != 32 or any(c not in '0123456789abcdef' for c in upload_id):
+            raise ValueError('Invalid upload id')
+        return os.path.join(self.base_dir, upload_id)
+
+    def _manifest_path(self, upload_id):
+        return os.path.join(self._upload_dir(upload_id), 'manifest.json')
+
+    def _data_path(self, upload_id):
+        return os.path.join(self._upload_dir(upload_id), 'data.part')
+
+    def _marker_path(self, upload_id, index):
+        return os.path.join(self._upload_dir(upload_id), f'chunk_{index:06d}.done')
+
+    # Lifecycle
+
+    def create(self, user_id, filename, total_size, chunk_size=None, metadata=None):
+        """Start a new upload and return its manifest"""
+        if total_size <= 0:
+            raise ValueError('total_size must be a positive number')
+        if total_size > self.max_size:
+            raise ValueError(f'File too large. Maximum size is {self.max_size // (1024*1024)}MB')
+
+        chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        chunk_size = max(self.MIN_CHUNK_SIZE, min(self.MAX_CHUNK_SIZE, int(chunk_size)))
+
+        self.cleanup_expired()
+
+        upload_id = uuid.uuid4().hex
+        upload_dir = self._upload_dir(upload_id)
+        os.makedirs(upload_dir)
+
+        # Pre-size the data file so chunks can be written at any offset
+        with open(self._data_path(upload_id), 'wb') as data_file:
+            data_file.truncate(total_size)
+
+        manifest = {
+            'upload_id': upload_id,
+            'user_id': user_id,
+            'filename': filename,
+            'total_size': total_size,
+            'chunk_size': chunk_size,
+            'total_chunks': (total_size + chunk_size - 1) // chunk_size,
+            'metadata': metadata or {},
+            'created_at': time.time()
+        }
+
+        with open(self._manifest_path(upload_id), 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        return manifest
+
+    def get_manifest(self, upload_id):
+        """Load an upload manifest, or None if the upload does not exist"""
+        manifest_path = self._manifest_path(upload_id)
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)
+
+    def expected_chunk_length(self, manifest, index):
+        """Number of bytes chunk `index` must contain"""
+        start = index * manifest['chunk_size']
+        return min(manifest['chunk_size'], manifest['total_size'] - start)
+
+    def write_chunk(self, upload_id, index, stream):
+        """
+        Write one chunk from a stream directly into the data file
+
+        Chunks may be re-sent; a later write overwrites the same range. The
+        chunk's marker is removed before the first byte is written, so a
+        retry cut short leaves the chunk reported missing rather than done.
+
+        Raises:
+            ValueError: If the upload is unknown, the index is out of range or
+                the chunk length does not match the expected length
+        """
+        manifest = self.get_manifest(upload_id)
+        if not manifest:
+            raise ValueError('Upload not found')
+        if index < 0 or index >= manifest['total_chunks']:
+            raise ValueError(f"Chunk index must be between 0 and {manifest['total_chunks'] - 1}")
+
+        expected_length = self.expected_chunk_length(manifest, index)
+        written = 0
+
+        marker_path = self._marker_path(upload_id, index)
+        try:
+            os.remove(marker_path)
+        except FileNotFoundError:
+            pass
+
+        # Each request gets its own handle, so parallel chunks never share a file position
+        with open(self._data_path(upload_id), 'r+b') as data_file:
+            data_file.seek(index * manifest['chunk_size'])
+            while True:
+                block = stream.read(min(CHUNK_SIZE, expected_length - written + 1))
+                if not block:
+                    break
+                written += len(block)
+                if written > expected_length:
+                    raise ValueError(f'Chunk {index} is larger than the expected {expected_length} bytes')
+                data_file.write(block)
+            data_file.flush()
+            os.fsync(data_file.fileno())
+
+        if written != expected_length:
+            raise ValueError(f'Chunk {index} is incomplete: received {written} of {expected_length} bytes')
+
+        # Marker files are only created once the chunk is safely on disk
+        open(marker_path, 'w').close()
+        return manifest
+
+    def received_chunks(self, upload_id):
+        """Sorted list of chunk indices already stored"""
+        upload_dir = self._upload_dir(upload_id)
+        indices = []
+        for name in os.listdir(upload_dir):
+            if name.startswith('chunk_') and name.endswith('.done'):
+                indices.append(int(name[len('chunk_'):-len('.done')]))
+        return sorted(indices)
+
+    def get_status(self, upload_id):
+        """Report which chunks (and byte ranges) the server already has"""
+        manifest = self.get_manifest(upload_id)
+        if not manifest:
+            return None
+
+        received = self.received_chunks(upload_id)
+        received_set = set(received)
+        missing = [i for i in range(manifest['total_chunks']) if i not in received_set]
+
+        return {
+            'upload_id': upload_id,
+            'filename': manifest['filename'],
+            'total_size': manifest['total_size'],
+            'chunk_size': manifest['chunk_size'],
+            'total_chunks': manifest['total_chunks'],
+            'received_chunks': received,
+            'received_ranges': [
+                [i * manifest['chunk_size'], i * manifest['chunk_size'] + self.expected_chunk_length(manifest, i)]
+                for i in received
+            ],
+            'received_bytes': sum(self.expected_chunk_length(manifest, i) for i in received),
+            'missing_chunks': missing,
+            'complete': not missing
+        }
+
+    def finalize(self, upload_id, dest_path, validator=None, hasher=None):
+        """
+        Move a fully received upload into its final location
+
+        Args:
+            upload_id: Upload to finalize
+            dest_path: Final path of the stored file
+            validator: Optional callable(head_bytes) -> (is_valid, error_message)
+            hasher: Optional hashlib object updated with the assembled file,
+                read sequentially from local disk before it is moved
+
+        Returns:
+            The upload manifest
+        """
+        status = self.get_status(upload_id)
+        if not status:
+            raise ValueError('Upload not found')
+        if not status['complete']:
+            raise ValueError(f"Upload incomplete: {len(status['missing_chunks'])} chunks missing")
+
+        data_path = self._data_path(upload_id)
+        if validator:
+            with open(data_path, 'rb') as data_file:
+                is_valid, error_message = validator(read_head(data_file))
+            if not is_valid:
+                raise ValueError(error_message)
+
+        if hasher is not None:
+            with open(data_path, 'rb') as data_file:
+                for block in iter(lambda: data_file.read(CHUNK_SIZE), b''):
+                    hasher.update(block)
+
+        manifest = self.get_manifest(upload_id)
+        os.replace(data_path, dest_path)
+        self.discard(upload_id)
+        return manifest
+
+    def discard(self, upload_id):
+        """Delete all state for an upload"""
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+    def cleanup_expired(self):
+        """Remove uploads that were started but never finished"""
+        cutoff = time.time() - self.EXPIRY_SECONDS
+        removed = 0
+        for name in os.listdir(self.base_dir):
+            upload_dir = os.path.join(self.base_dir, name)
+            try:
+                if os.path.isdir(upload_dir) and os.path.getmtime(upload_dir) < cutoff:
+                    shutil.rmtree(upload_dir, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
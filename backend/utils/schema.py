@@ -0,0 +1,90 @@
+import re
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+
+def add_missing_columns(db, *models):
+    """
+    Add nullable columns that exist on a model but not yet in its table
+
+    db.create_all() only creates missing tables, so databases created before a
+    column was introduced need it added in place. Only nullable columns
+    without server-side requirements are handled; anything else needs a
+    proper migration.
+
+    Returns:
+        List of "table.column" names that were added
+    """
+    inspector = inspect(db.engine)
+    added = []
+
+    for model in models:
+        table = model.__table__
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            added.append(f'{table.name}.{column.name}')
+
+    return added
+
+
+def missing_indexes(db, *models):
+    """
+    Indexes declared on models but absent from their existing tables
+
+    Without models every table in the metadata is checked.
+
+    Returns:
+        List of (table name, Index) pairs
+    """
+    inspector = inspect(db.engine)
+    tables = [model.__table__ for model in models] if models else db.metadata.sorted_tables
+    missing = []
+
+    for table in tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                missing.append((table.name, index))
+
+    return missing
+
+
+def add_missing_indexes(db, *models, concurrently=False):
+    """
+    Create indexes declared on models but missing from their existing tables
+
+    db.create_all() skips tables that already exist, so their new indexes
+    would never be built otherwise. On PostgreSQL `concurrently` builds
+    each index with CREATE INDEX CONCURRENTLY so writes aren't blocked
+    meanwhile.
+
+    Returns:
+        List of index names that were created
+    """
+    concurrently = concurrently and db.engine.dialect.name == 'postgresql'
+    created = []
+
+    for _, index in missing_indexes(db, *models):
+        if concurrently:
+            statement = CreateIndex(index).compile(dialect=db.engine.dialect)
+            sql = re.sub(r'^CREATE (UNIQUE )?INDEX', r'CREATE \1INDEX CONCURRENTLY', str(statement).strip())
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.execute(text(sql))
+        else:
+            index.create(bind=db.engine)
+        created.append(index.name)
+
+    return created